@@ -23,6 +23,15 @@ def api_translate(aid: int):
         q_exec("""UPDATE article_texts
                   SET text_en=NULL, text_en_md5=NULL, en_provider=NULL, en_updated_at=NULL
                   WHERE article_id=%s""", (aid,))
+        # drop chunk checkpoints so every chunk is translated again
+        q_exec("DELETE FROM translation_chunks WHERE article_id=%s", (aid,))
+        # manual requeue: translate worker picks it up ahead of the backlog
+        q_exec("""INSERT INTO work_items (stage, article_id, manual)
+                  VALUES ('translate', %s, 1)
+                  ON DUPLICATE KEY UPDATE
+                    manual=1, priority=NULL, attempts=0, next_attempt_at=NULL, reason=NULL,
+                    enqueued_at=IF(status='leased', enqueued_at, NOW()),
+                    status=IF(status='leased', status, 'pending')""", (aid,))
         return jsonify(ok=True, error=None)
     except Exception as e:
         log.exception("api_translate error")
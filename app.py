@@ -1,8 +1,10 @@
 # C:\data\gui\app.py
-import os, json, logging
+import os, json
 from datetime import datetime
 from flask import Flask, request, jsonify, send_from_directory, render_template_string, url_for, redirect
 import pymysql
+import log_setup
+from gui_metrics import init_metrics
 
 APP_PORT = int(os.environ.get("GUI_PORT", "5080"))
 DBCFG_PATH = os.environ.get("DBCFG_PATH", r"C:\data\config\db.json")
@@ -12,12 +14,7 @@ LOG_PATH = os.environ.get("GUI_LOG", r"C:\data\logs\gui.log")
 os.makedirs(os.path.dirname(LOG_PATH), exist_ok=True)
 os.makedirs(STATIC_DIR, exist_ok=True)
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s %(levelname)s %(message)s",
-    handlers=[logging.FileHandler(LOG_PATH, encoding="utf-8"), logging.StreamHandler()]
-)
-log = logging.getLogger("gui")
+log = log_setup.setup_logging(LOG_PATH, stage="gui", fmt="%(asctime)s %(levelname)s %(message)s")
 
 # ---- DB helpers -------------------------------------------------------------
 def dbcfg():
@@ -160,6 +157,7 @@ def articles_table(rows, show_links=True):
 
 # ---- Flask app --------------------------------------------------------------
 app = Flask(__name__)
+init_metrics(app)   # request latency + GET /metrics
 
 @app.route("/static/<path:filename>")
 def static_file(filename):
@@ -336,6 +334,15 @@ def api_translate(aid:int):
         q_exec("""UPDATE article_texts
                   SET text_en=NULL, text_en_md5=NULL, en_provider=NULL, en_updated_at=NULL
                   WHERE article_id=%s""", (aid,))
+        # drop chunk checkpoints so every chunk is translated again
+        q_exec("DELETE FROM translation_chunks WHERE article_id=%s", (aid,))
+        # manual requeue: translate worker picks it up ahead of the backlog
+        q_exec("""INSERT INTO work_items (stage, article_id, manual)
+                  VALUES ('translate', %s, 1)
+                  ON DUPLICATE KEY UPDATE
+                    manual=1, priority=NULL, attempts=0, next_attempt_at=NULL, reason=NULL,
+                    enqueued_at=IF(status='leased', enqueued_at, NOW()),
+                    status=IF(status='leased', status, 'pending')""", (aid,))
         return jsonify(ok=True, error=None)
     except Exception as e:
         log.exception("api_translate error")
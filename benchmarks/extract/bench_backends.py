@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+bench_backends.py
+PyTorch fp32 vs. ONNX Runtime int8: címke egyezés (parity), mondat/s és RSS növekmény a fixture korpuszon
+
+Futtatás:
+  python3 benchmarks/extract/bench_backends.py [--nli facebook/bart-large-mnli]
+      [--sentiment nlptown/bert-base-multilingual-uncased-sentiment] [--ner MODEL]
+      [--cache-dir /tmp/onnx_cache] [--min-agreement 0.95] [--json]
+
+Kilépési kód 1, ha bármely modell egyezése a --min-agreement alatt van.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from typing import Dict, List
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+sys.path.insert(0, ROOT)
+
+import psutil
+
+import model_backend
+import nli_batch
+
+FIXTURES = os.path.join(ROOT, "benchmarks", "fixtures", "articles.jsonl")
+
+def load_fixtures(path: str) -> List[dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def _rss_mb() -> float:
+    return psutil.Process().memory_info().rss / (1024 * 1024)
+
+def _load(task: str, model: str, backend: str, cache_dir: str, **kwargs):
+    rss0, t0 = _rss_mb(), time.perf_counter()
+    pipe, used = model_backend.load_pipeline(task, model, backend, cache_dir, log=print, **kwargs)
+    return pipe, used, time.perf_counter() - t0, _rss_mb() - rss0
+
+def _throughput(pipe, texts: List[str], **call_kwargs) -> float:
+    pipe(texts[0], **call_kwargs)  # warmup
+    t0 = time.perf_counter()
+    for t in texts:
+        pipe(t, **call_kwargs)
+    dt = time.perf_counter() - t0
+    return round(len(texts) / dt, 2) if dt else 0.0
+
+def bench(task: str, model: str, texts: List[str], cache_dir: str, call_kwargs: Dict,
+          pipe_kwargs: Dict) -> Dict:
+    torch_pipe, _, torch_load, torch_rss = _load(task, model, model_backend.BACKEND_TORCH, cache_dir, **pipe_kwargs)
+    onnx_pipe, used, onnx_load, onnx_rss = _load(task, model, model_backend.BACKEND_ONNX, cache_dir, **pipe_kwargs)
+    result = model_backend.parity(task, torch_pipe, onnx_pipe, texts, **call_kwargs)
+    result.update({
+        "model": model,
+        "onnx_backend": used,
+        "torch_load_s": round(torch_load, 2),
+        "onnx_load_s": round(onnx_load, 2),
+        "torch_rss_mb": round(torch_rss, 1),
+        "onnx_rss_mb": round(onnx_rss, 1),
+        "torch_sps": _throughput(torch_pipe, texts, **call_kwargs),
+        "onnx_sps": _throughput(onnx_pipe, texts, **call_kwargs),
+    })
+    result["speedup"] = round(result["onnx_sps"] / result["torch_sps"], 2) if result["torch_sps"] else None
+    return result
+
+def main():
+    ap = argparse.ArgumentParser(description="ONNX int8 vs PyTorch parity + throughput")
+    ap.add_argument("--fixtures", default=FIXTURES)
+    ap.add_argument("--nli", default="facebook/bart-large-mnli")
+    ap.add_argument("--labels", default="factual statement,opinion")
+    ap.add_argument("--sentiment", default="nlptown/bert-base-multilingual-uncased-sentiment")
+    ap.add_argument("--ner", default=None, help="NER modell (üres = kihagyva)")
+    ap.add_argument("--cache-dir", default="/tmp/onnx_cache")
+    ap.add_argument("--min-agreement", type=float, default=0.95)
+    ap.add_argument("--json", action="store_true", help="gépi olvasható kimenet")
+    args = ap.parse_args()
+
+    articles = load_fixtures(args.fixtures)
+    sentences = [s for a in articles for s in nli_batch.candidate_sentences(a["text"])]
+    labels = [x.strip() for x in args.labels.split(",") if x.strip()]
+
+    results = []
+    if args.nli:
+        results.append(bench("zero-shot-classification", args.nli, sentences, args.cache_dir,
+                             {"candidate_labels": labels, "multi_label": False}, {}))
+    if args.sentiment:
+        results.append(bench("sentiment-analysis", args.sentiment, sentences, args.cache_dir,
+                             {"truncation": True}, {}))
+    if args.ner:
+        results.append(bench("ner", args.ner, [a["text"][:1000] for a in articles], args.cache_dir,
+                             {}, {"aggregation_strategy": "simple"}))
+
+    failed = [r for r in results if r["agreement"] < args.min_agreement]
+
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2, default=str))
+    else:
+        for r in results:
+            print(f"{r['task']} ({r['model']}, onnx backend: {r['onnx_backend']})")
+            print(f"  agreement: {r['agreement']:.2%} on {r['samples']} samples")
+            print(f"  sentences/s: {r['torch_sps']} -> {r['onnx_sps']} ({r['speedup']}x)")
+            print(f"  RSS +MB: {r['torch_rss_mb']} -> {r['onnx_rss_mb']}, load s: {r['torch_load_s']} -> {r['onnx_load_s']}")
+            for m in r["mismatches"][:5]:
+                print(f"    ≠ {m['a']} / {m['b']}: {m['text']}")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
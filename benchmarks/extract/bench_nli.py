@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+bench_nli.py
+Mondat/s összehasonlítás CPU-n: régi mondatonkénti NLI hívás vs. nli_batch (hossz-bucketelt batchek)
+
+Futtatás:
+  python3 benchmarks/extract/bench_nli.py [--model facebook/bart-large-mnli]
+      [--batch-size 16] [--labels "factual statement,opinion"] [--targets "factual statement"] [--json]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from typing import List, Optional
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+sys.path.insert(0, ROOT)
+
+import nli_batch
+
+FIXTURES = os.path.join(ROOT, "benchmarks", "fixtures", "articles.jsonl")
+
+def load_fixtures(path: str) -> List[dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def per_sentence(nli_pipe, sentences: List[str], labels: List[str]) -> List[Optional[str]]:
+    """a korábbi extract_claims útvonala: egy pipeline hívás mondatonként (sleep nélkül)"""
+    out = []
+    for s in sentences:
+        res = nli_pipe(s, candidate_labels=labels, multi_label=False)
+        out.append(res.get("labels", [None])[0])
+    return out
+
+def main():
+    ap = argparse.ArgumentParser(description="Batched NLI benchmark (sentences/s)")
+    ap.add_argument("--fixtures", default=FIXTURES)
+    ap.add_argument("--model", default="facebook/bart-large-mnli")
+    ap.add_argument("--batch-size", type=int, default=nli_batch.DEFAULT_BATCH_SIZE)
+    ap.add_argument("--labels", default="factual statement,opinion")
+    ap.add_argument("--targets", default="factual statement")
+    ap.add_argument("--threads", type=int, default=0, help="torch szálak (0 = alapértelmezett)")
+    ap.add_argument("--json", action="store_true", help="gépi olvasható kimenet")
+    args = ap.parse_args()
+
+    try:
+        import torch
+        from transformers import pipeline
+    except ImportError as e:
+        print(f"transformers/torch szükséges: {e}", file=sys.stderr)
+        return 2
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    labels = [x.strip() for x in args.labels.split(",") if x.strip()]
+    targets = [x.strip() for x in args.targets.split(",") if x.strip()]
+    texts = [a["text"] for a in load_fixtures(args.fixtures)]
+    sentences = [s for t in texts for s in nli_batch.candidate_sentences(t)]
+
+    nli_pipe = pipeline("zero-shot-classification", model=args.model, device=-1)
+    nli_pipe(sentences[0], candidate_labels=labels, multi_label=False)  # warmup
+
+    t0 = time.perf_counter()
+    before = per_sentence(nli_pipe, sentences, labels)
+    t_before = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    after = nli_batch.classify(nli_pipe, sentences, labels, args.batch_size)
+    t_after = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    claims = nli_batch.extract_claims_many(nli_pipe, texts, labels, targets, args.batch_size)
+    t_many = time.perf_counter() - t0
+
+    n = len(sentences)
+    summary = {
+        "model": args.model,
+        "articles": len(texts),
+        "sentences": n,
+        "batch_size": args.batch_size,
+        "torch_threads": torch.get_num_threads(),
+        "per_sentence_sps": round(n / t_before, 2) if t_before else None,
+        "batched_sps": round(n / t_after, 2) if t_after else None,
+        "batched_multi_article_sps": round(n / t_many, 2) if t_many else None,
+        "speedup": round(t_before / t_after, 2) if t_after else None,
+        "label_agreement": round(sum(a == b for a, b in zip(before, after)) / max(n, 1), 4),
+        "claims": sum(len(c) for c in claims),
+    }
+
+    if args.json:
+        print(json.dumps(summary, ensure_ascii=False, indent=2))
+        return 0
+
+    print(f"model: {args.model}, {n} sentences from {len(texts)} articles, torch threads: {summary['torch_threads']}")
+    print(f"per-sentence:             {summary['per_sentence_sps']} sentences/s")
+    print(f"batched (bs={args.batch_size}):        {summary['batched_sps']} sentences/s")
+    print(f"batched, all articles:    {summary['batched_multi_article_sps']} sentences/s")
+    print(f"speedup: {summary['speedup']}x, label agreement: {summary['label_agreement']:.2%}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+bench_pipeline.py
+A teljes extract útvonal (előszűrő + NLI + cikk-szintű NER + cég-sentiment) offline mérése a fixture
+korpuszon, az extract_worker saját függvényeivel (extract_claims, claim_results)
+- alapból determinisztikus stub pipeline-okkal (modell nélkül): a szegmentálás, előszűrő, batchelés,
+  NER ablakok és cégfelismerés változását mutatja a tárolt baseline-hoz képest
+- --models: a configban beállított valódi modellekkel (extract_worker.load_models, cache nélkül)
+- mondat/s, cikk/s, csúcs RSS, lépésenkénti (modell) idő
+- egyezés egy tárolt baseline-nal (claim címkék mondatonként, entitások, cég-sentimentek)
+- gépi olvasható JSON kimenet (--output), futások közti összehasonlításhoz
+
+Futtatás:
+  python3 benchmarks/extract/bench_pipeline.py [--config /opt/newscred/extract_config.json] [--models]
+      [--baseline benchmarks/extract/baseline.json] [--write-baseline] [--output run.json]
+      [--repeat 3] [--no-prefilter] [--min-agreement 0.95] [--json]
+
+Kilépési kód 1, ha bármely egyezés a --min-agreement alatt van.
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import signal
+import argparse
+import resource
+import tempfile
+from typing import Dict, List, Optional
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+sys.path.insert(0, ROOT)
+
+import claim_filter
+import company_matcher
+import nli_batch
+
+FIXTURES = os.path.join(ROOT, "benchmarks", "fixtures", "articles.jsonl")
+COMPANIES = os.path.join(ROOT, "benchmarks", "fixtures", "companies.jsonl")
+BASELINE = os.path.join(ROOT, "benchmarks", "extract", "baseline.json")
+BASELINE_MODELS = os.path.join(ROOT, "benchmarks", "extract", "baseline_models.json")
+CONFIG_FILE = "/opt/newscred/extract_config.json"
+
+# az extract_worker importjához szükséges kulcsok (a --config felülírja)
+BENCH_CONFIG = {
+    "database": {"config_file": "/opt/newscred/db.json"},
+    "huggingface": {"token": None},
+    "extraction": {
+        "models": {
+            "nli": "facebook/bart-large-mnli",
+            "ner": "Davlan/bert-base-multilingual-cased-ner-hrl",
+            "sentiment": "nlptown/bert-base-multilingual-uncased-sentiment",
+        },
+        "entity_types": ["PER", "ORG", "LOC"],
+        "sentiment_only_db_companies": True,
+        "nli_labels": ["factual statement", "opinion"],
+        "nli_target_labels": ["factual statement"],
+    },
+    "performance": {"cpu_limit_percent": 40, "batch_size_prod": 50, "sleep_between_batches": 0},
+    "logging": {"log_dir": tempfile.gettempdir(), "log_file_worker": "bench_pipeline.log"},
+}
+
+def load_jsonl(path: str) -> List[dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def load_config(path: str) -> Dict:
+    """az extract worker configja a bench alapértékekre fésülve (ha nincs, alapértékek)"""
+    cfg = json.loads(json.dumps(BENCH_CONFIG))
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            user = json.load(f)
+    except (OSError, ValueError):
+        return cfg
+    for k, v in user.items():
+        if isinstance(v, dict) and isinstance(cfg.get(k), dict):
+            cfg[k].update(v)
+        else:
+            cfg[k] = v
+    return cfg
+
+def import_worker(cfg: Dict):
+    """extract_worker import a megadott configgal (EXTRACT_CONFIG); a signal kezelők visszaállítva"""
+    fd, path = tempfile.mkstemp(prefix="bench_extract_", suffix=".json")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(cfg, f)
+    os.environ["EXTRACT_CONFIG"] = path
+    try:
+        import extract_worker
+    finally:
+        os.unlink(path)
+    signal.signal(signal.SIGINT, signal.default_int_handler)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    return extract_worker
+
+def _peak_rss_mb() -> float:
+    # Linuxon KB
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+# ===== STUB PIPELINE-OK (determinisztikus, a HF kimenet formátumában) =====
+_DIGIT = re.compile(r"\d")
+_NAME = re.compile(r"[A-ZÁÉÍÓÖŐÚÜŰ][\w&-]*(?:\s+[A-ZÁÉÍÓÖŐÚÜŰ0-9][\w&-]*)*")
+_ORG_HINT = re.compile(r"^(Nyrt|Zrt|Kft|Corp|Inc|Bank)$|^[A-Z0-9]{2,}$")
+_POSITIVE = ("emelked", "nőtt", "növeked", "erősöd", "drágul", "felülmúl", "rose", "beat", "gain", "record", "lifted")
+_NEGATIVE = ("csökk", "gyengül", "esés", "elmarad", "veszteség", "fell", "loss", "cautioned", "slow")
+
+class StubNLI:
+    """zero-shot: számot tartalmazó mondat → első címke, különben a második"""
+
+    def __call__(self, inputs, candidate_labels, **kwargs):
+        texts = [inputs] if isinstance(inputs, str) else list(inputs)
+        labels = list(candidate_labels)
+        out = []
+        for t in texts:
+            ranked = labels if _DIGIT.search(t) or len(labels) < 2 else [labels[1], labels[0]] + labels[2:]
+            scores = [0.9] + [0.1 / max(1, len(labels) - 1)] * (len(labels) - 1)
+            out.append({"sequence": t, "labels": ranked, "scores": scores})
+        return out[0] if isinstance(inputs, str) else out
+
+class StubNER:
+    """nagybetűs szósorozatok (a mondat eleji egyszavas nem): jogi forma / csupa nagybetű → ORG, különben PER"""
+
+    def _one(self, text: str) -> List[Dict]:
+        ents = []
+        for m in _NAME.finditer(text):
+            word = m.group(0)
+            before = text[:m.start()].rstrip()
+            if " " not in word and (not before or before[-1] in ".!?"):
+                continue
+            ents.append({"entity_group": "ORG" if _ORG_HINT.search(word.split()[-1]) else "PER",
+                         "score": 0.9, "word": word, "start": m.start(), "end": m.end()})
+        return ents
+
+    def __call__(self, inputs, **kwargs):
+        if isinstance(inputs, str):
+            return self._one(inputs)
+        return [self._one(t) for t in inputs]
+
+class StubSentiment:
+    """csillagos címke kulcsszavak alapján (nlptown formátum)"""
+
+    def _one(self, text: str) -> Dict:
+        low = text.lower()
+        score = sum(low.count(w) for w in _POSITIVE) - sum(low.count(w) for w in _NEGATIVE)
+        stars = 5 if score > 1 else 4 if score == 1 else 3 if score == 0 else 2 if score == -1 else 1
+        return {"label": f"{stars} stars", "score": 0.8}
+
+    def __call__(self, inputs, **kwargs):
+        if isinstance(inputs, str):
+            return self._one(inputs)
+        return [self._one(t) for t in inputs]
+
+class Timed:
+    """pipeline proxy: a modell hívások idejét lépésenként összegzi"""
+
+    def __init__(self, pipe, step: str, seconds: Dict[str, float]):
+        self.pipe = pipe
+        self.step = step
+        self.seconds = seconds
+
+    def __call__(self, *args, **kwargs):
+        t0 = time.perf_counter()
+        try:
+            return self.pipe(*args, **kwargs)
+        finally:
+            self.seconds[self.step] += time.perf_counter() - t0
+
+# ===== PIPELINE =====
+class Pipeline:
+    """az extract_worker cikk-feldolgozása (extract_claims + claim_results), DB és lease nélkül"""
+
+    def __init__(self, worker, companies: List[Dict], prefilter: bool = True, models: bool = False):
+        self.worker = worker
+        self.use_models = models
+        if models:
+            self.models = {"nli": worker.NLI_MODEL, "ner": worker.NER_MODEL, "sentiment": worker.SENTIMENT_MODEL}
+            self.backend = worker.MODEL_BACKEND
+        else:
+            self.models = {"nli": "stub", "ner": "stub", "sentiment": "stub"}
+            self.backend = "stub"
+        # cégfelismerő a fixture cégekkel; tanítatlan előszűrő: csak a biztos negatívok esnek ki
+        worker.COMPANIES.matcher = company_matcher.CompanyMatcher(
+            companies, worker.CONFIG["extraction"].get("company_aliases"))
+        worker.CASCADE = claim_filter.CascadeFilter(
+            {"enabled": prefilter, "explore_rate": 0.0}, company_lookup=worker.COMPANIES.mentions,
+        )
+        # claims: előszűrő + NLI együtt; nli / ner / sentiment: csak a modell hívások
+        self.stage_seconds = {"load": 0.0, "claims": 0.0, "nli": 0.0, "ner": 0.0, "sentiment": 0.0}
+        self.sentences = 0
+        self.pipes = (None, None, None)
+
+    def load(self):
+        t0 = time.perf_counter()
+        if self.use_models:
+            # a cache ismételt futásnál a mérést torzítaná
+            self.worker.CACHE_ENABLED = False
+            pipes = self.worker.load_models()
+        else:
+            pipes = (StubNLI(), StubNER(), StubSentiment())
+        self.pipes = tuple(Timed(p, step, self.stage_seconds) if p is not None else None
+                           for p, step in zip(pipes, ("nli", "ner", "sentiment")))
+        self.stage_seconds["load"] = time.perf_counter() - t0
+
+    def reset(self):
+        for k in self.stage_seconds:
+            if k != "load":
+                self.stage_seconds[k] = 0.0
+        self.sentences = 0
+
+    def run(self, text: str, lang: Optional[str] = None) -> Dict:
+        """egy cikk: mondatonkénti NLI címke, claimek, entitások, cég-sentimentek"""
+        nli_pipe, ner_pipe, sentiment_pipe = self.pipes
+        self.sentences += len(nli_batch.candidate_spans(text, lang))
+
+        # mondatonkénti címkék: a worker NLI hívásainak kimenete
+        decided: Dict[str, str] = {}
+        def recorded(inputs, **kwargs):
+            results = nli_pipe(inputs, **kwargs)
+            for r in [results] if isinstance(results, dict) else results:
+                decided[r["sequence"]] = r["labels"][0]
+            return results
+
+        t0 = time.perf_counter()
+        claims = self.worker.extract_claims(text, recorded if nli_pipe else None, lang)
+        self.stage_seconds["claims"] += time.perf_counter() - t0
+        results = self.worker.claim_results(text, claims, ner_pipe, sentiment_pipe) if claims else []
+        return {
+            "labels": decided,
+            "claims": [r["claim"] for r in results],
+            "entities": sorted({(e["type"], e["start"], e["end"]) for r in results for e in r["entities"]}),
+            "sentiments": sorted({(r["claim"], cid, label) for r in results for cid, label, _ in r["sentiments"]}),
+        }
+
+# ===== BASELINE =====
+def _jaccard(a, b) -> float:
+    a, b = set(map(tuple, a)), set(map(tuple, b))
+    return len(a & b) / len(a | b) if a | b else 1.0
+
+def agreement(outputs: Dict[str, Dict], baseline: Dict[str, Dict]) -> Dict:
+    """egyezés a baseline-nal: NLI címke mondatonként, entitás / sentiment halmazok (Jaccard)"""
+    same = total = 0
+    ent, sent = [], []
+    mismatches = []
+    for aid, out in outputs.items():
+        base = baseline.get(aid)
+        if base is None:
+            continue
+        for sentence, label in base["labels"].items():
+            total += 1
+            now = out["labels"].get(sentence)
+            if now == label:
+                same += 1
+            else:
+                # None: a baseline mondata most nem ment NLI-ra (szegmentálás / előszűrő változás)
+                mismatches.append({"article": aid, "text": sentence[:120], "baseline": label, "now": now})
+        ent.append(_jaccard(out["entities"], base["entities"]))
+        sent.append(_jaccard(out["sentiments"], base["sentiments"]))
+    return {
+        "nli_labels": round(same / total, 4) if total else None,
+        "entities": round(sum(ent) / len(ent), 4) if ent else None,
+        "sentiments": round(sum(sent) / len(sent), 4) if sent else None,
+        "mismatches": mismatches,
+    }
+
+def main():
+    ap = argparse.ArgumentParser(description="Extract pipeline benchmark + baseline parity")
+    ap.add_argument("--config", default=CONFIG_FILE)
+    ap.add_argument("--fixtures", default=FIXTURES)
+    ap.add_argument("--companies", default=COMPANIES)
+    ap.add_argument("--models", action="store_true", help="valódi modellek a configból (alapból stub pipeline-ok)")
+    ap.add_argument("--baseline", default=None, help="alapból baseline.json (stub) / baseline_models.json (--models)")
+    ap.add_argument("--write-baseline", action="store_true", help="a mostani kimenet legyen a baseline")
+    ap.add_argument("--output", default=None, help="JSON eredmény fájlba (futások összehasonlításához)")
+    ap.add_argument("--repeat", type=int, default=1, help="korpusz ismétlése a stabilabb méréshez")
+    ap.add_argument("--no-prefilter", action="store_true", help="előszűrő nélkül (minden mondat NLI-ra megy)")
+    ap.add_argument("--threads", type=int, default=0, help="torch szálak (0 = alapértelmezett)")
+    ap.add_argument("--min-agreement", type=float, default=0.95)
+    ap.add_argument("--json", action="store_true", help="gépi olvasható kimenet")
+    args = ap.parse_args()
+    baseline_path = args.baseline or (BASELINE_MODELS if args.models else BASELINE)
+
+    torch = None
+    if args.models:
+        try:
+            import torch
+        except ImportError as e:
+            print(f"transformers/torch szükséges: {e}", file=sys.stderr)
+            return 2
+        if args.threads:
+            torch.set_num_threads(args.threads)
+
+    articles = load_jsonl(args.fixtures)
+    worker = import_worker(load_config(args.config))
+    pipe = Pipeline(worker, load_jsonl(args.companies), prefilter=not args.no_prefilter, models=args.models)
+    pipe.load()
+    rss_loaded = _peak_rss_mb()
+    pipe.run(articles[0]["text"], articles[0].get("lang"))  # warmup
+    pipe.reset()
+
+    outputs: Dict[str, Dict] = {}
+    t0 = time.perf_counter()
+    for _ in range(max(1, args.repeat)):
+        for a in articles:
+            outputs[str(a["id"])] = pipe.run(a["text"], a.get("lang"))
+    elapsed = time.perf_counter() - t0
+    n_articles = len(articles) * max(1, args.repeat)
+
+    baseline: Optional[Dict] = None
+    if args.write_baseline:
+        with open(baseline_path, "w", encoding="utf-8") as f:
+            json.dump({"models": pipe.models, "backend": pipe.backend, "articles": outputs},
+                      f, ensure_ascii=False, indent=2)
+            f.write("\n")
+    elif os.path.exists(baseline_path):
+        with open(baseline_path, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    summary = {
+        "models": pipe.models,
+        "backend": pipe.backend,
+        "prefilter": not args.no_prefilter,
+        "torch_threads": torch.get_num_threads() if torch else None,
+        "articles": n_articles,
+        "sentences": pipe.sentences,
+        "claims": sum(len(o["claims"]) for o in outputs.values()),
+        "elapsed_s": round(elapsed, 3),
+        "articles_per_s": round(n_articles / elapsed, 3) if elapsed else None,
+        "sentences_per_s": round(pipe.sentences / elapsed, 2) if elapsed else None,
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+        "models_rss_mb": round(rss_loaded, 1),
+        "stage_seconds": {k: round(v, 3) for k, v in pipe.stage_seconds.items()},
+        "agreement": agreement(outputs, baseline["articles"]) if baseline else None,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+
+    scores = [v for k, v in (summary["agreement"] or {}).items() if k != "mismatches" and v is not None]
+    failed = any(s < args.min_agreement for s in scores)
+
+    if args.json:
+        print(json.dumps(summary, ensure_ascii=False, indent=2))
+        return 1 if failed else 0
+
+    print(f"models: {pipe.models} ({pipe.backend}), torch threads: {summary['torch_threads']}")
+    print(f"{n_articles} articles, {pipe.sentences} sentences, {summary['claims']} claims in {elapsed:.2f}s")
+    print(f"  articles/s: {summary['articles_per_s']}, sentences/s: {summary['sentences_per_s']}")
+    print(f"  peak RSS: {summary['peak_rss_mb']} MB (after model load: {summary['models_rss_mb']} MB)")
+    print("  stage seconds: " + ", ".join(f"{k} {v}" for k, v in summary["stage_seconds"].items()))
+    if args.write_baseline:
+        print(f"baseline written: {baseline_path}")
+    elif summary["agreement"]:
+        ag = summary["agreement"]
+        print(f"agreement: NLI {ag['nli_labels']}, entities {ag['entities']}, sentiments {ag['sentiments']}")
+        for m in ag["mismatches"][:5]:
+            print(f"    ≠ {m['baseline']} / {m['now']}: {m['text']}")
+    else:
+        print(f"no baseline ({baseline_path}), run with --write-baseline first")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+bench_chunks.py
+Kérések/cikk összehasonlítás: régi karakter-alapú split_text vs. chunker.pack_chunks
+
+Futtatás:
+  python3 benchmarks/translate/bench_chunks.py [--tokenizer Helsinki-NLP/opus-mt-hu-en]
+      [--max-chars 900] [--max-tokens 400] [--json]
+"""
+
+import os
+import re
+import sys
+import json
+import argparse
+from typing import List
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+sys.path.insert(0, ROOT)
+
+import chunker
+
+FIXTURES = os.path.join(ROOT, "benchmarks", "fixtures", "articles.jsonl")
+MODEL_MAX_TOKENS = 512
+
+_SENT_SEP = re.compile(r'(?<=[\.\?\!…])\s+|\n+')
+def legacy_split(s: str, max_chars: int) -> List[str]:
+    """a translate_worker korábbi split_text-je (karakterszám, szó közepén vág)"""
+    s = (s or "").strip()
+    if not s:
+        return []
+    s = re.sub(r'[ \t]{2,}', ' ', s)
+    parts, buf = [], ""
+    for sent in _SENT_SEP.split(s):
+        if not sent:
+            continue
+        while len(sent) > max_chars:
+            parts.append(sent[:max_chars])
+            sent = sent[max_chars:]
+        if len(buf) + len(sent) + 1 <= max_chars:
+            buf = (buf + " " + sent).strip()
+        else:
+            if buf:
+                parts.append(buf)
+            buf = sent
+    if buf:
+        parts.append(buf)
+    return parts
+
+def load_fixtures(path: str) -> List[dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def _words_cut(parts: List[str], text: str) -> int:
+    """hány chunk-határ esik szó közepére (whitespace összevonva: a chunkok a sortörést szóközzel kötik)"""
+    cuts, pos = 0, 0
+    flat = " ".join(text.split())
+    for p in parts[:-1]:
+        p = " ".join(p.split())
+        found = flat.find(p, pos)
+        if found < 0:
+            continue
+        pos = found + len(p)
+        if 0 < pos < len(flat) and not flat[pos].isspace() and not flat[pos - 1].isspace():
+            cuts += 1
+    return cuts
+
+def main():
+    ap = argparse.ArgumentParser(description="Chunk packing benchmark (requests/article)")
+    ap.add_argument("--fixtures", default=FIXTURES)
+    ap.add_argument("--tokenizer", default="Helsinki-NLP/opus-mt-hu-en")
+    ap.add_argument("--max-chars", type=int, default=900)
+    ap.add_argument("--max-tokens", type=int, default=400)
+    ap.add_argument("--json", action="store_true", help="gépi olvasható kimenet")
+    args = ap.parse_args()
+
+    articles = load_fixtures(args.fixtures)
+    tok = chunker.load_tokenizer(args.tokenizer)
+    count = chunker.make_counter(tok)
+    limit = args.max_tokens if tok is not None else args.max_chars
+    mode = "tokens" if tok is not None else "chars"
+
+    rows = []
+    for a in articles:
+        old = legacy_split(a["text"], args.max_chars)
+        new = chunker.pack_chunks(a["text"], limit, count)
+        over = sum(1 for p in old if tok is not None and count(p) + 1 > MODEL_MAX_TOKENS)
+        rows.append({
+            "id": a["id"],
+            "before_requests": len(old),
+            "after_requests": len(new),
+            "before_mid_word_cuts": _words_cut(old, a["text"]),
+            "after_mid_word_cuts": _words_cut([c["text"] for c in new], a["text"]),
+            "before_over_limit": over,
+        })
+
+    n = len(rows) or 1
+    summary = {
+        "mode": mode,
+        "articles": len(rows),
+        "before_requests_per_article": round(sum(r["before_requests"] for r in rows) / n, 3),
+        "after_requests_per_article": round(sum(r["after_requests"] for r in rows) / n, 3),
+        "before_mid_word_cuts": sum(r["before_mid_word_cuts"] for r in rows),
+        "after_mid_word_cuts": sum(r["after_mid_word_cuts"] for r in rows),
+        "before_over_limit_chunks": sum(r["before_over_limit"] for r in rows),
+    }
+
+    if args.json:
+        print(json.dumps({"summary": summary, "articles": rows}, ensure_ascii=False, indent=2))
+        return 0
+
+    print(f"mode: {mode} (limit={limit})")
+    print(f"{'id':>4} {'before':>7} {'after':>6} {'cuts_b':>7} {'cuts_a':>7}")
+    for r in rows:
+        print(f"{r['id']:>4} {r['before_requests']:>7} {r['after_requests']:>6} "
+              f"{r['before_mid_word_cuts']:>7} {r['after_mid_word_cuts']:>7}")
+    print(f"requests/article: {summary['before_requests_per_article']} -> {summary['after_requests_per_article']}")
+    print(f"mid-word cuts:    {summary['before_mid_word_cuts']} -> {summary['after_mid_word_cuts']}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
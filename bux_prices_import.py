@@ -6,20 +6,17 @@ Letölti a legfrissebb napi árfolyamokat (OHLC) a BUX részvényekhez
 
 import pymysql
 import yfinance as yf
-import logging
 from datetime import datetime, timedelta
 import sys
 
+import log_setup
+
 # Logging beállítás
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('/tmp/bux_prices_import.log'),
-        logging.StreamHandler(sys.stdout)
-    ]
+logger = log_setup.setup_logging(
+    '/tmp/bux_prices_import.log',
+    stage='bux_prices',
+    fmt='%(asctime)s - %(levelname)s - %(message)s',
 )
-logger = logging.getLogger(__name__)
 
 # Adatbázis konfiguráció
 DB_CONFIG = {
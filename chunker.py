@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+chunker.py
+Mondat-alapú chunk-csomagolás fordításhoz, a modell valódi token limitjéig.
+- opus-mt tokenizer (ha elérhető), különben karakterszám
+- szó közepén soha nem vág
+- minden chunk megőrzi a mondatsorrendet (sent_start / sent_end)
+"""
+
+import re
+from typing import Callable, Dict, List, Optional
+
+import segmenter
+
+_WS = re.compile(r'\s+')
+
+# ===== TOKENIZER =====
+def load_tokenizer(model: str):
+    """opus-mt tokenizer betöltése (transformers + sentencepiece kell hozzá)"""
+    try:
+        from transformers import AutoTokenizer
+        return AutoTokenizer.from_pretrained(model)
+    except Exception:
+        return None
+
+def make_counter(tokenizer=None) -> Callable[[str], int]:
+    """hosszmérő függvény: tokenszám (speciális tokenek nélkül) vagy karakterszám"""
+    if tokenizer is None:
+        return len
+    def count(s: str) -> int:
+        return len(tokenizer(s, add_special_tokens=False)["input_ids"])
+    return count
+
+# ===== SPLIT =====
+def split_sentences(s: str, lang: Optional[str] = None) -> List[str]:
+    """mondatokra bontás (rövidítés-tudatos, segmenter)"""
+    s = (s or "").strip()
+    if not s:
+        return []
+    s = re.sub(r'[ \t]{2,}', ' ', s)
+    return segmenter.sentences(s, lang)
+
+def _split_long(sent: str, count: Callable[[str], int], limit: int) -> List[str]:
+    """túl hosszú mondat darabolása szóhatárokon"""
+    parts, buf, buf_len = [], [], 0
+    for word in _WS.split(sent):
+        if not word:
+            continue
+        w_len = count(word)
+        if buf and buf_len + w_len > limit:
+            parts.append(" ".join(buf))
+            buf, buf_len = [], 0
+        # egyetlen szó a limit felett: egyben marad, a szerver vágja le
+        buf.append(word)
+        buf_len += w_len
+    if buf:
+        parts.append(" ".join(buf))
+    return parts
+
+def pack_chunks(text: str, limit: int, count: Optional[Callable[[str], int]] = None,
+                lang: Optional[str] = None) -> List[Dict]:
+    """
+    Mondatok mohó csomagolása `limit` egységig (token vagy karakter).
+    Visszatérés: [{"text", "sent_start", "sent_end", "size"}], ahol sent_start/sent_end
+    a forrásmondatok indexe (zárt intervallum) - sorrendben.
+    """
+    count = count or len
+    sentences = split_sentences(text, lang)
+    chunks: List[Dict] = []
+    buf: List[str] = []
+    buf_size = 0
+    buf_start = 0
+
+    def flush(end_idx: int):
+        nonlocal buf, buf_size
+        if buf:
+            chunks.append({
+                "text": " ".join(buf),
+                "sent_start": buf_start,
+                "sent_end": end_idx,
+                "size": buf_size,
+            })
+        buf, buf_size = [], 0
+
+    for idx, sent in enumerate(sentences):
+        size = count(sent)
+        if size > limit:
+            flush(idx - 1)
+            for piece in _split_long(sent, count, limit):
+                chunks.append({
+                    "text": piece,
+                    "sent_start": idx,
+                    "sent_end": idx,
+                    "size": count(piece),
+                })
+            buf_start = idx + 1
+            continue
+        # +1: mondatok közti szóköz / határ token tartalék
+        if buf and buf_size + size + 1 > limit:
+            flush(idx - 1)
+        if not buf:
+            buf_start = idx
+        buf.append(sent)
+        buf_size += size + (1 if len(buf) > 1 else 0)
+
+    flush(len(sentences) - 1)
+    return chunks
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+claim_filter.py
+Olcsó kaszkád előszűrő a bart-large-mnli claim osztályozás elé
+- jellemzők: számok / pénz / százalék, közlő igék, követett cégnév, kérdés, idézet, byline / fotó
+  kredit, vélemény kifejezések, hossz
+- logisztikus regresszió a korábbi NLI döntéseken (nli_decisions tábla), a küszöböt a
+  recall cél adja: a tanító claimek legalább recall_target hányada átjut
+- tanítás előtt csak a biztos negatívok (kérdés, kredit / byline) esnek ki
+- explore_rate: a kiszűrt mondatok kis része mégis NLI-ra megy, hogy a tanítóhalmaz ne torzuljon
+"""
+
+import hashlib
+import json
+import math
+import random
+import re
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import pymysql
+
+DEFAULTS = {
+    "enabled": True,
+    "recall_target": 0.97,
+    "explore_rate": 0.05,
+    "min_samples": 500,
+    "max_samples": 20000,
+    "retrain_seconds": 3600,
+    "epochs": 30,
+    "learning_rate": 0.5,
+    "l2": 1e-4,
+}
+
+_DIGIT = re.compile(r"\d")
+_PERCENT = re.compile(r"\d\s*(%|százalék|percent|per cent)", re.IGNORECASE)
+_MONEY = re.compile(
+    r"[$€£]|\b(usd|eur|huf|ft|forint\w*|dollár\w*|euró\w*|dollars?|euros?|"
+    r"millió\w*|milliárd\w*|million|billion|bn|mrd)\b",
+    re.IGNORECASE,
+)
+_REPORT_VERB = re.compile(
+    r"\b(said|says|announced|reported|posted|rose|fell|increased|decreased|expects?|forecast|"
+    r"közölte|bejelentette|jelentette|közzétette|tájékoztatott|emelkedett|csökkent|nőtt|"
+    r"esett|zárt|várja|döntött|elfogadta)\b",
+    re.IGNORECASE,
+)
+_OPINION = re.compile(
+    r"\b(i think|i believe|we believe|should|must|might|perhaps|probably|opinion|"
+    r"szerintem|úgy gondolom|véleményem|talán|valószínűleg|kellene|lehet, hogy)\b",
+    re.IGNORECASE,
+)
+_CREDIT = re.compile(
+    r"^(photo|fotó|kép|forrás|source|by|írta|szerző)\s*:|"
+    r"\b(getty images|shutterstock|mti/|reuters/|afp/|ap photo)\b|"
+    r"\ball rights reserved\b|\bminden jog fenntartva\b",
+    re.IGNORECASE,
+)
+_QUOTE = re.compile(r"[\"“”„«»]")
+
+FEATURES = (
+    "bias", "digit", "percent", "money", "report_verb", "company",
+    "question", "quote", "opinion", "credit", "short", "long",
+)
+
+def features(sentence: str, company_lookup: Optional[Callable[[str], bool]] = None) -> List[float]:
+    """FEATURES sorrendű jellemző vektor"""
+    s = sentence.strip()
+    words = len(s.split())
+    return [
+        1.0,
+        1.0 if _DIGIT.search(s) else 0.0,
+        1.0 if _PERCENT.search(s) else 0.0,
+        1.0 if _MONEY.search(s) else 0.0,
+        1.0 if _REPORT_VERB.search(s) else 0.0,
+        1.0 if company_lookup and company_lookup(s) else 0.0,
+        1.0 if s.endswith("?") else 0.0,
+        1.0 if _QUOTE.search(s) else 0.0,
+        1.0 if _OPINION.search(s) else 0.0,
+        1.0 if _CREDIT.search(s) else 0.0,
+        1.0 if words < 8 else 0.0,
+        1.0 if words > 40 else 0.0,
+    ]
+
+def _hard_negative(x: List[float]) -> bool:
+    return bool(x[FEATURES.index("question")] or x[FEATURES.index("credit")])
+
+def _sigmoid(z: float) -> float:
+    if z < -30:
+        return 0.0
+    if z > 30:
+        return 1.0
+    return 1.0 / (1.0 + math.exp(-z))
+
+class CascadeFilter:
+    """NLI előszűrő; keep() dönt mondatonként, observe() gyűjti az NLI döntéseket tanításhoz"""
+
+    def __init__(self, cfg: Optional[Dict] = None,
+                 company_lookup: Optional[Callable[[str], bool]] = None):
+        cfg = dict(DEFAULTS, **(cfg or {}))
+        self.enabled = bool(cfg["enabled"])
+        self.recall_target = float(cfg["recall_target"])
+        self.explore_rate = float(cfg["explore_rate"])
+        self.min_samples = int(cfg["min_samples"])
+        self.max_samples = int(cfg["max_samples"])
+        self.retrain_seconds = float(cfg["retrain_seconds"])
+        self.epochs = int(cfg["epochs"])
+        self.learning_rate = float(cfg["learning_rate"])
+        self.l2 = float(cfg["l2"])
+        self.company_lookup = company_lookup
+        self.weights: Optional[List[float]] = None
+        self.threshold = 0.0
+        self._trained_at = 0.0
+        self._pending: List[Tuple[bytes, List[float], int]] = []
+        self._rng = random.Random()
+
+    # ----- döntés -----
+    def score(self, x: List[float]) -> float:
+        if self.weights is None:
+            return 1.0
+        return _sigmoid(sum(w * v for w, v in zip(self.weights, x)))
+
+    def keep(self, sentence: str) -> bool:
+        """True → NLI-ra megy"""
+        if not self.enabled:
+            return True
+        x = features(sentence, self.company_lookup)
+        if self.weights is None:
+            ok = not _hard_negative(x)
+        else:
+            ok = self.score(x) >= self.threshold
+        if not ok and self.explore_rate > 0 and self._rng.random() < self.explore_rate:
+            return True
+        return ok
+
+    # ----- tanítóadat -----
+    def observe(self, sentence: str, is_claim: bool):
+        """NLI döntés rögzítése (flush() írja ki)"""
+        h = hashlib.sha256(sentence.strip().lower().encode("utf-8")).digest()
+        self._pending.append((h, features(sentence, self.company_lookup), 1 if is_claim else 0))
+
+    def flush(self, conn) -> int:
+        rows, self._pending = self._pending, []
+        if not rows:
+            return 0
+        with conn.cursor() as cur:
+            cur.executemany(
+                "INSERT IGNORE INTO nli_decisions (sentence_hash, features, is_claim) VALUES (%s, %s, %s)",
+                [(h, json.dumps(x), y) for h, x, y in rows],
+            )
+        return len(rows)
+
+    # ----- tanítás -----
+    def fit(self, samples: Sequence[Tuple[List[float], int]]) -> bool:
+        """logisztikus regresszió (batch gradiens) + recall alapú küszöb"""
+        positives = sum(y for _, y in samples)
+        if len(samples) < self.min_samples or positives == 0 or positives == len(samples):
+            return False
+        n_feat = len(FEATURES)
+        w = [0.0] * n_feat
+        n = float(len(samples))
+        for _ in range(self.epochs):
+            grad = [0.0] * n_feat
+            for x, y in samples:
+                err = _sigmoid(sum(wi * xi for wi, xi in zip(w, x))) - y
+                for i in range(n_feat):
+                    grad[i] += err * x[i]
+            for i in range(n_feat):
+                w[i] -= self.learning_rate * (grad[i] / n + self.l2 * w[i])
+        pos_scores = sorted(
+            _sigmoid(sum(wi * xi for wi, xi in zip(w, x))) for x, y in samples if y
+        )
+        # a pozitívok (1 - recall_target) hányada eshet a küszöb alá
+        cut = int(math.floor((1.0 - self.recall_target) * len(pos_scores)))
+        self.threshold = pos_scores[min(cut, len(pos_scores) - 1)]
+        self.weights = w
+        return True
+
+    def maybe_retrain(self, conn) -> bool:
+        if not self.enabled or time.monotonic() - self._trained_at < self.retrain_seconds:
+            return False
+        self._trained_at = time.monotonic()
+        return self.fit(load_samples(conn, self.max_samples))
+
+    def snapshot(self) -> Dict:
+        return {
+            "trained": self.weights is not None,
+            "threshold": round(self.threshold, 4),
+            "weights": {f: round(w, 3) for f, w in zip(FEATURES, self.weights or [])},
+        }
+
+# ===== SCHEMA =====
+def ensure_nli_decisions_table(conn):
+    """nli_decisions tábla létrehozása, ha még nincs"""
+    with conn.cursor() as cur:
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS nli_decisions (
+          id BIGINT PRIMARY KEY AUTO_INCREMENT,
+          sentence_hash BINARY(32) NOT NULL,
+          features VARCHAR(255) NOT NULL,
+          is_claim TINYINT(1) NOT NULL,
+          created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+          UNIQUE KEY uq_sentence (sentence_hash)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+        """)
+
+def load_samples(conn, limit: int) -> List[Tuple[List[float], int]]:
+    """a legutóbbi NLI döntések (csak az aktuális jellemző készlettel egyező hosszúak)"""
+    with conn.cursor(pymysql.cursors.DictCursor) as cur:
+        cur.execute("SELECT features, is_claim FROM nli_decisions ORDER BY id DESC LIMIT %s", (limit,))
+        rows = cur.fetchall()
+    out = []
+    for r in rows:
+        try:
+            x = json.loads(r["features"])
+        except (TypeError, ValueError):
+            continue
+        if len(x) == len(FEATURES):
+            out.append((x, int(r["is_claim"])))
+    return out
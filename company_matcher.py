@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+company_matcher.py
+Cégnév felismerés Aho-Corasick automatával (egy menet a szövegen, az összes találat)
+- minták: cégnév (jogi forma nélkül is), ticker, kézi aliasok (config: extraction.company_aliases)
+- név / alias kis-nagybetű függetlenül; ticker csak nagybetűs, önálló tokenként az eredeti szövegben
+  (a köznévként is gyakori tickerek, pl. ALL, NOW, LOW, ANY, OPUS: TICKER_STOPWORDS, ezek csak névvel)
+- szóhatár: a találat előtt nem állhat betű / szám; utána szóvég, kötőjeles rag (OTP-nél),
+  ismert magyar rag (Richternek) vagy hasonult -val/-vel, -vá/-vé (Richterrel)
+- CompanyIndex: háttérszál építi újra, ha a stock_products tartalma változik
+"""
+
+import re
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import pymysql
+
+DEFAULT_REFRESH_SECONDS = 600
+MIN_TICKER_LEN = 3
+# köznévként is gyakori tickerek (S&P 500 / BÉT): tickerként nem, csak cégnévvel / aliasszal ismerjük fel
+TICKER_STOPWORDS = frozenset({
+    "ALL", "NOW", "LOW", "ANY", "OPUS", "KEY", "ARE", "CAT", "DAY", "FAST", "HAS", "WELL", "COST",
+    "TECH", "HUM", "BEN", "DOC", "PEAK", "BIG", "NEW", "ONE", "CAN", "FOR", "AIR", "SEE", "BALL",
+    "GOOD", "LIFE", "LOVE", "PLAY", "SAVE", "TRUE", "WORK", "JAZZ", "NAP", "VAN", "KIS", "NAGY",
+})
+
+# gyakori esetragok / névutó-szerű végződések (kisbetűvel); két rag egymás után is elfogadott
+HU_SUFFIXES = {
+    "t", "at", "et", "ot", "öt", "nak", "nek", "nál", "nél", "ban", "ben", "ba", "be",
+    "ból", "ből", "ról", "ről", "ra", "re", "on", "en", "ön", "n", "hoz", "hez", "höz",
+    "tól", "től", "ig", "ért", "ként", "kor", "val", "vel", "vá", "vé", "é", "ék", "éknél",
+    "ja", "je", "jé", "a", "e", "i", "s", "os", "es", "ös",
+}
+_ASSIMILATED = ("al", "el", "á", "é")
+_LEGAL_FORM = re.compile(r"\b(nyrt|zrt|kft|plc|inc|corp|ltd|ag|se)\.?\s*$", re.IGNORECASE)
+
+def _is_word(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+def base_name(name: str) -> str:
+    """cégnév jogi forma (Nyrt., Zrt., Plc.) nélkül"""
+    return _LEGAL_FORM.sub("", name.strip()).strip(" ,.")
+
+def _valid_suffix(rest: str, last: str) -> bool:
+    if not rest:
+        return True
+    if rest in HU_SUFFIXES:
+        return True
+    # hasonulás: Richter + rel, Mol + lal
+    if len(rest) > 1 and rest[0] == last and rest[1:] in _ASSIMILATED:
+        return True
+    for i in range(1, len(rest)):
+        if rest[:i] in HU_SUFFIXES and rest[i:] in HU_SUFFIXES:
+            return True
+    return False
+
+# ===== AHO-CORASICK =====
+class AhoCorasick:
+    """minták automatája (a kis-nagybetűt a hívó normalizálja); iter() (start, end, payload) hármasokat ad"""
+
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[int, object]]] = [[]]
+
+    def add(self, pattern: str, payload: object):
+        node = 0
+        for ch in pattern:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        self._out[node].append((len(pattern), payload))
+
+    def build(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                f = self._fail[node]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                cand = self._goto[f].get(ch, 0)
+                self._fail[nxt] = cand if cand != nxt else 0
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def iter(self, text: str):
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(ch, 0)
+            for length, payload in self._out[node]:
+                yield i + 1 - length, i + 1, payload
+
+# ===== MATCHER =====
+class CompanyMatcher:
+    """lefordított cégnév / alias (kisbetűs) és ticker (nagybetűs, kis-nagybetű érzékeny) automata"""
+
+    def __init__(self, companies: Iterable[Dict], aliases: Optional[Dict[str, Sequence[str]]] = None):
+        self.automaton = AhoCorasick()
+        self.tickers = AhoCorasick()
+        self.names: Dict[int, str] = {}
+        aliases = {k.lower(): v for k, v in (aliases or {}).items()}
+        patterns = 0
+        for c in companies:
+            cid = int(c["id"])
+            name = (c.get("company_name") or "").strip()
+            ticker = (c.get("ticker") or "").strip()
+            self.names[cid] = name
+            forms = {name.lower(), base_name(name).lower()}
+            for key in (ticker.lower(), name.lower(), str(cid)):
+                forms.update(a.lower() for a in aliases.get(key, ()))
+            for form in forms:
+                if form:
+                    self.automaton.add(form, cid)
+                    patterns += 1
+            ticker = ticker.upper()
+            if len(ticker) >= MIN_TICKER_LEN and ticker not in TICKER_STOPWORDS:
+                self.tickers.add(ticker, cid)
+                patterns += 1
+        self.automaton.build()
+        self.tickers.build()
+        self.patterns = patterns
+
+    def find_all(self, text: str) -> List[Dict]:
+        """összes (nem átfedő, bal-leghosszabb) találat: company_id, mention, start, end"""
+        text = text or ""
+        low = text.lower()
+        if len(low) != len(text):
+            low = "".join(ch.lower() if len(ch.lower()) == 1 else ch for ch in text)
+        n = len(low)
+        hits = []
+        # ticker: az eredeti szövegben, önálló token (OTP-nél igen, OTPnek / FOTP nem)
+        for start, end, cid in self.tickers.iter(text):
+            if (start > 0 and _is_word(text[start - 1])) or (end < n and _is_word(text[end])):
+                continue
+            hits.append((start, -(end - start), end, cid))
+        for start, end, cid in self.automaton.iter(low):
+            if start > 0 and _is_word(low[start - 1]):
+                continue
+            if end < n and _is_word(low[end]) and _is_word(low[end - 1]):
+                stop = end
+                while stop < n and _is_word(low[stop]):
+                    stop += 1
+                if not _valid_suffix(low[end:stop], low[end - 1]):
+                    continue
+            hits.append((start, -(end - start), end, cid))
+        hits.sort()
+        out, last_end = [], -1
+        for start, _, end, cid in hits:
+            if start < last_end:
+                continue
+            out.append({"company_id": cid, "mention": text[start:end], "start": start, "end": end})
+            last_end = end
+        return out
+
+    def mentions(self, text: str) -> bool:
+        return bool(self.find_all(text))
+
+# ===== INDEX (háttér újraépítés) =====
+FINGERPRINT_SQL = """
+    SELECT COUNT(*) AS n,
+           COALESCE(SUM(CRC32(CONCAT_WS('|', id, ticker, company_name))), 0) AS crc
+    FROM stock_products WHERE status = 'active'
+"""
+
+def load_companies(conn) -> List[Dict]:
+    with conn.cursor(pymysql.cursors.DictCursor) as cur:
+        cur.execute("SELECT id, company_name, ticker FROM stock_products WHERE status = 'active'")
+        return list(cur.fetchall())
+
+def fingerprint(conn) -> Tuple[int, int]:
+    with conn.cursor(pymysql.cursors.DictCursor) as cur:
+        cur.execute(FINGERPRINT_SQL)
+        row = cur.fetchone() or {}
+    return int(row.get("n") or 0), int(row.get("crc") or 0)
+
+class CompanyIndex:
+    """az aktuális CompanyMatcher; a háttérszál saját kapcsolattal figyeli a stock_products-ot"""
+
+    def __init__(self, aliases: Optional[Dict[str, Sequence[str]]] = None,
+                 refresh_seconds: float = DEFAULT_REFRESH_SECONDS):
+        self.aliases = aliases or {}
+        self.refresh_seconds = refresh_seconds
+        self.matcher = CompanyMatcher([], self.aliases)
+        self._fingerprint: Optional[Tuple[int, int]] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def refresh(self, conn) -> bool:
+        """újraépítés, ha változott a stock_products; True, ha történt csere"""
+        fp = fingerprint(conn)
+        if fp == self._fingerprint:
+            return False
+        self.matcher = CompanyMatcher(load_companies(conn), self.aliases)
+        self._fingerprint = fp
+        return True
+
+    def start(self, connect: Callable[[], object], log: Optional[Callable[[str], None]] = None):
+        """háttérszál indítása (connect: új DB kapcsolatot ad)"""
+        def loop():
+            conn = None
+            while not self._stop.wait(self.refresh_seconds):
+                try:
+                    if conn is None:
+                        conn = connect()
+                    if self.refresh(conn) and log:
+                        log(f"🏢 Company matcher rebuilt: {len(self.matcher.names)} companies, {self.matcher.patterns} patterns")
+                except Exception as e:
+                    if log:
+                        log(f"⚠️ Company matcher refresh error: {e}")
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+                    conn = None
+        self._thread = threading.Thread(target=loop, name="company-matcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def find_all(self, text: str) -> List[Dict]:
+        return self.matcher.find_all(text)
+
+    def mentions(self, text: str) -> bool:
+        return self.matcher.mentions(text)
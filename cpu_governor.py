@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+cpu_governor.py
+Adaptív CPU-budget szabályozó a workerekhez (AIMD)
+- saját processz (+ gyerekek) vagy a saját cgroup CPU használata, blokkolás nélkül
+- alatta: additív növelés (batch méret, párhuzamosság), felette: multiplikatív csökkentés
+- csak a minimumon is túllépve tart rövid, arányos szünetet (a régi fix 30/60 s helyett)
+"""
+
+import os
+import time
+from typing import Dict, Optional
+
+import psutil
+
+CGROUP_ROOT = "/sys/fs/cgroup"
+
+# ===== MÉRÉS =====
+def _own_cgroup_stat() -> Optional[str]:
+    """a saját cgroup (v2) cpu.stat útvonala"""
+    try:
+        with open("/proc/self/cgroup", "r", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("0::"):
+                    path = os.path.join(CGROUP_ROOT, line.strip()[3:].lstrip("/"), "cpu.stat")
+                    return path if os.path.exists(path) else None
+    except OSError:
+        pass
+    return None
+
+def _read_cgroup_usage_usec(path: str) -> Optional[int]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("usage_usec"):
+                    return int(line.split()[1])
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+class CpuSampler:
+    """nem blokkoló CPU% mérés (100% = egy teljes mag), az előző mintavétel óta"""
+
+    def __init__(self, source: str = "process"):
+        self.source = source
+        self.cgroup_stat = _own_cgroup_stat() if source == "cgroup" else None
+        if source == "cgroup" and not self.cgroup_stat:
+            self.source = "process"
+        self.proc = psutil.Process()
+        self._last_wall = time.monotonic()
+        self._last_cpu = self._cpu_seconds()
+
+    def _cpu_seconds(self) -> float:
+        if self.cgroup_stat:
+            usec = _read_cgroup_usage_usec(self.cgroup_stat)
+            if usec is not None:
+                return usec / 1e6
+        total = 0.0
+        try:
+            t = self.proc.cpu_times()
+            total += t.user + t.system
+            for child in self.proc.children(recursive=True):
+                try:
+                    ct = child.cpu_times()
+                    total += ct.user + ct.system
+                except (psutil.NoSuchProcess, psutil.AccessDenied):
+                    continue
+        except psutil.Error:
+            pass
+        return total
+
+    def sample(self) -> float:
+        now = time.monotonic()
+        cpu = self._cpu_seconds()
+        wall = now - self._last_wall
+        used = cpu - self._last_cpu
+        self._last_wall, self._last_cpu = now, cpu
+        if wall <= 0 or used < 0:
+            return 0.0
+        return 100.0 * used / wall
+
+# ===== GOVERNOR =====
+class CpuGovernor:
+    """AIMD szabályozó: batch_size és concurrency követi a CPU_LIMIT-et"""
+
+    def __init__(self, limit: float, batch_size: int, min_batch: int = 1,
+                 max_concurrency: int = 1, source: str = "process",
+                 min_interval: float = 1.0, max_pause: float = 30.0):
+        self.limit = float(limit)
+        self.max_batch = max(1, int(batch_size))
+        self.min_batch = max(1, min(int(min_batch), self.max_batch))
+        self.batch_size = self.max_batch
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.concurrency = 1
+        self.min_interval = min_interval
+        self.max_pause = max_pause
+        self.sampler = CpuSampler(source)
+        self.cpu = 0.0
+        self._last_update = 0.0
+        self.counters = {"increase": 0, "decrease": 0, "pause": 0, "pause_seconds": 0.0}
+
+    def update(self) -> float:
+        """mintavétel + AIMD lépés (legfeljebb min_interval-onként)"""
+        now = time.monotonic()
+        if now - self._last_update < self.min_interval:
+            return self.cpu
+        self._last_update = now
+        self.cpu = self.sampler.sample()
+        if self.cpu > self.limit:
+            new_batch = max(self.min_batch, self.batch_size // 2)
+            new_conc = max(1, self.concurrency // 2)
+            if (new_batch, new_conc) != (self.batch_size, self.concurrency):
+                self.counters["decrease"] += 1
+            self.batch_size, self.concurrency = new_batch, new_conc
+        else:
+            new_batch = min(self.max_batch, self.batch_size + max(1, self.max_batch // 10))
+            new_conc = min(self.max_concurrency, self.concurrency + 1)
+            if (new_batch, new_conc) != (self.batch_size, self.concurrency):
+                self.counters["increase"] += 1
+            self.batch_size, self.concurrency = new_batch, new_conc
+        return self.cpu
+
+    def over_limit(self) -> bool:
+        return self.cpu > self.limit
+
+    def throttle(self) -> float:
+        """rövid, túllépéssel arányos szünet, ha már a minimumon vagyunk; visszaadja a szünet hosszát"""
+        self.update()
+        if not self.over_limit() or self.batch_size > self.min_batch or self.concurrency > 1:
+            return 0.0
+        pause = min(self.max_pause, max(1.0, self.min_interval * self.cpu / max(self.limit, 1.0)))
+        self.counters["pause"] += 1
+        self.counters["pause_seconds"] += pause
+        time.sleep(pause)
+        return pause
+
+    def snapshot(self) -> Dict:
+        """aktuális döntések (metrikákhoz / loghoz)"""
+        return {
+            "cpu_percent": round(self.cpu, 1),
+            "cpu_limit": self.limit,
+            "cpu_source": self.sampler.source,
+            "batch_size": self.batch_size,
+            "concurrency": self.concurrency,
+            **self.counters,
+        }
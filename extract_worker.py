@@ -12,14 +12,32 @@ import time
 import re
 import hashlib
 import pymysql
-import psutil
 import signal
+import logging
+import multiprocessing
+import multiprocessing.connection
 import sys
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Optional, Tuple
 
+import article_ner
+import claim_filter
+import company_matcher
+import cpu_governor
+import log_setup
+import inference_cache
+import mention_sentiment
+import model_backend
+import near_dup
+import nli_batch
+import pipeline_events
+import priority
+import prom_metrics
+import token_batching
+import work_queue
+
 # ===== CONFIG =====
-CONFIG_FILE = "/opt/newscred/extract_config.json"
+CONFIG_FILE = os.environ.get("EXTRACT_CONFIG", "/opt/newscred/extract_config.json")
 with open(CONFIG_FILE, "r", encoding="utf-8") as f:
     CONFIG = json.load(f)
 
@@ -28,10 +46,49 @@ HF_TOKEN = CONFIG["huggingface"]["token"]
 NLI_MODEL = CONFIG["extraction"]["models"]["nli"]
 NER_MODEL = CONFIG["extraction"]["models"]["ner"]
 SENTIMENT_MODEL = CONFIG["extraction"]["models"]["sentiment"]
+MODEL_BACKEND = CONFIG["extraction"].get("backend", model_backend.BACKEND_TORCH)
+ONNX_CACHE_DIR = CONFIG["extraction"].get("onnx_cache_dir", model_backend.DEFAULT_CACHE_DIR)
+SNAPSHOT_DIR = CONFIG["extraction"].get("snapshot_dir")
+LAZY_MODELS = set(CONFIG["extraction"].get("lazy_models", []))
+MODEL_IDLE_UNLOAD = CONFIG["extraction"].get("model_idle_unload_seconds", 0)
+CACHE_CFG = CONFIG["extraction"].get("inference_cache", {})
+CACHE_ENABLED = CACHE_CFG.get("enabled", True)
+CACHE_TTL_DAYS = CACHE_CFG.get("ttl_days", inference_cache.DEFAULT_TTL_DAYS)
+CACHE_MAX_ROWS = CACHE_CFG.get("max_rows", inference_cache.DEFAULT_MAX_ROWS)
+CACHE_PRUNE_INTERVAL = CACHE_CFG.get("prune_interval_seconds", inference_cache.DEFAULT_PRUNE_INTERVAL_SECONDS)
+if SNAPSHOT_DIR:
+    # rögzített helyi snapshotok: nincs hub lekérdezés induláskor
+    os.environ.setdefault("HF_HUB_OFFLINE", "1")
+    os.environ.setdefault("TRANSFORMERS_OFFLINE", "1")
 CPU_LIMIT = CONFIG["performance"]["cpu_limit_percent"]
 BATCH_SIZE = CONFIG["performance"]["batch_size_prod"]
-SLEEP = CONFIG["performance"]["sleep_between_requests"]
+MIN_BATCH_SIZE = CONFIG["performance"].get("min_batch_size", 1)
+MAX_CONCURRENCY = CONFIG["performance"].get("max_concurrency", 1)
+CPU_SOURCE = CONFIG["performance"].get("cpu_source", "process")
+WORKERS = CONFIG["performance"].get("workers", 1)
 BATCH_SLEEP = CONFIG["performance"]["sleep_between_batches"]
+NLI_BATCH_SIZE = CONFIG["performance"].get("nli_batch_size", nli_batch.DEFAULT_BATCH_SIZE)
+MAX_BATCH_TOKENS = CONFIG["performance"].get("max_batch_tokens", token_batching.DEFAULT_MAX_TOKENS)
+NER_WINDOW = CONFIG["performance"].get("ner_window_chars", article_ner.DEFAULT_WINDOW_CHARS)
+NER_OVERLAP = CONFIG["performance"].get("ner_overlap_chars", article_ner.DEFAULT_OVERLAP_CHARS)
+SENTIMENT_WINDOW = CONFIG["performance"].get("sentiment_window_chars", mention_sentiment.DEFAULT_WINDOW_CHARS)
+SENTIMENT_BATCH_SIZE = CONFIG["performance"].get("sentiment_batch_size", mention_sentiment.DEFAULT_BATCH_SIZE)
+QUEUE_CFG = CONFIG.get("queue", {})
+LEASE_SECONDS = QUEUE_CFG.get("lease_seconds", work_queue.DEFAULT_LEASE_SECONDS)
+ENQUEUE_WINDOW = QUEUE_CFG.get("enqueue_window", 500)
+MAX_ATTEMPTS = QUEUE_CFG.get("max_attempts", work_queue.DEFAULT_MAX_ATTEMPTS)
+RETRY_BACKOFF = QUEUE_CFG.get("retry_backoff_seconds", work_queue.DEFAULT_BACKOFF_SECONDS)
+RETRY_BACKOFF_MAX = QUEUE_CFG.get("retry_backoff_max_seconds", work_queue.DEFAULT_BACKOFF_MAX_SECONDS)
+DEDUP_ENABLED = CONFIG.get("dedup", {}).get("enabled", True)
+DEDUP_GRACE = CONFIG.get("dedup", {}).get("canonical_grace_minutes", near_dup.DEFAULT_CANONICAL_GRACE_MINUTES)
+EVENTS_CFG = CONFIG.get("events", {})
+IDLE_WAIT = EVENTS_CFG.get("idle_wait_seconds", 120)
+POLL_INTERVAL = EVENTS_CFG.get("poll_interval_seconds", pipeline_events.DEFAULT_POLL_INTERVAL)
+PRIORITY_CFG = CONFIG.get("priority", {})
+AGING_PER_HOUR = PRIORITY_CFG.get("aging_per_hour", work_queue.DEFAULT_AGING_PER_HOUR)
+METRICS_CFG = CONFIG.get("metrics", {})
+METRICS_PORT = METRICS_CFG.get("port", 9102)
+METRICS_HOST = METRICS_CFG.get("host", "127.0.0.1")
 LOG_DIR = CONFIG["logging"]["log_dir"]
 LOG_FILE = os.path.join(LOG_DIR, CONFIG["logging"]["log_file_worker"])
 
@@ -43,25 +100,49 @@ NLI_TARGET = CONFIG["extraction"]["nli_target_labels"]
 
 # ===== GLOBAL =====
 RUNNING = True
+STARTED_AT = time.monotonic()
+FIRST_CLAIM_AT = None
+STAGE = "extract"
+OWNER = work_queue.make_owner(STAGE)
+GOVERNOR = None
+SCORER = priority.PriorityScorer(PRIORITY_CFG, CONFIG["extraction"].get("company_aliases"))
+COMPANIES = company_matcher.CompanyIndex(
+    CONFIG["extraction"].get("company_aliases"),
+    CONFIG["extraction"].get("company_refresh_seconds", company_matcher.DEFAULT_REFRESH_SECONDS),
+)
+CACHE = inference_cache.InferenceCache(
+    CACHE_CFG.get("memory_items", inference_cache.DEFAULT_MEMORY_ITEMS),
+    persist=CACHE_CFG.get("persist", True),
+    on_lookup=lambda task, memory, db, miss: (
+        prom_metrics.INFERENCE_CACHE.inc(memory, stage=STAGE, task=task, result="memory"),
+        prom_metrics.INFERENCE_CACHE.inc(db, stage=STAGE, task=task, result="db"),
+        prom_metrics.INFERENCE_CACHE.inc(miss, stage=STAGE, task=task, result="miss"),
+    ),
+)
+CASCADE = claim_filter.CascadeFilter(CONFIG["extraction"].get("prefilter"), company_lookup=COMPANIES.mentions)
+WAKE_EVENTS = [pipeline_events.ARTICLE_INGESTED, pipeline_events.TRANSLATED]
+
+CHILDREN: Dict[int, int] = {}  # supervisor módban: pid → worker index
 
 def signal_handler(sig, frame):
     global RUNNING
     log("🛑 SIGTERM received, shutting down...")
     RUNNING = False
+    for pid in list(CHILDREN):
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except OSError:
+            pass
 
 signal.signal(signal.SIGTERM, signal_handler)
 signal.signal(signal.SIGINT, signal_handler)
 
 # ===== LOGGING =====
-def log(msg: str):
-    ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    line = f"[{ts}] {msg}"
-    print(line, flush=True)
-    try:
-        with open(LOG_FILE, "a", encoding="utf-8") as f:
-            f.write(line + "\n")
-    except Exception as e:
-        print(f"Log write error: {e}", flush=True)
+LOGGER = logging.getLogger(STAGE)
+
+def log(msg: str, level: int = logging.INFO, **fields):
+    """nem blokkoló log (log_setup háttérszál); fields: pl. article_id a JSON sorokhoz"""
+    LOGGER.log(level, msg, extra=fields or None)
 
 # ===== UTIL =====
 def normalize_for_hash(s: str) -> str:
@@ -73,146 +154,155 @@ def make_claim_hash(article_id: int, claim_text: str) -> bytes:
     base = f"{article_id}|{normalize_for_hash(claim_text)}"
     return hashlib.sha256(base.encode("utf-8")).digest()
 
-def get_cpu_percent() -> float:
-    """aktuális CPU% (www-data processz)"""
+# ===== MODELS =====
+def set_torch_threads(n: int):
+    """torch intra-op szálak a governor párhuzamossága szerint"""
     try:
-        for proc in psutil.process_iter(['pid', 'name', 'username']):
-            try:
-                if proc.info.get('username') == 'www-data':
-                    return proc.cpu_percent(interval=0.1)
-            except (psutil.NoSuchProcess, psutil.AccessDenied):
-                continue
-    except Exception as e:
-        log(f"⚠️ CPU check error: {e}")
-    return 0
-
-def can_continue() -> bool:
-    """40% alatt van-e?"""
-    cpu = get_cpu_percent()
-    return cpu < CPU_LIMIT
+        import torch
+        if torch.get_num_threads() != n:
+            torch.set_num_threads(n)
+    except Exception:
+        pass
 
-# ===== MODELS =====
 def load_models():
-    """Modellek betöltése (singleton-szerűen)"""
-    log("📥 Loading models...")
-    try:
-        from transformers import pipeline
-        
-        nli_pipe = pipeline("zero-shot-classification", model=NLI_MODEL, device=-1)
-        log("✅ NLI model loaded")
-        
-        ner_pipe = pipeline("ner", model=NER_MODEL, device=-1, aggregation_strategy="simple")
-        log("✅ NER model loaded")
-        
-        sentiment_pipe = pipeline("sentiment-analysis", model=SENTIMENT_MODEL, device=-1)
-        log("✅ Sentiment model loaded")
-        
-        return nli_pipe, ner_pipe, sentiment_pipe
-    except Exception as e:
-        log(f"❌ Model loading error: {e}")
-        return None, None, None
+    """
+    Modellek betöltése párhuzamos szálakon (a snapshot könyvtárból, ha van).
+    A lazy_models (ner, sentiment) első használatkor töltődnek, és üresjáratban felszabadulnak;
+    supervisor módban mindent előre töltünk, hogy a gyerekek közösen használják.
+    """
+    log(f"📥 Loading models (backend: {MODEL_BACKEND}, snapshot: {SNAPSHOT_DIR or 'hub cache'})...")
+    specs = {
+        "NLI": ("zero-shot-classification", NLI_MODEL, {}),
+        "NER": ("ner", NER_MODEL, {"aggregation_strategy": "simple"}),
+        "Sentiment": ("sentiment-analysis", SENTIMENT_MODEL, {}),
+    }
+    lazy = set() if WORKERS > 1 else {n for n in specs if n.lower() in LAZY_MODELS and n != "NLI"}
+    
+    def load(name):
+        task, model, kwargs = specs[name]
+        t0 = time.perf_counter()
+        pipe, used = model_backend.load_pipeline(
+            task, model, MODEL_BACKEND, ONNX_CACHE_DIR, HF_TOKEN, log=log,
+            snapshot_dir=SNAPSHOT_DIR, **kwargs,
+        )
+        elapsed = time.perf_counter() - t0
+        prom_metrics.MODEL_LOAD_SECONDS.set(elapsed, stage=STAGE, model=str(model))
+        log(f"✅ {name} model loaded ({used}, {elapsed:.1f}s)")
+        return pipe
+    
+    pipes = {}
+    eager = [n for n in specs if n not in lazy]
+    with ThreadPoolExecutor(max_workers=len(eager), thread_name_prefix="model-load") as pool:
+        futures = {n: pool.submit(load, n) for n in eager}
+        for name, fut in futures.items():
+            try:
+                pipes[name] = fut.result()
+            except Exception as e:
+                log(f"❌ {name} model loading error: {e}", logging.ERROR)
+                pipes[name] = None
+    for name in lazy:
+        pipes[name] = model_backend.LazyPipeline(name, lambda n=name: load(n), MODEL_IDLE_UNLOAD, log)
+        log(f"💤 {name} model: lazy (loads on first use)")
+    
+    # inference cache minden modell hívás előtt (cache találatnál a lazy modell be sem töltődik)
+    if CACHE_ENABLED:
+        CACHE.log = log
+        for name, (task, model, _) in specs.items():
+            if pipes[name] is not None:
+                version = model_backend.version(model, MODEL_BACKEND, SNAPSHOT_DIR)
+                pipes[name] = inference_cache.CachedPipeline(pipes[name], CACHE, task, version)
+        log(f"🗃️ Inference cache: {CACHE.memory_items} items in memory, persist={CACHE.persist}")
+    
+    startup = time.monotonic() - STARTED_AT
+    prom_metrics.STARTUP_SECONDS.set(startup, stage=STAGE, phase="models_ready")
+    log(f"⏱️ Models ready in {startup:.1f}s")
+    return pipes["NLI"], pipes["NER"], pipes["Sentiment"]
+
+def unload_idle_models(*pipes):
+    """üresjáratban a lazy modellek elengedése"""
+    for p in pipes:
+        if isinstance(p, inference_cache.CachedPipeline):
+            p = p.pipe
+        if isinstance(p, model_backend.LazyPipeline):
+            p.maybe_unload()
 
 # ===== NLI - CLAIM DETECTION =====
-def extract_claims(text: str, nli_pipe) -> List[str]:
-    """Mondatokból tényeket nyer ki (NLI)"""
+def extract_claims(text: str, nli_pipe, lang: Optional[str] = None) -> Optional[List[Tuple[int, int, str]]]:
+    """
+    Mondatokból tényeket nyer ki (NLI, a cikk összes jelölt mondata batchelve): (start, end, claim).
+    None, ha valamelyik NLI batch hibára futott (a cikk újrapróbálandó, nem "nincs claim").
+    """
     if not nli_pipe:
         return []
     
-    sent_split = re.compile(r"(?<=[.!?…])\s+")
-    sentences = sent_split.split(text)
-    claims = []
+    # rövidítés-tudatos mondatokra bontás (segmenter), a nyelv rövidítéslistájával
+    # kaszkád: csak az ígéretes mondatok mennek a drága modellre
+    spans = nli_batch.candidate_spans(text, lang)
+    kept = [sp for sp in spans if CASCADE.keep(sp[2])]
+    prom_metrics.SENTENCES.inc(len(spans) - len(kept), stage=STAGE, result="skipped")
+    if not kept:
+        return []
+    sentences = [s for _, _, s in kept]
     
-    for s in sentences:
-        s_clean = s.strip()
-        
-        if len(s_clean.split()) < 5 or len(s_clean) > 400:
-            continue
-        
-        try:
-            result = nli_pipe(
-                s_clean,
-                candidate_labels=NLI_LABELS,
-                multi_label=False,
-            )
-            
-            top_label = result.get("labels", ["opinion"])[0]
-            if top_label in NLI_TARGET:
-                claims.append(s_clean)
-        except Exception as e:
-            log(f"⚠️ NLI error: {e}")
-            continue
-        
-        time.sleep(SLEEP)
+    with prom_metrics.STAGE_SECONDS.time(stage=STAGE, step="nli"):
+        labels = nli_batch.classify(
+            nli_pipe, sentences, NLI_LABELS, NLI_BATCH_SIZE,
+            on_error=lambda e: log(f"⚠️ NLI error: {e}"), max_tokens=MAX_BATCH_TOKENS,
+        )
+    if any(label is None for label in labels):
+        return None
+    prom_metrics.SENTENCES.inc(len(sentences), stage=STAGE, result="classified")
     
+    claims = []
+    for span, label in zip(kept, labels):
+        CASCADE.observe(span[2], label in NLI_TARGET)
+        if label in NLI_TARGET:
+            claims.append(span)
     return claims
 
 # ===== NER - ENTITY EXTRACTION =====
 def extract_entities(text: str, ner_pipe) -> List[Dict]:
-    """Entitások kinyerése (NER)"""
+    """Entitások kinyerése (NER) a teljes cikkre, csúszó ablakokban; cikk-relatív pozíciók"""
     if not ner_pipe:
         return []
     
-    try:
-        entities_raw = ner_pipe(text)
-        entities = []
-        
-        for e in entities_raw:
-            entity_type = e.get("entity_group", "O")
-            
-            if entity_type not in ENTITY_TYPES:
-                continue
-            
-            entities.append({
-                "type": entity_type,
-                "text": e.get("word", "").strip(),
-                "score": round(e.get("score", 0), 3),
-                "start": e.get("start", 0),
-                "end": e.get("end", 0)
-            })
-        
-        return entities
-    except Exception as e:
-        log(f"⚠️ NER error: {e}")
-        return []
+    with prom_metrics.STAGE_SECONDS.time(stage=STAGE, step="ner"):
+        return article_ner.run(
+            ner_pipe, text, ENTITY_TYPES, NER_WINDOW, NER_OVERLAP,
+            on_error=lambda e: log(f"⚠️ NER error: {e}"), max_tokens=MAX_BATCH_TOKENS,
+        )
 
 # ===== SENTIMENT - COMPANY SENTIMENT =====
-def get_db_companies(conn) -> Dict[str, int]:
-    """BÉT cégek lekérése"""
-    q = "SELECT id, company_name FROM stock_products WHERE status = 'active'"
-    with conn.cursor(pymysql.cursors.DictCursor) as cur:
-        cur.execute(q)
-        rows = cur.fetchall()
-    
-    companies = {}
-    for r in rows:
-        companies[r["company_name"].lower()] = r["id"]
-    
-    return companies
-
-def find_company_in_claim(claim_text: str, companies: Dict) -> Optional[Tuple[str, int]]:
-    """Cégnév keresése"""
-    claim_lower = claim_text.lower()
-    
-    for company_name, company_id in companies.items():
-        if company_name in claim_lower:
-            return (company_name, company_id)
+def analyze_company_sentiments(claims: List[str], sentiment_pipe) -> List[List[Tuple]]:
+    """Cég-sentiment a cikk összes claimjére, hossz szerint batchelve (említés körüli ablakokon)"""
+    if not sentiment_pipe:
+        return [[] for _ in claims]
     
-    return None
+    with prom_metrics.STAGE_SECONDS.time(stage=STAGE, step="sentiment"):
+        return mention_sentiment.company_sentiments(
+            sentiment_pipe, claims, COMPANIES.find_all, SENTIMENT_WINDOW, SENTIMENT_BATCH_SIZE,
+            on_error=lambda e: log(f"⚠️ Sentiment error: {e}"), max_tokens=MAX_BATCH_TOKENS,
+        )
 
-def analyze_sentiment(text: str, sentiment_pipe) -> Optional[str]:
-    """Sentiment analízis"""
-    if not sentiment_pipe or len(text) > 512:
-        return None
+def claim_results(text: str, claims: List[Tuple[int, int, str]], ner_pipe, sentiment_pipe) -> List[Dict]:
+    """Claimenkénti eredmény sorok: claim, a tartományába eső entitások, cég-sentimentek"""
+    # NER egyszer, a teljes cikkre; a claimek a saját tartományuk entitásait kapják
+    article_entities = extract_entities(text, ner_pipe)
     
-    try:
-        result = sentiment_pipe(text)
-        if result:
-            label = result[0].get("label", "NEUTRAL").lower()
-            return "positive" if label == "positive" else ("negative" if label == "negative" else "neutral")
-    except Exception as e:
-        log(f"⚠️ Sentiment error: {e}")
+    # Sentiment (csak DB cégeknél): cikkenként egy batchelt hívás, cégenként külön sor
+    if SENTIMENT_ONLY_DB and ner_pipe:
+        sentiments = analyze_company_sentiments([c[2] for c in claims], sentiment_pipe)
+    else:
+        sentiments = [[] for _ in claims]
     
-    return None
+    results = []
+    for (claim_start, claim_end, claim_text), claim_sentiments in zip(claims, sentiments):
+        results.append({
+            "claim": claim_text,
+            "entities": article_ner.within(article_entities, claim_start, claim_end),
+            "sentiments": claim_sentiments,
+        })
+    return results
 
 # ===== DATABASE =====
 def db_connect():
@@ -228,195 +318,452 @@ def db_connect():
         autocommit=True,
     )
 
+PENDING_SQL = """
+    SELECT a.id AS article_id
+    FROM article_texts t
+    JOIN articles a ON a.id = t.article_id
+    LEFT JOIN claims c ON c.article_id = a.id
+    WHERE c.article_id IS NULL 
+      AND a.status = 0
+      AND t.text IS NOT NULL 
+      AND LENGTH(t.text) > %s
+      AND NOT {awaits_canonical}
+      AND {not_queued}
+    ORDER BY a.id DESC
+    LIMIT %s
+""".format(awaits_canonical=near_dup.awaits_canonical("a.id"), not_queued=work_queue.not_queued("a.id"))
+
 def get_pending_articles(conn, limit: int = 50) -> List[Dict]:
-    """feldolgozandó cikkek"""
-    q = """
-        SELECT a.id AS article_id, t.text as body
+    """feldolgozandó cikkek lefoglalása a work_items sorból"""
+    if DEDUP_ENABLED:
+        reused = copy_duplicate_claims(conn, ENQUEUE_WINDOW)
+        if reused:
+            log(f"♻️ {reused} near-duplicates reuse their canonical claims")
+            prom_metrics.ARTICLES.inc(reused, stage=STAGE, result="duplicate")
+    work_queue.enqueue(conn, STAGE, PENDING_SQL, (150, DEDUP_GRACE if DEDUP_ENABLED else 0, STAGE, STAGE, ENQUEUE_WINDOW))
+    priority.score_pending(conn, STAGE, SCORER)
+    leases = work_queue.claim(conn, STAGE, OWNER, limit, LEASE_SECONDS, AGING_PER_HOUR, MAX_ATTEMPTS)
+    if not leases:
+        return []
+    by_id = {l.article_id: l for l in leases}
+    marks = ",".join(["%s"] * len(by_id))
+    q = f"""
+        SELECT t.article_id, t.text as body, t.lang
         FROM article_texts t
-        JOIN articles a ON a.id = t.article_id
-        LEFT JOIN claims c ON c.article_id = a.id
-        WHERE c.article_id IS NULL 
-          AND a.status = 0
-          AND t.text IS NOT NULL 
-          AND LENGTH(t.text) > %s
-        ORDER BY a.id DESC
-        LIMIT %s
+        WHERE t.article_id IN ({marks})
+        ORDER BY t.article_id DESC
     """
     with conn.cursor(pymysql.cursors.DictCursor) as cur:
-        cur.execute(q, (150, limit))
-        return cur.fetchall()
+        cur.execute(q, tuple(by_id))
+        rows = cur.fetchall()
+    for r in rows:
+        r["lease"] = by_id.pop(r["article_id"])
+    # a szöveg közben eltűnt: lezárjuk (visszaadva rögtön újra kiosztódna)
+    for l in by_id.values():
+        work_queue.complete_empty(conn, l, "no text")
+    return rows
 
-def insert_claim(conn, article_id: int, claim_text: str, entities_list: List[Dict]):
-    """claim mentése"""
-    claim_hash = make_claim_hash(article_id, claim_text)
-    entities_json = json.dumps({"entities": entities_list}, ensure_ascii=False)
-    
-    q = """
-        INSERT INTO claims (article_id, claim, claim_hash, entities)
-        VALUES (%s, %s, %s, %s)
-        ON DUPLICATE KEY UPDATE
-          entities = VALUES(entities)
+def save_article_results(conn, article_id: int, results: List[Dict], lease=None) -> Dict[str, int]:
     """
+    Egy cikk összes claimje, entitása és cég-sentimentje egy tranzakcióban, több soros INSERT-ekkel.
+    results: [{"claim": str, "entities": [...], "sentiments": [(company_id, label, mention), ...]}]
+    A claim id-k a claim_hash alapján oldódnak fel; újrafeldolgozáskor az entitások cserélődnek.
+    """
+    by_hash = {}
+    for r in results:
+        by_hash.setdefault(make_claim_hash(article_id, r["claim"]), r)
+    counts = {"claims": len(by_hash), "entities": 0, "sentiments": 0}
+    if not by_hash:
+        if lease is not None:
+            work_queue.complete_empty(conn, lease, "no claims")
+        return counts
     
-    with conn.cursor() as cur:
-        cur.execute(q, (article_id, claim_text, claim_hash, entities_json))
-    
-    q2 = "SELECT LAST_INSERT_ID() as cid"
-    with conn.cursor(pymysql.cursors.DictCursor) as cur:
-        cur.execute(q2)
-        result = cur.fetchone()
-    
-    return result.get("cid") if result else None
+    hashes = list(by_hash)
+    marks = ",".join(["%s"] * len(hashes))
+    conn.begin()
+    try:
+        with conn.cursor() as cur:
+            values = ",".join(["(%s, %s, %s, %s)"] * len(hashes))
+            params = []
+            for h, r in by_hash.items():
+                params.extend((article_id, r["claim"], h,
+                               json.dumps({"entities": r["entities"]}, ensure_ascii=False)))
+            cur.execute(f"""
+                INSERT INTO claims (article_id, claim, claim_hash, entities)
+                VALUES {values}
+                ON DUPLICATE KEY UPDATE
+                  entities = VALUES(entities)
+            """, params)
+            
+            cur.execute(f"SELECT claim_hash, id FROM claims WHERE claim_hash IN ({marks})", hashes)
+            ids = {bytes(h): cid for h, cid in cur.fetchall()}
+            
+            cur.execute(f"DELETE FROM entities WHERE claim_id IN ({marks})", [ids[h] for h in hashes])
+            entity_rows = []
+            sentiment_rows = []
+            for h, r in by_hash.items():
+                cid = ids[h]
+                for e in r["entities"]:
+                    entity_rows.append((cid, e.get("type"), (e.get("text") or "")[:255],
+                                        e.get("start"), e.get("end"), e.get("score")))
+                for company_id, label, mention in r["sentiments"]:
+                    sentiment_rows.append((cid, company_id, label, (mention or "")[:255]))
+            
+            if entity_rows:
+                values = ",".join(["(%s, %s, %s, %s, %s, %s)"] * len(entity_rows))
+                cur.execute(f"""
+                    INSERT INTO entities (claim_id, entity_type, entity_text, start_char, end_char, confidence)
+                    VALUES {values}
+                """, [v for row in entity_rows for v in row])
+            if sentiment_rows:
+                values = ",".join(["(%s, %s, %s, %s)"] * len(sentiment_rows))
+                cur.execute(f"""
+                    INSERT INTO company_sentiment (claim_id, company_id, sentiment_label, mention_text)
+                    VALUES {values}
+                    ON DUPLICATE KEY UPDATE
+                      sentiment_label = VALUES(sentiment_label)
+                """, [v for row in sentiment_rows for v in row])
+            
+            pipeline_events.emit(cur, pipeline_events.EXTRACTED, [article_id])
+        if lease is not None:
+            work_queue.complete(conn, lease)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    counts["entities"] = len(entity_rows)
+    counts["sentiments"] = len(sentiment_rows)
+    return counts
 
-def insert_entities(conn, claim_id: int, entities_list: List[Dict]):
-    """entitások mentése"""
-    if not entities_list or not claim_id:
-        return
-    
+def _without_offsets(entities_json: Optional[str]) -> Optional[str]:
+    """claims.entities JSON a kanonikus cikk pozíciói nélkül (start / end → None)"""
+    try:
+        data = json.loads(entities_json or "")
+    except ValueError:
+        return entities_json
+    for e in data.get("entities") or []:
+        e["start"] = e["end"] = None
+    return json.dumps(data, ensure_ascii=False)
+
+def copy_duplicate_claims(conn, limit: int) -> int:
+    """
+    Közel-duplikátum cikkek átveszik a kanonikus cikk claimjeit (+ entitás, sentiment; a lefoglaltak nem),
+    és a saját work_items soruk ugyanabban a tranzakcióban lezárul. Az entitás pozíciók a kanonikus
+    cikk szövegére mutatnak, ezért a másolt soroknál NULL-ok.
+    """
     q = """
-        INSERT INTO entities (claim_id, entity_type, entity_text, start_char, end_char, confidence)
-        VALUES (%s, %s, %s, %s, %s, %s)
+        SELECT m.article_id, m.canonical_id
+        FROM article_minhash m
+        LEFT JOIN claims d ON d.article_id = m.article_id
+        WHERE m.canonical_id IS NOT NULL
+          AND d.article_id IS NULL
+          AND EXISTS (SELECT 1 FROM claims c WHERE c.article_id = m.canonical_id)
+          AND NOT EXISTS (SELECT 1 FROM work_items w
+                          WHERE w.stage = %s AND w.article_id = m.article_id AND w.status = 'leased')
+        LIMIT %s
     """
+    with conn.cursor(pymysql.cursors.DictCursor) as cur:
+        cur.execute(q, (STAGE, limit))
+        pairs = cur.fetchall()
     
-    with conn.cursor() as cur:
-        for e in entities_list:
-            cur.execute(q, (
-                claim_id,
-                e.get("type"),
-                e.get("text")[:255],
-                e.get("start"),
-                e.get("end"),
-                e.get("score")
-            ))
+    copied = 0
+    for p in pairs:
+        dup_id, canon_id = p["article_id"], p["canonical_id"]
+        conn.begin()
+        try:
+            with conn.cursor(pymysql.cursors.DictCursor) as cur:
+                cur.execute("SELECT id, claim, entities FROM claims WHERE article_id = %s", (canon_id,))
+                for c in cur.fetchall():
+                    new_hash = make_claim_hash(dup_id, c["claim"])
+                    cur.execute("""
+                        INSERT IGNORE INTO claims (article_id, claim, claim_hash, entities)
+                        VALUES (%s, %s, %s, %s)
+                    """, (dup_id, c["claim"], new_hash, _without_offsets(c["entities"])))
+                    cur.execute("SELECT id FROM claims WHERE claim_hash = %s", (new_hash,))
+                    new_id = cur.fetchone()["id"]
+                    cur.execute("""
+                        INSERT INTO entities (claim_id, entity_type, entity_text, start_char, end_char, confidence)
+                        SELECT %s, entity_type, entity_text, NULL, NULL, confidence
+                        FROM entities WHERE claim_id = %s
+                    """, (new_id, c["id"]))
+                    cur.execute("""
+                        INSERT IGNORE INTO company_sentiment (claim_id, company_id, sentiment_label, mention_text)
+                        SELECT %s, company_id, sentiment_label, mention_text
+                        FROM company_sentiment WHERE claim_id = %s
+                    """, (new_id, c["id"]))
+                pipeline_events.emit(cur, pipeline_events.EXTRACTED, [dup_id])
+                work_queue.complete_unleased(cur, STAGE, [dup_id], f"duplicate of #{canon_id}")
+            conn.commit()
+            copied += 1
+        except Exception as e:
+            conn.rollback()
+            log(f"⚠️ Duplicate claim copy error (#{dup_id} ← #{canon_id}): {e}")
+    return copied
 
-def insert_company_sentiment(conn, claim_id: int, company_id: int, sentiment: str, mention_text: str):
-    """cégsentiemnt mentése"""
-    q = """
-        INSERT INTO company_sentiment (claim_id, company_id, sentiment_label, mention_text)
-        VALUES (%s, %s, %s, %s)
-        ON DUPLICATE KEY UPDATE
-          sentiment_label = VALUES(sentiment_label)
+# ===== SUPERVISOR (több processz, közös modell súlyok) =====
+def supervise(models: Tuple, workers: int) -> int:
+    """
+    A modellek már betöltve: N gyerek fork-olása, a súlyok copy-on-write módon közösek.
+    A munkát a work_items lease-ek osztják el; a kilépett gyereket újraindítja.
     """
+    import gc
+    # a betöltött objektumok ne kerüljenek a gc által bejárt (és így másolt) lapokra
+    gc.collect()
+    gc.freeze()
+    
+    ctx = multiprocessing.get_context("fork")
+    procs: Dict[int, multiprocessing.Process] = {}
     
-    with conn.cursor() as cur:
-        cur.execute(q, (claim_id, company_id, sentiment, mention_text[:255]))
+    def spawn(index: int):
+        proc = ctx.Process(target=_child_main, args=(models, index, workers),
+                           name=f"{STAGE}-worker-{index}")
+        proc.start()
+        procs[index] = proc
+        CHILDREN[proc.pid] = index
+        log(f"👷 Worker #{index} started (pid {proc.pid})")
+    
+    for i in range(workers):
+        spawn(i)
+    
+    exit_code = 0
+    while procs:
+        multiprocessing.connection.wait([p.sentinel for p in procs.values()])
+        for index, proc in list(procs.items()):
+            if proc.is_alive():
+                continue
+            proc.join()
+            del procs[index]
+            CHILDREN.pop(proc.pid, None)
+            log(f"👷 Worker #{index} (pid {proc.pid}) exited with {proc.exitcode}")
+            if RUNNING:
+                time.sleep(5)
+                if RUNNING:
+                    spawn(index)
+            elif proc.exitcode:
+                exit_code = proc.exitcode
+    return exit_code
+
+def _child_main(models: Tuple, index: int, workers: int):
+    """gyerek processz belépési pontja (fork: a modellek a szülő memóriájából, másolás nélkül)"""
+    global OWNER
+    CHILDREN.clear()
+    log_setup.after_fork()
+    OWNER = work_queue.make_owner(STAGE)
+    sys.exit(run(*models, worker_index=index, workers=workers))
 
 # ===== MAIN LOOP =====
 def main():
+    log_setup.setup_from_config(CONFIG["logging"], LOG_FILE, STAGE, multiprocess=WORKERS > 1)
     log("=" * 80)
     log(f"🚀 EXTRACT WORKER START")
     log(f"   NLI: {NLI_MODEL}")
     log(f"   NER: {NER_MODEL}")
     log(f"   Sentiment: {SENTIMENT_MODEL}")
-    log(f"   Batch size: {BATCH_SIZE}")
+    log(f"   Batch size: {BATCH_SIZE} (NLI batch: {NLI_BATCH_SIZE})")
     log(f"   CPU limit: {CPU_LIMIT}%")
+    log(f"   Workers: {WORKERS}")
     log("=" * 80)
     
-    # Modellek betöltése
-    nli_pipe, ner_pipe, sentiment_pipe = load_models()
+    # Modellek betöltése (supervisor módban egyszer, a fork előtt)
+    models = load_models()
     
-    if not nli_pipe:
+    if not models[0]:
         log("❌ NLI model required!")
         return 1
     
     log("")
     
+    if WORKERS > 1:
+        return supervise(models, WORKERS)
+    return run(*models)
+
+def run(nli_pipe, ner_pipe, sentiment_pipe, worker_index: int = 0, workers: int = 1) -> int:
+    """feldolgozó ciklus (egy processz); supervisor módban gyerekenként fut"""
+    global GOVERNOR, FIRST_CLAIM_AT
+    # a CPU budget és a szálak elosztása a gyerekek között
+    # (cgroup mérésnél mindenki a közös használatot látja, ezért ott a teljes limit marad)
+    limit = CPU_LIMIT if CPU_SOURCE == "cgroup" else CPU_LIMIT / workers
+    max_conc = max(1, MAX_CONCURRENCY // workers)
+    GOVERNOR = cpu_governor.CpuGovernor(
+        limit, BATCH_SIZE, min_batch=MIN_BATCH_SIZE,
+        max_concurrency=max_conc, source=CPU_SOURCE,
+    )
+    set_torch_threads(GOVERNOR.concurrency)
+    log(f"✅ CPU governor: source={GOVERNOR.sampler.source}, limit={limit:.0f}%, max concurrency={max_conc}")
+    
+    if METRICS_PORT:
+        port = METRICS_PORT + worker_index
+        try:
+            prom_metrics.start_http_server(port, METRICS_HOST)
+            log(f"✅ Metrics: http://{METRICS_HOST}:{port}/metrics")
+        except OSError as e:
+            log(f"⚠️ Metrics server error: {e}")
+    
     try:
         conn = db_connect()
-        log("✅ DB connection OK\n")
+        work_queue.ensure_work_items_table(conn)
+        pipeline_events.ensure_pipeline_events_table(conn)
+        near_dup.ensure_minhash_tables(conn)
+        claim_filter.ensure_nli_decisions_table(conn)
+        if CACHE_ENABLED:
+            inference_cache.ensure_inference_cache_table(conn)
+            CACHE.bind(conn)
+        event_cursor = pipeline_events.latest_id(conn)
+        log(f"✅ DB connection OK (lease owner: {OWNER})\n")
     except Exception as e:
-        log(f"❌ DB connection failed: {e}")
+        log(f"❌ DB connection failed: {e}", logging.ERROR)
         return 1
     
     iteration = 0
     total_claims = 0
     total_entities = 0
     total_sentiments = 0
+    # inference cache takarítás: supervisor módban csak az első gyerek
+    prune_cache = CACHE_ENABLED and CACHE.persist and worker_index == 0
+    last_prune = 0.0
     
     try:
-        # DB cégek gyorsítótárazása
-        companies = get_db_companies(conn)
-        log(f"📊 {len(companies)} companies cached\n")
+        # DB cégek automatája (a háttérszál építi újra, ha változik a stock_products)
+        COMPANIES.refresh(conn)
+        COMPANIES.start(db_connect, log)
+        log(f"📊 {len(COMPANIES.matcher.names)} companies, {COMPANIES.matcher.patterns} patterns compiled\n")
         
         while RUNNING:
             iteration += 1
             log(f"\n--- Iteration #{iteration} ---")
             
-            # CPU check
-            cpu = get_cpu_percent()
-            log(f"CPU: {cpu:.1f}% (limit: {CPU_LIMIT}%)")
+            # CPU budget (AIMD)
+            GOVERNOR.update()
+            gov = GOVERNOR.snapshot()
+            prom_metrics.export_governor(STAGE, gov)
+            log(f"CPU: {gov['cpu_percent']:.1f}% (limit: {CPU_LIMIT}%) → batch {gov['batch_size']}, concurrency {gov['concurrency']}")
+            paused = GOVERNOR.throttle()
+            if paused:
+                log(f"⏸️ CPU too high, paused {paused:.1f}s")
+                prom_metrics.CPU_PAUSES.inc(stage=STAGE)
+                prom_metrics.CPU_PAUSE_SECONDS.inc(paused, stage=STAGE)
             
-            if not can_continue():
-                log(f"⏸️ CPU too high, waiting 60s...")
-                time.sleep(60)
-                continue
+            set_torch_threads(GOVERNOR.concurrency)
+            
+            if CASCADE.maybe_retrain(conn):
+                log(f"🧮 NLI prefilter retrained: {json.dumps(CASCADE.snapshot())}")
+            
+            if prune_cache and time.monotonic() - last_prune > CACHE_PRUNE_INTERVAL:
+                last_prune = time.monotonic()
+                try:
+                    pruned = inference_cache.prune(conn, CACHE_TTL_DAYS, CACHE_MAX_ROWS)
+                    if pruned:
+                        log(f"🧹 Inference cache: {pruned} stale rows pruned")
+                except pymysql.MySQLError as e:
+                    log(f"⚠️ Inference cache prune error: {e}")
             
             # Cikkek lekérése
-            rows = get_pending_articles(conn, BATCH_SIZE)
+            rows = get_pending_articles(conn, GOVERNOR.batch_size)
+            prom_metrics.export_backlog(STAGE, work_queue.backlog_size(conn, STAGE))
+            for task in CACHE.stats:
+                prom_metrics.INFERENCE_CACHE_HIT_RATIO.set(CACHE.hit_ratio(task), stage=STAGE, task=task)
+            prom_metrics.export_padding(STAGE, token_batching.STATS.snapshot())
             if not rows:
-                log("💤 No pending articles, waiting 120s...")
-                time.sleep(120)
+                unload_idle_models(ner_pipe, sentiment_pipe)
+                log(f"💤 No pending articles, waiting for events (max {IDLE_WAIT}s)...")
+                new_cursor = pipeline_events.wait_for_events(
+                    conn, WAKE_EVENTS, event_cursor, IDLE_WAIT,
+                    poll_interval=POLL_INTERVAL, keep_running=lambda: RUNNING,
+                )
+                if new_cursor > event_cursor:
+                    log(f"🔔 New events (cursor {event_cursor} → {new_cursor})")
+                    event_cursor = new_cursor
                 continue
             
             log(f"📥 {len(rows)} articles to process")
             
             batch_claims = 0
             for idx, row in enumerate(rows, 1):
-                # CPU check minden cikk előtt
-                if not can_continue():
-                    log(f"⏸️ CPU limit reached, stopping batch")
+                # CPU budget minden cikk előtt: túllépésnél rövid szünet, nem áll le a batch
+                if not RUNNING:
+                    for rest in rows[idx - 1:]:
+                        work_queue.release(conn, rest["lease"])
                     break
+                paused = GOVERNOR.throttle()
+                if paused:
+                    log(f"⏸️ CPU limit reached, paused {paused:.1f}s")
+                    prom_metrics.CPU_PAUSES.inc(stage=STAGE)
+                    prom_metrics.CPU_PAUSE_SECONDS.inc(paused, stage=STAGE)
                 
                 art_id = row["article_id"]
                 body = row["body"]
+                lease = row["lease"]
                 
                 if not body or len(body) < 150:
-                    log(f"  [{idx}] Article #{art_id}: too short, SKIP")
+                    log(f"  [{idx}] Article #{art_id}: too short, SKIP", article_id=art_id)
+                    prom_metrics.ARTICLES.inc(stage=STAGE, result="skipped")
+                    work_queue.complete_empty(conn, lease, "too short")
                     continue
                 
                 # Claims extraction
-                claims = extract_claims(body, nli_pipe)
+                art_t0 = time.perf_counter()
+                claims = extract_claims(body, nli_pipe, row.get("lang"))
+                if not lease.renew_if_due(conn):
+                    log(f"  [{idx}] Article #{art_id}: lease lost, SKIP", article_id=art_id)
+                    prom_metrics.ARTICLES.inc(stage=STAGE, result="skipped")
+                    continue
+                if claims is None:
+                    log(f"  [{idx}] Article #{art_id}: NLI failed, retry later", logging.ERROR, article_id=art_id)
+                    prom_metrics.ARTICLES.inc(stage=STAGE, result="error")
+                    status = work_queue.fail(conn, lease, "nli error", MAX_ATTEMPTS, RETRY_BACKOFF, RETRY_BACKOFF_MAX)
+                    if status == "dead":
+                        log(f"  [{idx}] Article #{art_id}: dead-lettered after {lease.attempts} attempts", logging.WARNING, article_id=art_id)
+                        prom_metrics.ARTICLES.inc(stage=STAGE, result="dead")
+                    continue
                 if not claims:
-                    log(f"  [{idx}] Article #{art_id}: no claims, SKIP")
+                    log(f"  [{idx}] Article #{art_id}: no claims, SKIP", article_id=art_id)
+                    prom_metrics.ARTICLES.inc(stage=STAGE, result="no_claims")
+                    work_queue.complete_empty(conn, lease, "no claims")
                     continue
                 
-                # Claimek feldolgozása
-                art_claims = 0
-                art_entities = 0
-                art_sentiments = 0
+                # Claimek feldolgozása (NER + cég-sentiment)
+                results = claim_results(body, claims, ner_pipe, sentiment_pipe)
                 
-                for claim_text in claims:
-                    entities_list = extract_entities(claim_text, ner_pipe)
-                    claim_id = insert_claim(conn, art_id, claim_text, entities_list)
-                    
-                    if not claim_id:
-                        continue
-                    
-                    if entities_list:
-                        insert_entities(conn, claim_id, entities_list)
-                        art_entities += len(entities_list)
-                    
-                    # Sentiment (csak DB cégeknél)
-                    if SENTIMENT_ONLY_DB and ner_pipe:
-                        company_match = find_company_in_claim(claim_text, companies)
-                        if company_match:
-                            company_name, company_id = company_match
-                            sentiment = analyze_sentiment(claim_text, sentiment_pipe)
-                            if sentiment:
-                                insert_company_sentiment(conn, claim_id, company_id, sentiment, company_name)
-                                art_sentiments += 1
-                    
-                    art_claims += 1
-                    time.sleep(SLEEP)
+                if not lease.renew_if_due(conn):
+                    log(f"  [{idx}] Article #{art_id}: lease lost, SKIP", article_id=art_id)
+                    prom_metrics.ARTICLES.inc(stage=STAGE, result="skipped")
+                    continue
                 
+                # egy tranzakció cikkenként (claims + entities + company_sentiment + esemény + work_items)
+                try:
+                    counts = save_article_results(conn, art_id, results, lease)
+                except pymysql.MySQLError as e:
+                    log(f"  [{idx}] Article #{art_id}: DB write failed ({e}), retry later", logging.ERROR, article_id=art_id)
+                    prom_metrics.ARTICLES.inc(stage=STAGE, result="error")
+                    status = work_queue.fail(conn, lease, f"db write: {e}", MAX_ATTEMPTS, RETRY_BACKOFF, RETRY_BACKOFF_MAX)
+                    if status == "dead":
+                        log(f"  [{idx}] Article #{art_id}: dead-lettered after {lease.attempts} attempts", logging.WARNING, article_id=art_id)
+                        prom_metrics.ARTICLES.inc(stage=STAGE, result="dead")
+                    continue
+                art_claims, art_entities, art_sentiments = counts["claims"], counts["entities"], counts["sentiments"]
                 if art_claims > 0:
-                    log(f"  [{idx}] Article #{art_id}: {art_claims} claims, {art_entities} entities, {art_sentiments} sentiments")
+                    if FIRST_CLAIM_AT is None:
+                        FIRST_CLAIM_AT = time.monotonic()
+                        prom_metrics.STARTUP_SECONDS.set(FIRST_CLAIM_AT - STARTED_AT, stage=STAGE, phase="first_claim")
+                        log(f"⏱️ Time to first claim: {FIRST_CLAIM_AT - STARTED_AT:.1f}s")
+                    log(f"  [{idx}] Article #{art_id}: {art_claims} claims, {art_entities} entities, {art_sentiments} sentiments", article_id=art_id)
+                    prom_metrics.ARTICLES.inc(stage=STAGE, result="ok")
+                    prom_metrics.ITEMS.inc(art_claims, stage=STAGE, kind="claims")
+                    prom_metrics.ITEMS.inc(art_entities, stage=STAGE, kind="entities")
+                    prom_metrics.ITEMS.inc(art_sentiments, stage=STAGE, kind="sentiments")
+                    prom_metrics.STAGE_SECONDS.observe(time.perf_counter() - art_t0, stage=STAGE, step="article")
                     batch_claims += art_claims
                     total_claims += art_claims
                     total_entities += art_entities
                     total_sentiments += art_sentiments
             
+            CASCADE.flush(conn)
+            unload_idle_models(ner_pipe, sentiment_pipe)
             log(f"✅ Batch: {batch_claims} claims processed")
+            log(f"📈 governor: {json.dumps(GOVERNOR.snapshot())}")
+            log(f"🧱 padding: {json.dumps({t: v['efficiency'] for t, v in token_batching.STATS.snapshot().items()})}")
+            if DEDUP_ENABLED:
+                log(f"♻️ dedup savings: {json.dumps(near_dup.savings(conn))}")
             log(f"📊 Total: {total_claims} claims, {total_entities} entities, {total_sentiments} sentiments")
             
             log(f"⏳ Sleeping {BATCH_SLEEP}s before next batch...")
@@ -425,11 +772,18 @@ def main():
     except KeyboardInterrupt:
         log("⏹️ Interrupted by user")
     except Exception as e:
-        log(f"❌ FATAL ERROR: {type(e).__name__}: {e}")
+        log(f"❌ FATAL ERROR: {type(e).__name__}: {e}", logging.ERROR)
         import traceback
-        log(traceback.format_exc())
+        log(traceback.format_exc(), logging.ERROR)
         return 1
     finally:
+        COMPANIES.stop()
+        try:
+            released = work_queue.release_all(conn, STAGE, OWNER)
+            if released:
+                log(f"↩️ {released} leases released")
+        except Exception:
+            pass
         try:
             conn.close()
             log("🔒 DB connection closed")
@@ -0,0 +1,41 @@
+# GUI Routes - Prometheus metrics (request latency per blueprint)
+from flask import Blueprint, Response, g, request
+import time
+from prom_metrics import Registry, CONTENT_TYPE
+
+REGISTRY = Registry()
+REQUEST_SECONDS = REGISTRY.histogram(
+    "newscred_gui_request_seconds", "GUI request latency per blueprint",
+    ["blueprint", "method", "status"],
+)
+REQUESTS = REGISTRY.counter(
+    "newscred_gui_requests_total", "GUI requests per blueprint",
+    ["blueprint", "method", "status"],
+)
+
+metrics_bp = Blueprint('metrics', __name__)
+
+@metrics_bp.route("/metrics")
+def metrics():
+    return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
+
+def init_metrics(app):
+    """request latency hookok + /metrics blueprint regisztrálása"""
+    @app.before_request
+    def _metrics_start():
+        g._metrics_t0 = time.perf_counter()
+
+    @app.after_request
+    def _metrics_observe(resp):
+        t0 = g.pop("_metrics_t0", None)
+        if t0 is not None and request.blueprint != "metrics":
+            labels = dict(
+                blueprint=request.blueprint or "app",
+                method=request.method,
+                status=str(resp.status_code),
+            )
+            REQUEST_SECONDS.observe(time.perf_counter() - t0, **labels)
+            REQUESTS.inc(**labels)
+        return resp
+
+    app.register_blueprint(metrics_bp)
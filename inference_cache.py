@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+inference_cache.py
+Modell kimenet cache (NLI / NER / sentiment), kulcs: (normalizált szöveg hash, modell verzió, task)
+- elöl korlátos memóriabeli LRU, mögötte MySQL tábla (inference_cache), újraindítás után is él
+- CachedPipeline: a HF pipeline elé kerül, csak a hiányzó bemenetek mennek a modellre
+- a task kulcsba a hívás paraméterei (pl. candidate_labels) is bekerülnek, a batch_size nem
+- a NER pozíciók a bemenethez kötöttek, ezért ott nincs whitespace normalizálás
+- a DB tábla korlátos: prune() törli a ttl_days óta nem használt sorokat, és max_rows felett
+  a legrégebben használtakat (last_hit: beszúráskor és DB találatkor frissül)
+"""
+
+import hashlib
+import json
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import pymysql
+
+DEFAULT_MEMORY_ITEMS = 50000
+DEFAULT_TTL_DAYS = 30
+DEFAULT_MAX_ROWS = 2000000
+DEFAULT_PRUNE_INTERVAL_SECONDS = 3600
+PRUNE_BATCH = 10000
+# a kulcsot nem befolyásoló hívás paraméterek
+_IGNORED_KWARGS = {"batch_size"}
+# taskok, ahol bemenetenként lista a kimenet
+_LIST_TASKS = {"ner", "token-classification"}
+
+def normalize(text: str, exact: bool = False) -> str:
+    """NFC + whitespace összevonás (exact: csak NFC)"""
+    text = unicodedata.normalize("NFC", text or "")
+    return text if exact else " ".join(text.split())
+
+def input_hash(text: str, exact: bool = False) -> bytes:
+    """SHA-256 hash 32 byte"""
+    return hashlib.sha256(normalize(text, exact).encode("utf-8")).digest()
+
+def task_key(task: str, kwargs: Dict) -> str:
+    """task + a kimenetet befolyásoló paraméterek rövid hash-e"""
+    relevant = {k: v for k, v in kwargs.items() if k not in _IGNORED_KWARGS}
+    if not relevant:
+        return task
+    digest = hashlib.sha1(json.dumps(relevant, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+    return f"{task}:{digest[:12]}"
+
+def _json_default(o):
+    # numpy skalárok (NER score float32)
+    if hasattr(o, "item"):
+        return o.item()
+    return str(o)
+
+# ===== SCHEMA =====
+def ensure_inference_cache_table(conn):
+    """inference_cache tábla létrehozása, ha még nincs"""
+    with conn.cursor() as cur:
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS inference_cache (
+          input_hash BINARY(32) NOT NULL,
+          model VARCHAR(191) NOT NULL,
+          task VARCHAR(64) NOT NULL,
+          result MEDIUMTEXT NOT NULL,
+          created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+          last_hit DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+          PRIMARY KEY (input_hash, model, task),
+          KEY idx_last_hit (last_hit)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+        """)
+        # korábbi séma: last_hit nélkül
+        cur.execute("""
+            SELECT COUNT(*) FROM information_schema.COLUMNS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'inference_cache' AND COLUMN_NAME = 'last_hit'
+        """)
+        row = cur.fetchone()
+        if not (list(row.values())[0] if isinstance(row, dict) else row[0]):
+            cur.execute("""
+                ALTER TABLE inference_cache
+                  ADD COLUMN last_hit DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                  ADD INDEX idx_last_hit (last_hit)
+            """)
+
+def prune(conn, ttl_days: int = DEFAULT_TTL_DAYS, max_rows: int = DEFAULT_MAX_ROWS,
+          batch: int = PRUNE_BATCH) -> int:
+    """
+    ttl_days óta nem használt sorok törlése, majd max_rows felett a legrégebben használtaké
+    (0 = nincs korlát); kis batchekben, hogy ne tartson sokáig zárat. Visszatérés: törölt sorok.
+    """
+    deleted = 0
+    with conn.cursor() as cur:
+        if ttl_days:
+            while True:
+                cur.execute("DELETE FROM inference_cache WHERE last_hit < NOW() - INTERVAL %s DAY LIMIT %s",
+                            (ttl_days, batch))
+                deleted += cur.rowcount
+                if cur.rowcount < batch:
+                    break
+        if max_rows:
+            # a max_rows-adik legutóbb használt sor ideje: ami ennél régebbi, törlődik
+            cur.execute("SELECT last_hit FROM inference_cache ORDER BY last_hit DESC LIMIT 1 OFFSET %s",
+                        (max_rows,))
+            row = cur.fetchone()
+            if row:
+                cutoff = list(row.values())[0] if isinstance(row, dict) else row[0]
+                while True:
+                    cur.execute("DELETE FROM inference_cache WHERE last_hit <= %s LIMIT %s", (cutoff, batch))
+                    deleted += cur.rowcount
+                    if cur.rowcount < batch:
+                        break
+    return deleted
+
+# ===== CACHE =====
+class InferenceCache:
+    """LRU + (opcionális) MySQL háttértár; bind() adja a DB kapcsolatot"""
+
+    def __init__(self, memory_items: int = DEFAULT_MEMORY_ITEMS, persist: bool = True,
+                 log: Optional[Callable[[str], None]] = None,
+                 on_lookup: Optional[Callable[[str, int, int, int], None]] = None):
+        self.memory_items = memory_items
+        self.persist = persist
+        self.log = log
+        # on_lookup(task, memory_hits, db_hits, misses): metrika export
+        self.on_lookup = on_lookup
+        self.conn = None
+        self._lru: "OrderedDict[Tuple[bytes, str, str], object]" = OrderedDict()
+        self._lock = threading.Lock()
+        # task → [memory, db, miss]
+        self.stats: Dict[str, List[int]] = {}
+
+    def bind(self, conn):
+        self.conn = conn if self.persist else None
+
+    def _count(self, task: str, memory: int = 0, db: int = 0, miss: int = 0):
+        s = self.stats.setdefault(task, [0, 0, 0])
+        s[0] += memory
+        s[1] += db
+        s[2] += miss
+        if self.on_lookup:
+            self.on_lookup(task, memory, db, miss)
+
+    def hit_ratio(self, task: str) -> float:
+        memory, db, miss = self.stats.get(task, (0, 0, 0))
+        total = memory + db + miss
+        return (memory + db) / total if total else 0.0
+
+    def _remember(self, key, value):
+        with self._lock:
+            self._lru[key] = value
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.memory_items:
+                self._lru.popitem(last=False)
+
+    def get_many(self, model: str, task: str, hashes: Sequence[bytes], stat_task: str) -> Dict[bytes, object]:
+        """hash → eredmény a meglévőkre (előbb LRU, aztán DB)"""
+        found, missing = {}, {}
+        with self._lock:
+            for h in hashes:
+                key = (h, model, task)
+                if key in self._lru:
+                    self._lru.move_to_end(key)
+                    found[h] = self._lru[key]
+                else:
+                    missing[h] = None
+        memory_hits = len(found)
+        if missing and self.conn is not None:
+            marks = ",".join(["%s"] * len(missing))
+            try:
+                with self.conn.cursor() as cur:
+                    cur.execute(f"""
+                        SELECT input_hash, result FROM inference_cache
+                        WHERE model = %s AND task = %s AND input_hash IN ({marks})
+                    """, (model, task, *missing))
+                    rows = cur.fetchall()
+            except pymysql.MySQLError as e:
+                rows = []
+                if self.log:
+                    self.log(f"⚠️ Inference cache read error: {e}")
+            for h, result in rows:
+                h = bytes(h)
+                value = json.loads(result)
+                found[h] = value
+                self._remember((h, model, task), value)
+            if rows:
+                self._touch(model, task, [bytes(h) for h, _ in rows])
+        self._count(stat_task, memory=memory_hits, db=len(found) - memory_hits,
+                    miss=len(set(hashes)) - len(found))
+        return found
+
+    def _touch(self, model: str, task: str, hashes: List[bytes]):
+        """DB találat: last_hit frissítése (a prune a régóta nem használtakat törli)"""
+        marks = ",".join(["%s"] * len(hashes))
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute(f"""
+                    UPDATE inference_cache SET last_hit = NOW()
+                    WHERE model = %s AND task = %s AND input_hash IN ({marks})
+                """, (model, task, *hashes))
+        except pymysql.MySQLError as e:
+            if self.log:
+                self.log(f"⚠️ Inference cache touch error: {e}")
+
+    def put_many(self, model: str, task: str, items: Dict[bytes, object]):
+        if not items:
+            return
+        for h, value in items.items():
+            self._remember((h, model, task), value)
+        if self.conn is None:
+            return
+        rows = [(h, model, task, json.dumps(v, ensure_ascii=False, default=_json_default)) for h, v in items.items()]
+        try:
+            with self.conn.cursor() as cur:
+                cur.executemany(
+                    "INSERT IGNORE INTO inference_cache (input_hash, model, task, result) VALUES (%s, %s, %s, %s)",
+                    rows,
+                )
+        except pymysql.MySQLError as e:
+            if self.log:
+                self.log(f"⚠️ Inference cache write error: {e}")
+
+class CachedPipeline:
+    """HF pipeline proxy: cache-ből válaszol, csak a hiányzó bemeneteket küldi a modellnek"""
+
+    def __init__(self, pipe, cache: InferenceCache, task: str, model: str):
+        self.pipe = pipe
+        self.cache = cache
+        self.task = task
+        self.model = model
+        self.exact = task in _LIST_TASKS
+
+    def __call__(self, inputs, **kwargs):
+        single = isinstance(inputs, str)
+        texts = [inputs] if single else list(inputs)
+        key = task_key(self.task, kwargs)
+        hashes = [input_hash(t, self.exact) for t in texts]
+        found = self.cache.get_many(self.model, key, hashes, self.task)
+
+        todo = {}
+        for t, h in zip(texts, hashes):
+            if h not in found and h not in todo:
+                todo[h] = t
+        if todo:
+            results = self.pipe(list(todo.values()), **kwargs)
+            if len(todo) == 1:
+                # egy bemenetnél a pipeline nem mindig ad listát
+                if isinstance(results, dict) or (self.exact and (not results or isinstance(results[0], dict))):
+                    results = [results]
+            fresh = dict(zip(todo, results))
+            self.cache.put_many(self.model, key, fresh)
+            found.update(fresh)
+
+        out = [found[h] for h in hashes]
+        return out[0] if single else out
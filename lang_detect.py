@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+lang_detect.py
+Gyors, in-process nyelvfelismerés karakter n-gram modellel (1-3 gram, naiv Bayes)
+- a profilok import-kor, egyszer épülnek a beépített mintaszövegekből
+- article_texts.lang kitöltéséhez (hu → fordítás, en → másolás, egyéb → kimarad)
+"""
+
+import math
+import re
+from collections import Counter
+from typing import Dict, Tuple
+
+UNKNOWN = "und"
+MAX_CHARS = 2000
+MIN_LETTERS = 20
+MIN_MARGIN = 0.05  # n-gramonkénti log-valószínűség különbség az első két nyelv között
+
+# Mintaszövegek (hírszerű mondatok) - a profilok forrása
+_SEED = {
+    "hu": """
+A magyar gazdaság a harmadik negyedévben lassabban nőtt a vártnál, közölte csütörtökön a Központi
+Statisztikai Hivatal. Az infláció szeptemberben tovább csökkent, a jegybank ezért nem változtatott
+az alapkamaton. A Budapesti Értéktőzsdén a BUX index emelkedéssel zárt, az OTP és a Richter
+árfolyama is nőtt. A kormány szerint jövőre gyorsulhat a növekedés, de az elemzők óvatosabbak.
+Az önkormányzatok több pénzt kérnek az egészségügyi ellátásra és a közoktatásra. A vállalat
+bejelentette, hogy új gyárat épít, amely több száz munkahelyet teremt a térségben. A bíróság
+elutasította a keresetet, az ítélet nem jogerős. A forint gyengült az euróval szemben, miközben
+a befektetők a Fed döntésére vártak. Ősszel drágulhat az üzemanyag, figyelmeztetnek a szakértők.
+Hétfőtől változik a menetrend, a vonatok és a buszok is ritkábban közlekednek majd. Egy ügyfél
+szerint a bank nem válaszolt időben a panaszára. Mindez azt jelenti, hogy a háztartások
+fogyasztása mérséklődött, és a kiskereskedelmi forgalom is visszaesett az előző évhez képest.
+""",
+    "en": """
+The economy grew more slowly than expected in the third quarter, the statistics office said on
+Thursday. Inflation eased again in September, so the central bank left its key interest rate
+unchanged. Shares rose on the stock exchange, with banks and technology companies leading the
+gains. The government expects growth to pick up next year, but analysts are more cautious. The
+company announced that it will build a new factory, which should create hundreds of jobs in the
+region. The court rejected the lawsuit, and the ruling can still be appealed. The dollar weakened
+against the euro while investors waited for the Federal Reserve decision. Fuel prices could rise
+in the autumn, experts warned. Revenue for the quarter was higher than a year earlier, driven by
+strong demand for its products and services. The chief executive said the outlook remains
+positive, although supply chain problems have not been fully resolved. Consumer spending slowed
+and retail sales fell compared with the previous year, according to the latest data.
+""",
+    "de": """
+Die Wirtschaft ist im dritten Quartal langsamer gewachsen als erwartet, teilte das Statistikamt
+am Donnerstag mit. Die Inflation ist im September weiter gesunken, deshalb hat die Zentralbank
+den Leitzins nicht verändert. An der Börse stiegen die Aktien, angeführt von Banken und
+Technologiewerten. Die Regierung rechnet damit, dass sich das Wachstum im nächsten Jahr
+beschleunigt, aber die Analysten sind vorsichtiger. Das Unternehmen hat angekündigt, eine neue
+Fabrik zu bauen, die mehrere hundert Arbeitsplätze in der Region schaffen soll. Das Gericht hat
+die Klage abgewiesen, das Urteil ist noch nicht rechtskräftig. Der Euro gab gegenüber dem Dollar
+nach, während die Anleger auf die Entscheidung der Notenbank warteten.
+""",
+    "sk": """
+Ekonomika v treťom štvrťroku rástla pomalšie, ako sa očakávalo, oznámil vo štvrtok štatistický
+úrad. Inflácia v septembri ďalej klesla, preto centrálna banka nezmenila základnú úrokovú sadzbu.
+Akcie na burze vzrástli, najviac sa darilo bankám a technologickým firmám. Vláda očakáva, že rast
+sa budúci rok zrýchli, analytici sú však opatrnejší. Spoločnosť oznámila, že postaví novú
+továreň, ktorá vytvorí stovky pracovných miest v regióne. Súd žalobu zamietol, rozsudok zatiaľ
+nie je právoplatný. Euro oslabilo voči doláru, pretože investori čakali na rozhodnutie
+centrálnej banky.
+""",
+    "ro": """
+Economia a crescut mai lent decât se aștepta în al treilea trimestru, a anunțat joi institutul de
+statistică. Inflația a scăzut din nou în septembrie, așa că banca centrală a menținut dobânda de
+referință neschimbată. Acțiunile au crescut la bursă, conduse de bănci și companii de
+tehnologie. Guvernul se așteaptă ca economia să accelereze anul viitor, dar analiștii sunt mai
+prudenți. Compania a anunțat că va construi o fabrică nouă, care va crea sute de locuri de muncă
+în regiune. Instanța a respins plângerea, iar decizia nu este definitivă. Leul s-a depreciat
+față de euro, în timp ce investitorii așteptau decizia băncii centrale.
+""",
+}
+
+_NON_LETTER = re.compile(r"[^\w]+|[\d_]+", re.UNICODE)
+
+def _normalize(text: str) -> str:
+    return " " + _NON_LETTER.sub(" ", (text or "").lower()).strip() + " "
+
+def _ngrams(text: str):
+    for n in (1, 2, 3):
+        for i in range(len(text) - n + 1):
+            g = text[i:i + n]
+            if g != " " and g != "  ":
+                yield g
+
+def _build_profiles() -> Dict[str, Tuple[Dict[str, float], float]]:
+    """nyelvenkénti log-valószínűségek (add-one simítás) + ismeretlen n-gram értéke"""
+    counts = {lang: Counter(_ngrams(_normalize(txt))) for lang, txt in _SEED.items()}
+    vocab = set()
+    for c in counts.values():
+        vocab.update(c)
+    profiles = {}
+    for lang, c in counts.items():
+        total = sum(c.values()) + len(vocab) + 1
+        profiles[lang] = (
+            {g: math.log((cnt + 1) / total) for g, cnt in c.items()},
+            math.log(1 / total),
+        )
+    return profiles
+
+_PROFILES = _build_profiles()
+
+def detect_with_score(text: str) -> Tuple[str, float]:
+    """(nyelvkód, margó) - margó: n-gramonkénti log-valószínűség előny a második nyelvvel szemben"""
+    norm = _normalize((text or "")[:MAX_CHARS])
+    if sum(ch.isalpha() for ch in norm) < MIN_LETTERS:
+        return UNKNOWN, 0.0
+    grams = list(_ngrams(norm))
+    scores = []
+    for lang, (logp, unseen) in _PROFILES.items():
+        scores.append((sum(logp.get(g, unseen) for g in grams), lang))
+    scores.sort(reverse=True)
+    margin = (scores[0][0] - scores[1][0]) / max(len(grams), 1)
+    if margin < MIN_MARGIN:
+        return UNKNOWN, margin
+    return scores[0][1], margin
+
+def detect(text: str) -> str:
+    """nyelvkód (ISO 639-1) vagy 'und'"""
+    return detect_with_score(text)[0]
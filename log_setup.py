@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+log_setup.py
+Közös, nem blokkoló logolás a workerekhez és scriptekhez
+- QueueHandler → háttérszál (QueueListener) írja a fájlt / konzolt, a hívó szál nem vár I/O-ra
+- méret alapú rotáció (RotatingFileHandler)
+- opcionális JSON sorok (ts, level, logger, stage, article_id, msg)
+- multiprocess=True: fork-olt gyerekek ugyanabba a sorba írnak, a fájlt csak a szülő kezeli
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import multiprocessing
+import os
+import queue
+import sys
+from datetime import datetime
+from typing import Dict, Optional
+
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024
+DEFAULT_BACKUP_COUNT = 5
+DEFAULT_FORMAT = "[%(asctime)s] %(message)s"
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+QUEUE_SIZE = 10000
+
+# extra mezők, amelyeket a JSON sor átvesz (log(..., article_id=...))
+CONTEXT_FIELDS = ("stage", "article_id")
+
+_LISTENER: Optional[logging.handlers.QueueListener] = None
+
+class JsonFormatter(logging.Formatter):
+    """egy rekord = egy JSON sor"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        out = {
+            "ts": datetime.fromtimestamp(record.created).strftime(DATE_FORMAT),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for field in CONTEXT_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                out[field] = value
+        if record.exc_info:
+            out["exc"] = self.formatException(record.exc_info)
+        return json.dumps(out, ensure_ascii=False, default=str)
+
+class _StageFilter(logging.Filter):
+    """alapértelmezett stage mező minden rekordra"""
+
+    def __init__(self, stage: Optional[str]):
+        super().__init__()
+        self.stage = stage
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if getattr(record, "stage", None) is None:
+            record.stage = self.stage
+        return True
+
+class _DropQueueHandler(logging.handlers.QueueHandler):
+    """teli sor esetén eldobja a rekordot (a hívó szál sosem blokkol)"""
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            pass
+
+def setup_logging(log_file: Optional[str] = None, stage: Optional[str] = None,
+                  level: int = logging.INFO, json_lines: Optional[bool] = None,
+                  max_bytes: int = DEFAULT_MAX_BYTES, backup_count: int = DEFAULT_BACKUP_COUNT,
+                  console: bool = True, fmt: str = DEFAULT_FORMAT,
+                  multiprocess: bool = False) -> logging.Logger:
+    """
+    Root logger beállítása: minden handler a háttérszálon fut.
+    json_lines=None → NEWS_LOG_JSON=1 környezeti változó dönt.
+    Visszatérés: a stage nevű (vagy root) logger.
+    """
+    global _LISTENER
+    shutdown()
+    if json_lines is None:
+        json_lines = os.getenv("NEWS_LOG_JSON", "") == "1"
+
+    formatter = JsonFormatter() if json_lines else logging.Formatter(fmt, DATE_FORMAT)
+    handlers = []
+    if log_file:
+        log_dir = os.path.dirname(log_file)
+        if log_dir:
+            os.makedirs(log_dir, exist_ok=True)
+        fh = logging.handlers.RotatingFileHandler(
+            log_file, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8",
+        )
+        fh.setFormatter(formatter)
+        handlers.append(fh)
+    if console:
+        sh = logging.StreamHandler(sys.stdout)
+        sh.setFormatter(logging.Formatter(fmt, DATE_FORMAT))
+        handlers.append(sh)
+
+    if multiprocess:
+        q = multiprocessing.get_context("fork").Queue(QUEUE_SIZE)
+        # újra regisztrálva: a multiprocessing saját atexit-je (sor lezárás) előtt kell lefutnia
+        atexit.register(shutdown)
+    else:
+        q = queue.Queue(QUEUE_SIZE)
+    qh = _DropQueueHandler(q)
+    qh.addFilter(_StageFilter(stage))
+
+    root = logging.getLogger()
+    for h in list(root.handlers):
+        root.removeHandler(h)
+    root.addHandler(qh)
+    root.setLevel(level)
+
+    _LISTENER = logging.handlers.QueueListener(q, *handlers, respect_handler_level=True)
+    _LISTENER.start()
+    return logging.getLogger(stage) if stage else root
+
+def setup_from_config(cfg: Dict, log_file: Optional[str] = None, stage: Optional[str] = None,
+                      **kwargs) -> logging.Logger:
+    """setup_logging a config "logging" blokkjából (json_lines, max_bytes, backup_count, level)"""
+    cfg = cfg or {}
+    return setup_logging(
+        log_file=log_file,
+        stage=stage,
+        level=logging.getLevelName(str(cfg.get("level", "INFO")).upper()),
+        json_lines=cfg.get("json_lines"),
+        max_bytes=cfg.get("max_bytes", DEFAULT_MAX_BYTES),
+        backup_count=cfg.get("backup_count", DEFAULT_BACKUP_COUNT),
+        **kwargs,
+    )
+
+def shutdown():
+    """háttérszál leállítása a sorban maradt rekordok kiírása után"""
+    global _LISTENER
+    if _LISTENER is not None:
+        _LISTENER.stop()
+        for h in _LISTENER.handlers:
+            h.close()
+        _LISTENER = None
+
+def after_fork():
+    """gyerek processzben (multiprocessing fork): a szülő háttérszála nem a miénk, nem állítjuk le"""
+    global _LISTENER
+    _LISTENER = None
+
+atexit.register(shutdown)
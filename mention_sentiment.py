@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+mention_sentiment.py
+Cég-sentiment batchelve, cikkenként egy inference hívással
+- bemenet: a cégemlítés köré középre igazított ablak (egy claim több cégre külön sort adhat)
+- a tokenizer csonkol (truncation=True, max_length), a hosszú claim nem esik ki
+- címkék: POSITIVE/NEGATIVE/NEUTRAL vagy csillagos (nlptown: 1-2 negatív, 3 semleges, 4-5 pozitív)
+- a bemenetek token kerettel képzett batchekben futnak (token_batching)
+"""
+
+import re
+from typing import Callable, Dict, List, Optional, Sequence
+
+import token_batching
+
+DEFAULT_WINDOW_CHARS = 200
+DEFAULT_BATCH_SIZE = 16
+MAX_LENGTH = 512
+
+_STARS = re.compile(r"^\s*(\d)\s*star", re.IGNORECASE)
+
+def mention_window(text: str, start: int, end: int, window_chars: int = DEFAULT_WINDOW_CHARS) -> str:
+    """az említés köré középre igazított, szóhatárra igazított szövegrész"""
+    if len(text) <= window_chars:
+        return text
+    pad = max(0, (window_chars - (end - start)) // 2)
+    lo = max(0, start - pad)
+    hi = min(len(text), end + pad)
+    # a le nem használt helyet a másik oldal kapja
+    if lo == 0:
+        hi = min(len(text), window_chars)
+    elif hi == len(text):
+        lo = max(0, len(text) - window_chars)
+    if lo > 0:
+        sp = text.find(" ", lo, start)
+        lo = sp + 1 if sp != -1 else lo
+    if hi < len(text):
+        sp = text.rfind(" ", end, hi)
+        hi = sp if sp != -1 else hi
+    return text[lo:hi].strip()
+
+def normalize_label(label: str) -> str:
+    """positive / negative / neutral"""
+    label = (label or "").strip().lower()
+    m = _STARS.match(label)
+    if m:
+        stars = int(m.group(1))
+        return "negative" if stars <= 2 else ("neutral" if stars == 3 else "positive")
+    if label in ("positive", "negative"):
+        return label
+    return "neutral"
+
+def analyze(sentiment_pipe, inputs: Sequence[str], batch_size: int = DEFAULT_BATCH_SIZE,
+            max_length: int = MAX_LENGTH,
+            on_error: Optional[Callable[[Exception], None]] = None,
+            max_tokens: int = token_batching.DEFAULT_MAX_TOKENS) -> List[Optional[str]]:
+    """hossz szerint batchelt hívások az összes bemenetre; None, ha a batch hibára futott"""
+    if not sentiment_pipe or not inputs:
+        return [None] * len(inputs)
+
+    def run_batch(batch: List[str]) -> List:
+        results = sentiment_pipe(batch, batch_size=len(batch), truncation=True, max_length=max_length)
+        return [results] if isinstance(results, dict) else results
+
+    results = token_batching.run(
+        run_batch, list(inputs), "sentiment", max_tokens, batch_size,
+        # a tokenizer max_length-re csonkol, a padding sem lehet hosszabb
+        length=lambda s: min(token_batching.estimate_tokens(s), max_length),
+        on_error=on_error,
+    )
+    out = []
+    for r in results:
+        if isinstance(r, list):
+            r = r[0] if r else {}
+        out.append(normalize_label(r.get("label")) if r else None)
+    return out
+
+def company_sentiments(sentiment_pipe, claims: Sequence[str], find_mentions: Callable[[str], List[Dict]],
+                       window_chars: int = DEFAULT_WINDOW_CHARS, batch_size: int = DEFAULT_BATCH_SIZE,
+                       on_error: Optional[Callable[[Exception], None]] = None,
+                       max_tokens: int = token_batching.DEFAULT_MAX_TOKENS) -> List[List[tuple]]:
+    """
+    Claimenként [(company_id, label, mention), ...] - cégenként az első említés ablakából.
+    A cikk összes említése egyetlen batchelt hívásban megy.
+    """
+    owners, inputs, meta = [], [], []
+    for n, claim in enumerate(claims):
+        seen = set()
+        for m in find_mentions(claim):
+            if m["company_id"] in seen:
+                continue
+            seen.add(m["company_id"])
+            owners.append(n)
+            inputs.append(mention_window(claim, m["start"], m["end"], window_chars))
+            meta.append((m["company_id"], m["mention"]))
+    out: List[List[tuple]] = [[] for _ in claims]
+    labels = analyze(sentiment_pipe, inputs, batch_size, on_error=on_error, max_tokens=max_tokens)
+    for n, (company_id, mention), label in zip(owners, meta, labels):
+        if label:
+            out[n].append((company_id, label, mention))
+    return out
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+model_backend.py
+Modell backend választás az extract workerhez: PyTorch (fp32) vagy ONNX Runtime (dinamikus int8)
+- ONNX: export + kvantálás egyszer, utána a cache könyvtárból töltődik (optimum[onnxruntime])
+- bármilyen hiba esetén visszaesés PyTorch-ra (a worker nem áll le)
+- parity(): címke egyezés két pipeline között ugyanazon a korpuszon
+- snapshot_dir: rögzített (revision) helyi modell másolatok, hub lekérdezés nélkül
+- LazyPipeline: első használatkor tölt be, üresjárat után felszabadul
+"""
+
+import gc
+import os
+import re
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+BACKEND_TORCH = "torch"
+BACKEND_ONNX = "onnx"
+DEFAULT_CACHE_DIR = "/opt/newscred/onnx_cache"
+QUANTIZED_FILE = "model_quantized.onnx"
+REVISION_FILE = "REVISION"
+
+# pipeline task → optimum ORTModel osztály
+_ORT_CLASSES = {
+    "zero-shot-classification": "ORTModelForSequenceClassification",
+    "sentiment-analysis": "ORTModelForSequenceClassification",
+    "text-classification": "ORTModelForSequenceClassification",
+    "ner": "ORTModelForTokenClassification",
+    "token-classification": "ORTModelForTokenClassification",
+}
+
+def cache_path(cache_dir: str, model: str) -> str:
+    """modellenkénti cache könyvtár (a / és egyéb jelek helyett _)"""
+    return os.path.join(cache_dir, re.sub(r"[^\w.-]+", "_", model))
+
+def resolve(model: Optional[str], snapshot_dir: Optional[str]) -> Optional[str]:
+    """helyi snapshot útvonal, ha van; egyébként a hub azonosító"""
+    if model and snapshot_dir:
+        path = cache_path(snapshot_dir, model)
+        if os.path.isdir(path):
+            return path
+    return model
+
+def version(model: Optional[str], backend: str = BACKEND_TORCH, snapshot_dir: Optional[str] = None) -> str:
+    """modell verzió azonosító (cache kulcshoz): név@revision:backend"""
+    revision = "hub"
+    if model and snapshot_dir:
+        try:
+            with open(os.path.join(cache_path(snapshot_dir, model), REVISION_FILE), encoding="utf-8") as f:
+                revision = f.read().strip() or revision
+        except OSError:
+            pass
+    return f"{model}@{revision}:{backend}"
+
+def snapshot(model: str, snapshot_dir: str, revision: Optional[str] = None,
+             token: Optional[str] = None) -> str:
+    """modell letöltése a snapshot könyvtárba (egyszer, telepítéskor)"""
+    from huggingface_hub import snapshot_download
+
+    path = cache_path(snapshot_dir, model)
+    snapshot_download(repo_id=model, revision=revision, local_dir=path, token=token)
+    with open(os.path.join(path, REVISION_FILE), "w", encoding="utf-8") as f:
+        f.write((revision or "main") + "\n")
+    return path
+
+def _ort_class(task: str):
+    import optimum.onnxruntime as ort
+    return getattr(ort, _ORT_CLASSES[task])
+
+def export_int8(task: str, model: str, cache_dir: str = DEFAULT_CACHE_DIR,
+                token: Optional[str] = None, source: Optional[str] = None) -> str:
+    """ONNX export + dinamikus int8 kvantálás (ha még nincs a cache-ben); visszatérés: könyvtár"""
+    from optimum.onnxruntime import ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+    from transformers import AutoTokenizer
+
+    target = cache_path(cache_dir, model)
+    if os.path.exists(os.path.join(target, QUANTIZED_FILE)):
+        return target
+
+    source = source or model
+    fp32_dir = target + "-fp32"
+    ort_model = _ort_class(task).from_pretrained(source, export=True, token=token)
+    ort_model.save_pretrained(fp32_dir)
+    AutoTokenizer.from_pretrained(source, token=token).save_pretrained(fp32_dir)
+
+    quantizer = ORTQuantizer.from_pretrained(fp32_dir)
+    qconfig = AutoQuantizationConfig.avx2(is_static=False, per_channel=False)
+    quantizer.quantize(save_dir=target, quantization_config=qconfig)
+    AutoTokenizer.from_pretrained(fp32_dir).save_pretrained(target)
+    # a config.json a betöltéshez kell
+    ort_model.config.save_pretrained(target)
+    return target
+
+def _onnx_pipeline(task: str, model: str, cache_dir: str, token: Optional[str],
+                   source: Optional[str] = None, **pipe_kwargs):
+    from transformers import AutoTokenizer, pipeline
+
+    path = export_int8(task, model, cache_dir, token, source)
+    ort_model = _ort_class(task).from_pretrained(path, file_name=QUANTIZED_FILE)
+    tokenizer = AutoTokenizer.from_pretrained(path)
+    return pipeline(task, model=ort_model, tokenizer=tokenizer, **pipe_kwargs)
+
+def load_pipeline(task: str, model: Optional[str], backend: str = BACKEND_TORCH,
+                  cache_dir: str = DEFAULT_CACHE_DIR, token: Optional[str] = None,
+                  log: Optional[Callable[[str], None]] = None,
+                  snapshot_dir: Optional[str] = None, **pipe_kwargs) -> Tuple[object, str]:
+    """
+    HF pipeline a kért backenddel; visszatérés: (pipeline, ténylegesen használt backend).
+    ONNX hiba (nincs optimum, export hiba, nincs modell név) → PyTorch fp32, device=-1.
+    """
+    source = resolve(model, snapshot_dir)
+    if backend == BACKEND_ONNX and model and task in _ORT_CLASSES:
+        try:
+            return _onnx_pipeline(task, model, cache_dir, token, source, **pipe_kwargs), BACKEND_ONNX
+        except Exception as e:
+            if log:
+                log(f"⚠️ ONNX backend unavailable for {model} ({type(e).__name__}: {e}), falling back to PyTorch")
+
+    from transformers import pipeline
+    return pipeline(task, model=source, device=-1, **pipe_kwargs), BACKEND_TORCH
+
+class LazyPipeline:
+    """pipeline proxy: első híváskor tölt be (szálbiztosan), idle_seconds üresjárat után elengedi"""
+
+    def __init__(self, name: str, loader: Callable[[], object], idle_seconds: float = 0,
+                 log: Optional[Callable[[str], None]] = None):
+        self.name = name
+        self.loader = loader
+        self.idle_seconds = idle_seconds
+        self.log = log
+        self._pipe = None
+        self._lock = threading.Lock()
+        self.last_used = 0.0
+
+    @property
+    def loaded(self) -> bool:
+        return self._pipe is not None
+
+    def get(self):
+        with self._lock:
+            if self._pipe is None:
+                t0 = time.perf_counter()
+                self._pipe = self.loader()
+                if self.log:
+                    self.log(f"✅ {self.name} model loaded on first use ({time.perf_counter() - t0:.1f}s)")
+            self.last_used = time.monotonic()
+            return self._pipe
+
+    def __call__(self, *args, **kwargs):
+        return self.get()(*args, **kwargs)
+
+    def maybe_unload(self) -> bool:
+        """felszabadítás, ha idle_seconds óta nem használták"""
+        if not self.idle_seconds or self._pipe is None:
+            return False
+        with self._lock:
+            if self._pipe is None or time.monotonic() - self.last_used < self.idle_seconds:
+                return False
+            self._pipe = None
+        gc.collect()
+        if self.log:
+            self.log(f"💤 {self.name} model unloaded after {self.idle_seconds:.0f}s idle")
+        return True
+
+# ===== PARITY =====
+def top_label(task: str, result) -> Optional[object]:
+    """összehasonlítható kimenet taskonként"""
+    if task == "zero-shot-classification":
+        return (result.get("labels") or [None])[0]
+    if task in ("ner", "token-classification"):
+        return tuple(sorted((e.get("entity_group"), e.get("start"), e.get("end")) for e in result))
+    if isinstance(result, list):
+        result = result[0] if result else {}
+    return result.get("label")
+
+def parity(task: str, pipe_a, pipe_b, texts: Sequence[str], **call_kwargs) -> Dict:
+    """címke egyezés aránya két pipeline között"""
+    mismatches: List[Dict] = []
+    for text in texts:
+        a = top_label(task, pipe_a(text, **call_kwargs))
+        b = top_label(task, pipe_b(text, **call_kwargs))
+        if a != b:
+            mismatches.append({"text": text[:120], "a": a, "b": b})
+    n = len(texts)
+    return {
+        "task": task,
+        "samples": n,
+        "agreement": round((n - len(mismatches)) / n, 4) if n else 1.0,
+        "mismatches": mismatches,
+    }
+
+# ===== CLI: snapshot letöltés =====
+if __name__ == "__main__":
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Modellek letöltése rögzített revisionnel a snapshot könyvtárba")
+    ap.add_argument("--dir", required=True, help="snapshot könyvtár (extraction.snapshot_dir)")
+    ap.add_argument("--token", default=os.environ.get("HF_TOKEN"))
+    ap.add_argument("models", nargs="+", help="modell[@revision], pl. facebook/bart-large-mnli@<commit>")
+    args = ap.parse_args()
+    for spec in args.models:
+        name, _, rev = spec.partition("@")
+        print(f"{name} → {snapshot(name, args.dir, rev or None, args.token)}")
+    sys.exit(0)
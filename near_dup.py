@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+near_dup.py
+MinHash / LSH közel-duplikátum felismerés az article_texts sorokra
+- 3 szavas shingle-ök, NUM_PERM permutációs MinHash aláírás
+- LSH sávok MySQL-ben (article_minhash_bands), inkrementálisan bővítve
+- a duplikátum a kanonikus (legkorábbi) cikkre mutat: article_minhash.canonical_id
+- a duplikátum a kanonikus eredményét veszi át; ha a kanonikus 'dead' / 'empty' lett, vagy
+  canonical_grace_minutes alatt sincs eredménye, a duplikátum a szokásos úton kerül feldolgozásra
+"""
+
+import re
+import zlib
+from array import array
+from typing import Dict, List, Optional, Set, Tuple
+
+import pymysql
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_WORDS = 3
+MIN_SHINGLES = 10
+DEFAULT_THRESHOLD = 0.8
+DEFAULT_CANONICAL_GRACE_MINUTES = 60
+
+_MERSENNE = (1 << 61) - 1
+_MAX32 = (1 << 32) - 1
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+def _make_perms(n: int) -> List[Tuple[int, int]]:
+    """determinisztikus (a, b) párok - processzek és futások között azonos"""
+    perms, x = [], 0x9E3779B97F4A7C15
+    for _ in range(n):
+        x = (x * 6364136223846793005 + 1442695040888963407) & ((1 << 64) - 1)
+        a = (x >> 3) % (_MERSENNE - 1) + 1
+        x = (x * 6364136223846793005 + 1442695040888963407) & ((1 << 64) - 1)
+        b = (x >> 3) % _MERSENNE
+        perms.append((a, b))
+    return perms
+
+_PERMS = _make_perms(NUM_PERM)
+
+# ===== MINHASH =====
+def shingles(text: str) -> Set[int]:
+    """szó-shingle-ök 32 bites hash-e (kisbetűs, írásjelek nélkül)"""
+    words = _WORD.findall((text or "").lower())
+    out = set()
+    for i in range(max(len(words) - SHINGLE_WORDS + 1, 0)):
+        out.add(zlib.crc32(" ".join(words[i:i + SHINGLE_WORDS]).encode("utf-8")))
+    return out
+
+def signature(sh: Set[int]) -> Optional[array]:
+    """MinHash aláírás (None, ha túl rövid a szöveg)"""
+    if len(sh) < MIN_SHINGLES:
+        return None
+    sig = array("I")
+    for a, b in _PERMS:
+        sig.append(min(((a * x + b) % _MERSENNE) & _MAX32 for x in sh))
+    return sig
+
+def similarity(sig_a: array, sig_b: array) -> float:
+    """becsült Jaccard hasonlóság"""
+    same = sum(1 for x, y in zip(sig_a, sig_b) if x == y)
+    return same / len(sig_a)
+
+def band_keys(sig: array) -> List[Tuple[int, int]]:
+    """(sáv, bucket) párok"""
+    keys = []
+    for band in range(BANDS):
+        chunk = sig[band * ROWS:(band + 1) * ROWS]
+        keys.append((band, zlib.crc32(chunk.tobytes())))
+    return keys
+
+# ===== SCHEMA =====
+def ensure_minhash_tables(conn):
+    """article_minhash + article_minhash_bands táblák létrehozása, ha még nincsenek"""
+    with conn.cursor() as cur:
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS article_minhash (
+          article_id BIGINT PRIMARY KEY,
+          signature VARBINARY(512) NULL,
+          canonical_id BIGINT NULL,
+          similarity FLOAT NULL,
+          created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+          KEY idx_canonical (canonical_id)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+        """)
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS article_minhash_bands (
+          band TINYINT UNSIGNED NOT NULL,
+          bucket INT UNSIGNED NOT NULL,
+          article_id BIGINT NOT NULL,
+          PRIMARY KEY (band, bucket, article_id)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+        """)
+
+def awaits_canonical(column: str) -> str:
+    """
+    Jelölt lekérdezésbe illeszthető feltétel (két %s paraméter: grace perc, stage): igaz, ha a cikk
+    duplikátum, és még a kanonikus eredményére vár - a kanonikus work_items sora nem 'dead' / 'empty',
+    és a grace idő sem telt le. NOT-tal a jelölt lekérdezésbe: a többi duplikátum normál úton fut.
+    """
+    return f"""EXISTS (SELECT 1 FROM article_minhash m
+                  WHERE m.article_id = {column} AND m.canonical_id IS NOT NULL
+                    AND m.created_at > NOW() - INTERVAL %s MINUTE
+                    AND NOT EXISTS (SELECT 1 FROM work_items cw
+                                    WHERE cw.stage = %s AND cw.article_id = m.canonical_id
+                                      AND cw.status IN ('dead', 'empty')))"""
+
+# ===== INDEX =====
+def _candidates(cur, keys: List[Tuple[int, int]], exclude: int) -> List[int]:
+    where = " OR ".join(["(band = %s AND bucket = %s)"] * len(keys))
+    params = [v for k in keys for v in k]
+    cur.execute(f"""
+        SELECT DISTINCT article_id FROM article_minhash_bands
+        WHERE ({where}) AND article_id <> %s
+    """, (*params, exclude))
+    return [r[0] for r in cur.fetchall()]
+
+def _load_signatures(cur, ids: List[int]) -> Dict[int, Tuple[array, Optional[int]]]:
+    if not ids:
+        return {}
+    marks = ",".join(["%s"] * len(ids))
+    cur.execute(f"""
+        SELECT article_id, signature, canonical_id FROM article_minhash
+        WHERE article_id IN ({marks}) AND signature IS NOT NULL
+    """, ids)
+    out = {}
+    for aid, blob, canon in cur.fetchall():
+        sig = array("I")
+        sig.frombytes(bytes(blob))
+        out[aid] = (sig, canon)
+    return out
+
+def index_article(conn, article_id: int, text: str,
+                  threshold: float = DEFAULT_THRESHOLD) -> Optional[Tuple[int, float]]:
+    """cikk felvétele az indexbe; visszatérés (canonical_id, hasonlóság), ha duplikátum"""
+    sig = signature(shingles(text))
+    best: Optional[Tuple[int, float]] = None
+    with conn.cursor() as cur:
+        if sig is not None:
+            keys = band_keys(sig)
+            sigs = _load_signatures(cur, _candidates(cur, keys, article_id))
+            for cand_id, (cand_sig, cand_canon) in sigs.items():
+                sim = similarity(sig, cand_sig)
+                if sim < threshold:
+                    continue
+                # mindig a lánc elejére mutatunk (legkorábbi cikk)
+                canon = cand_canon or cand_id
+                if canon >= article_id:
+                    continue
+                if best is None or sim > best[1] or (sim == best[1] and canon < best[0]):
+                    best = (canon, sim)
+        cur.execute("""
+            INSERT IGNORE INTO article_minhash (article_id, signature, canonical_id, similarity)
+            VALUES (%s, %s, %s, %s)
+        """, (article_id, sig.tobytes() if sig is not None else None,
+              best[0] if best else None, best[1] if best else None))
+        # csak a kanonikus cikkek kerülnek a sávokba: a duplikátum a kanonikusán keresztül talált
+        if sig is not None and best is None:
+            cur.executemany(
+                "INSERT IGNORE INTO article_minhash_bands (band, bucket, article_id) VALUES (%s, %s, %s)",
+                [(band, bucket, article_id) for band, bucket in keys],
+            )
+    return best
+
+def index_pending(conn, limit: int = 500, threshold: float = DEFAULT_THRESHOLD) -> Tuple[int, int]:
+    """még nem indexelt article_texts sorok feldolgozása (növekvő id, hogy a korábbi legyen a kanonikus)"""
+    q = """
+        SELECT t.article_id, t.text
+        FROM article_texts t
+        LEFT JOIN article_minhash m ON m.article_id = t.article_id
+        WHERE m.article_id IS NULL AND t.text IS NOT NULL
+        ORDER BY t.article_id ASC
+        LIMIT %s
+    """
+    with conn.cursor(pymysql.cursors.DictCursor) as cur:
+        cur.execute(q, (limit,))
+        rows = cur.fetchall()
+    dups = 0
+    for r in rows:
+        if index_article(conn, r["article_id"], r["text"], threshold):
+            dups += 1
+    return len(rows), dups
+
+def savings(conn) -> Dict[str, int]:
+    """stage-enkénti megtakarítás: duplikátumok, átvett fordítások, átvett claimek"""
+    q = """
+        SELECT COUNT(*) AS duplicates,
+               COALESCE(SUM(t.en_provider = 'duplicate'), 0) AS translate_reused,
+               COALESCE(SUM(EXISTS (SELECT 1 FROM claims c WHERE c.article_id = m.article_id)), 0) AS extract_reused
+        FROM article_minhash m
+        JOIN article_texts t ON t.article_id = m.article_id
+        WHERE m.canonical_id IS NOT NULL
+    """
+    with conn.cursor(pymysql.cursors.DictCursor) as cur:
+        cur.execute(q)
+        row = cur.fetchone() or {}
+    return {k: int(v or 0) for k, v in row.items()}
@@ -41,16 +41,19 @@ import requests
 import feedparser
 import pymysql
 
+import log_setup
+import pipeline_events
+
 GDELT_DOC_API = "https://api.gdeltproject.org/api/v2/doc/doc"
 GOOGLE_NEWS_RSS = "https://news.google.com/rss/search?q=NVIDIA%20OR%20NVDA&hl=en-US&gl=US&ceid=US:en"
 
 KEYWORDS_HARD = {"nvidia","nvda","jensen huang","geforce","cuda","h100","b200","gb200"}
 
 # ---------- Logging ----------
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s",
-    stream=sys.stdout,
+log_setup.setup_logging(
+    os.environ.get("NVDA_AGENT_LOG"),
+    stage="nvda_agent",
+    fmt="%(asctime)s [%(levelname)s] %(message)s",
 )
 
 def load_db_cfg():
@@ -223,6 +226,7 @@ def main():
         use_articles = True if {"url","title","source","published_at","fetched_at"}.issubset(cols) else False
     if not use_articles:
         ensure_stage(cur)
+    pipeline_events.ensure_pipeline_events_table(conn)
 
     fetched = []
     try:
@@ -265,17 +269,22 @@ def main():
         })
 
     inserted = updated = staged = 0
+    new_ids = []
     for row in items:
         if use_articles:
             ok = upsert_into_articles(cur, row, columns_for(cur,"articles"))
             if ok:
                 inserted += cur.rowcount in (1,2)  # crude counter
+                if cur.rowcount == 1 and cur.lastrowid:
+                    new_ids.append(cur.lastrowid)
             else:
                 ensure_stage(cur)
                 insert_into_stage(cur, row); staged += 1
         else:
             insert_into_stage(cur, row); staged += 1
 
+    # outbox event for the translate/extract workers, same transaction as the inserts
+    pipeline_events.emit(cur, pipeline_events.ARTICLE_INGESTED, new_ids)
     conn.commit()
     logging.info(f"Processed items: {len(items)} | staged: {staged} | direct_inserts(updates): ~{inserted}")
     cur.close(); conn.close()
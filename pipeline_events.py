@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+pipeline_events.py
+Append-only outbox (pipeline_events) a pipeline stage-ek között
+- írók: RSS scraper, NVDA agent, translate/extract worker (ugyanabban a tranzakcióban)
+- olvasók: monoton növekvő id cursor + rövid long-poll, fix sleep helyett
+"""
+
+import time
+from typing import Callable, Iterable, Optional, Sequence
+
+# Esemény típusok
+ARTICLE_INGESTED = "article_ingested"
+TRANSLATED = "translated"
+EXTRACTED = "extracted"
+
+DEFAULT_POLL_INTERVAL = 1.0
+DEFAULT_RETENTION_DAYS = 7
+
+# ===== SCHEMA =====
+def ensure_pipeline_events_table(conn):
+    """pipeline_events tábla létrehozása, ha még nincs"""
+    with conn.cursor() as cur:
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS pipeline_events (
+          id BIGINT PRIMARY KEY AUTO_INCREMENT,
+          event_type VARCHAR(32) NOT NULL,
+          article_id BIGINT NOT NULL,
+          created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+          KEY idx_type_id (event_type, id),
+          KEY idx_created (created_at)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+        """)
+
+# ===== WRITE =====
+def emit(cur, event_type: str, article_ids: Iterable[int]) -> int:
+    """események írása a hívó cursorán (a hívó tranzakciójában commitolódik)"""
+    ids = [int(a) for a in article_ids if a]
+    if not ids:
+        return 0
+    values = ",".join(["(%s, %s)"] * len(ids))
+    params = []
+    for a in ids:
+        params.extend((event_type, a))
+    cur.execute(f"INSERT INTO pipeline_events (event_type, article_id) VALUES {values}", params)
+    return len(ids)
+
+def prune(conn, days: int = DEFAULT_RETENTION_DAYS) -> int:
+    """régi események törlése"""
+    with conn.cursor() as cur:
+        cur.execute("DELETE FROM pipeline_events WHERE created_at < NOW() - INTERVAL %s DAY", (days,))
+        return cur.rowcount
+
+# ===== READ =====
+def latest_id(conn) -> int:
+    """aktuális cursor pozíció (induláskor)"""
+    with conn.cursor() as cur:
+        cur.execute("SELECT COALESCE(MAX(id), 0) FROM pipeline_events")
+        row = cur.fetchone()
+    if isinstance(row, dict):
+        row = list(row.values())
+    return int(row[0] or 0)
+
+def poll(conn, event_types: Sequence[str], cursor: int) -> int:
+    """legnagyobb új esemény id a cursor után (0, ha nincs)"""
+    marks = ",".join(["%s"] * len(event_types))
+    with conn.cursor() as cur:
+        cur.execute(f"""
+            SELECT COALESCE(MAX(id), 0) FROM pipeline_events
+            WHERE id > %s AND event_type IN ({marks})
+        """, (cursor, *event_types))
+        row = cur.fetchone()
+    if isinstance(row, dict):
+        row = list(row.values())
+    return int(row[0] or 0)
+
+def wait_for_events(conn, event_types: Sequence[str], cursor: int, timeout: float,
+                    poll_interval: float = DEFAULT_POLL_INTERVAL,
+                    keep_running: Optional[Callable[[], bool]] = None) -> int:
+    """
+    Long-poll: vár, amíg új esemény érkezik (vagy lejár a timeout / leállítás jön).
+    Visszatérés: az új cursor (változatlan, ha nem jött esemény).
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        newest = poll(conn, event_types, cursor)
+        if newest > cursor:
+            return newest
+        if keep_running is not None and not keep_running():
+            return cursor
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return cursor
+        time.sleep(min(poll_interval, remaining))
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+priority.py
+Prioritás pontszám a translate/extract backlog elemeihez
+- frissesség (exponenciális lecsengés a megjelenés óta)
+- forrás súly (config: priority.source_weights {source_id: súly})
+- követett stock_products ticker / cégnév / alias a címben (company_matcher.CompanyMatcher)
+- kézi újrasorolás (api_translate) kiemelése
+Az öregedést (éhezés ellen) a work_queue.claim rendezése adja hozzá.
+"""
+
+import math
+import time
+from datetime import datetime
+from typing import Dict, Optional, Sequence
+
+import company_matcher
+import work_queue
+
+DEFAULTS = {
+    "freshness_weight": 10.0,
+    "freshness_half_life_hours": 12.0,
+    "company_weight": 20.0,
+    "manual_weight": 100.0,
+    "aging_per_hour": work_queue.DEFAULT_AGING_PER_HOUR,
+    "refresh_seconds": 600,
+}
+
+class PriorityScorer:
+    """pontszámító; a követett cégek listáját refresh_seconds-onként frissíti"""
+
+    def __init__(self, cfg: Optional[Dict] = None, aliases: Optional[Dict[str, Sequence[str]]] = None):
+        cfg = dict(DEFAULTS, **(cfg or {}))
+        self.freshness_weight = float(cfg["freshness_weight"])
+        self.half_life = float(cfg["freshness_half_life_hours"])
+        self.company_weight = float(cfg["company_weight"])
+        self.manual_weight = float(cfg["manual_weight"])
+        self.aging_per_hour = float(cfg["aging_per_hour"])
+        self.refresh_seconds = float(cfg["refresh_seconds"])
+        self.source_weights = {int(k): float(v) for k, v in (cfg.get("source_weights") or {}).items()}
+        self.aliases = aliases or {}
+        self._matcher: Optional[company_matcher.CompanyMatcher] = None
+        self._loaded_at = 0.0
+
+    def load_companies(self, conn):
+        """követett cégek (név, ticker, alias) a közös cégfelismerővel"""
+        self._matcher = company_matcher.CompanyMatcher(company_matcher.load_companies(conn), self.aliases)
+        self._loaded_at = time.monotonic()
+
+    def maybe_refresh(self, conn):
+        if self._matcher is None or time.monotonic() - self._loaded_at > self.refresh_seconds:
+            self.load_companies(conn)
+
+    def mentions_company(self, text: str) -> bool:
+        """szerepel-e követett cég / ticker a szövegben"""
+        return bool(self._matcher is not None and text and self._matcher.mentions(text))
+
+    def score(self, title: str, published_at, source_id, manual: bool = False) -> float:
+        s = 0.0
+        if isinstance(published_at, datetime):
+            age_h = max((datetime.now() - published_at.replace(tzinfo=None)).total_seconds() / 3600, 0.0)
+            s += self.freshness_weight * math.pow(0.5, age_h / self.half_life)
+        if source_id is not None:
+            s += self.source_weights.get(int(source_id), 0.0)
+        if self.mentions_company(title):
+            s += self.company_weight
+        if manual:
+            s += self.manual_weight
+        return round(s, 3)
+
+def score_pending(conn, stage: str, scorer: PriorityScorer, limit: int = 1000) -> int:
+    """pontozatlan pending elemek pontozása"""
+    scorer.maybe_refresh(conn)
+    rows = work_queue.unscored(conn, stage, limit)
+    scores = [
+        (scorer.score(r["title"], r["published_at"], r["source_id"], bool(r["manual"])), r["id"])
+        for r in rows
+    ]
+    work_queue.set_priorities(conn, scores)
+    return len(scores)
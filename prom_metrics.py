@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+prom_metrics.py
+Minimális Prometheus-kompatibilis metrikák (counter, gauge, histogram) + beágyazott HTTP szerver
+- külső függőség nélkül, szálbiztos
+- GET /metrics → Prometheus text format (0.0.4)
+"""
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+def _escape(v: str) -> str:
+    return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _fmt_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{_escape(extra[1])}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _fmt_value(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if not float(v).is_integer() else str(int(v))
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, doc: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.doc = doc
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(n, "")) for n in self.label_names)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} {self.kind}"]
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, doc, labels=()):
+        super().__init__(name, doc, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        k = self._key(labels)
+        with self._lock:
+            self._values[k] = self._values.get(k, 0.0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return self.header() + [
+            f"{self.name}{_fmt_labels(self.label_names, k)} {_fmt_value(v)}" for k, v in items
+        ]
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        k = self._key(labels)
+        with self._lock:
+            self._values[k] = float(value)
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, doc, labels=(), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, doc, labels)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._data: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels):
+        k = self._key(labels)
+        with self._lock:
+            d = self._data.setdefault(k, [0.0] * (len(self.buckets) + 2))
+            for i, b in enumerate(self.buckets):
+                if value <= b:
+                    d[i] += 1
+            d[-2] += value
+            d[-1] += 1
+
+    def time(self, **labels):
+        """context manager: eltelt idő mérése másodpercben"""
+        return _Timer(self, labels)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = [(k, list(d)) for k, d in self._data.items()]
+        out = self.header()
+        for k, d in items:
+            for i, b in enumerate(self.buckets):
+                le = "+Inf" if b == float("inf") else repr(b)
+                out.append(f"{self.name}_bucket{_fmt_labels(self.label_names, k, ('le', le))} {_fmt_value(d[i])}")
+            out.append(f"{self.name}_sum{_fmt_labels(self.label_names, k)} {_fmt_value(d[-2])}")
+            out.append(f"{self.name}_count{_fmt_labels(self.label_names, k)} {_fmt_value(d[-1])}")
+        return out
+
+class _Timer:
+    def __init__(self, hist: Histogram, labels: Dict[str, str]):
+        self.hist = hist
+        self.labels = labels
+
+    def __enter__(self):
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.hist.observe(time.perf_counter() - self._t0, **self.labels)
+        return False
+
+class Registry:
+    """metrikák gyűjteménye"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _add(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, doc: str, labels: Sequence[str] = ()) -> Counter:
+        return self._add(Counter(name, doc, labels))
+
+    def gauge(self, name: str, doc: str, labels: Sequence[str] = ()) -> Gauge:
+        return self._add(Gauge(name, doc, labels))
+
+    def histogram(self, name: str, doc: str, labels: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, doc, labels, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for m in metrics:
+            lines.extend(m.render())
+        return "\n".join(lines) + "\n"
+
+REGISTRY = Registry()
+
+# ===== PIPELINE METRIKÁK (translate/extract worker) =====
+ARTICLES = REGISTRY.counter("newscred_articles_processed_total", "Articles processed per stage and result", ["stage", "result"])
+CHUNKS = REGISTRY.counter("newscred_chunks_processed_total", "Translation chunks processed per result", ["stage", "result"])
+ITEMS = REGISTRY.counter("newscred_items_extracted_total", "Extracted items (claims, entities, sentiments)", ["stage", "kind"])
+STAGE_SECONDS = REGISTRY.histogram("newscred_stage_seconds", "Latency per pipeline step", ["stage", "step"])
+SENTENCES = REGISTRY.counter("newscred_nli_sentences_total", "Candidate sentences per NLI decision", ["stage", "result"])
+RETRIES = REGISTRY.counter("newscred_retries_total", "Retried requests per reason", ["stage", "reason"])
+CPU_PAUSES = REGISTRY.counter("newscred_cpu_throttle_pauses_total", "CPU budget pauses", ["stage"])
+CPU_PAUSE_SECONDS = REGISTRY.counter("newscred_cpu_throttle_pause_seconds_total", "Time spent in CPU budget pauses", ["stage"])
+CPU_PERCENT = REGISTRY.gauge("newscred_cpu_percent", "Worker CPU usage measured by the governor", ["stage"])
+BATCH_SIZE = REGISTRY.gauge("newscred_governor_batch_size", "Batch size chosen by the CPU governor", ["stage"])
+CONCURRENCY = REGISTRY.gauge("newscred_governor_concurrency", "Concurrency chosen by the CPU governor", ["stage"])
+BACKLOG = REGISTRY.gauge("newscred_backlog_items", "work_items per stage and status", ["stage", "status"])
+STARTUP_SECONDS = REGISTRY.gauge("newscred_startup_seconds", "Seconds from process start to a startup phase", ["stage", "phase"])
+INFERENCE_CACHE = REGISTRY.counter("newscred_inference_cache_lookups_total", "Inference cache lookups per task and result (memory, db, miss)", ["stage", "task", "result"])
+INFERENCE_CACHE_HIT_RATIO = REGISTRY.gauge("newscred_inference_cache_hit_ratio", "Inference cache hit ratio since process start", ["stage", "task"])
+PADDING_EFFICIENCY = REGISTRY.gauge("newscred_batch_padding_efficiency", "Real / padded tokens in inference batches", ["stage", "task"])
+PADDED_TOKENS = REGISTRY.gauge("newscred_batch_tokens", "Estimated tokens sent in inference batches since start", ["stage", "task", "kind"])
+MODEL_LOAD_SECONDS = REGISTRY.gauge("newscred_model_load_seconds", "Model load time", ["stage", "model"])
+
+def export_governor(stage: str, snapshot: Dict):
+    """CPU governor döntéseinek exportja"""
+    CPU_PERCENT.set(snapshot.get("cpu_percent", 0), stage=stage)
+    BATCH_SIZE.set(snapshot.get("batch_size", 0), stage=stage)
+    CONCURRENCY.set(snapshot.get("concurrency", 0), stage=stage)
+
+def export_backlog(stage: str, sizes: Dict[str, int]):
+    """work_items méret státuszonként"""
+    for status in ("pending", "leased", "retry", "done", "empty", "dead"):
+        BACKLOG.set(sizes.get(status, 0), stage=stage, status=status)
+
+def export_padding(stage: str, snapshot: Dict):
+    """token_batching.STATS: padding hatékonyság taskonként"""
+    for task, s in snapshot.items():
+        PADDING_EFFICIENCY.set(s["efficiency"], stage=stage, task=task)
+        PADDED_TOKENS.set(s["real_tokens"], stage=stage, task=task, kind="real")
+        PADDED_TOKENS.set(s["padded_tokens"], stage=stage, task=task, kind="padded")
+
+# ===== HTTP =====
+def start_http_server(port: int, host: str = "127.0.0.1", registry: Registry = REGISTRY):
+    """háttérszálas HTTP szerver: GET /metrics"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    t = threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True)
+    t.start()
+    return server
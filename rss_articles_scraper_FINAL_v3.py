@@ -5,6 +5,8 @@ rss_articles_scraper_FINAL_v3.py
 - FIX: articles.source_id mostantól rss_feeds.source_id (nem rss_feeds.id)
 - limit paraméter támogatás
 - timezone-aware dátum
+- párhuzamos letöltés: globális szállimit + hostonkénti limit, keep-alive session szálanként;
+  a parse és a DB mentés a főszálon fut, ahogy a letöltések beérkeznek
 Dátum: 2025-10-26
 """
 
@@ -13,16 +15,26 @@ import sys
 import time
 import json
 import hashlib
-import logging
+import threading
 import requests
 import feedparser
 import pymysql
 import argparse
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, UTC
+from urllib.parse import urlsplit
+
+from requests.adapters import HTTPAdapter
+
+import log_setup
+import pipeline_events
 
 DB_CONFIG_PATH = os.getenv("NEWS_DB_JSON", "/opt/newscred/db.json")
 LOG_FILE = "/tmp/rss_scraper.log"
 REQUEST_TIMEOUT = 10
+FETCH_WORKERS = int(os.getenv("RSS_FETCH_WORKERS", "16"))
+PER_HOST_LIMIT = int(os.getenv("RSS_PER_HOST_LIMIT", "2"))
 
 USER_AGENTS = [
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0 Safari/537.36",
@@ -30,12 +42,12 @@ USER_AGENTS = [
     "Mozilla/5.0 (X11; Linux x86_64) Gecko/20100101 Firefox/121.0",
 ]
 
-logging.basicConfig(
-    filename=LOG_FILE,
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s"
+logger = log_setup.setup_logging(
+    LOG_FILE,
+    stage="scrape",
+    console=False,
+    fmt="%(asctime)s - %(levelname)s - %(message)s",
 )
-logger = logging.getLogger(__name__)
 
 def load_db_config():
     if not os.path.exists(DB_CONFIG_PATH):
@@ -56,21 +68,65 @@ def connect_db():
     )
     return conn
 
-def parse_feed(feed_url, ua_index_seed: int):
-    """RSS feed letöltése Requests-szel, majd feedparser parse."""
-    logger.info(f"📥 Feed feldolgozása: {feed_url}")
+# ===== LETÖLTÉS =====
+_local = threading.local()
+_host_locks = {}
+_host_locks_guard = threading.Lock()
+
+def _session() -> requests.Session:
+    """szálanként egy keep-alive session (a requests.Session nem szálbiztos)"""
+    s = getattr(_local, "session", None)
+    if s is None:
+        s = requests.Session()
+        adapter = HTTPAdapter(pool_connections=PER_HOST_LIMIT * 4, pool_maxsize=PER_HOST_LIMIT)
+        s.mount("http://", adapter)
+        s.mount("https://", adapter)
+        _local.session = s
+    return s
+
+def _host(url: str) -> str:
+    return (urlsplit(url).hostname or "").lower()
+
+def _host_limit(host: str) -> threading.BoundedSemaphore:
+    with _host_locks_guard:
+        sem = _host_locks.get(host)
+        if sem is None:
+            sem = _host_locks[host] = threading.BoundedSemaphore(PER_HOST_LIMIT)
+        return sem
+
+def fetch_feed(feed_url, ua_index_seed: int):
+    """RSS feed letöltése (hostonkénti limittel); visszatérés: (tartalom vagy None, másodperc)"""
     headers = {
         "User-Agent": USER_AGENTS[ua_index_seed % len(USER_AGENTS)],
         "Accept": "application/rss+xml, application/xml;q=0.9, */*;q=0.8",
     }
-    try:
-        resp = requests.get(feed_url, headers=headers, timeout=REQUEST_TIMEOUT, allow_redirects=True)
-        resp.raise_for_status()
-    except Exception as e:
-        logger.warning(f"⚠ Feed letöltési hiba: {feed_url} - {e}")
-        return []
+    t0 = time.perf_counter()
+    with _host_limit(_host(feed_url)):
+        try:
+            resp = _session().get(feed_url, headers=headers, timeout=REQUEST_TIMEOUT, allow_redirects=True)
+            resp.raise_for_status()
+        except Exception as e:
+            logger.warning(f"⚠ Feed letöltési hiba: {feed_url} - {e}")
+            return None, time.perf_counter() - t0
+    return resp.content, time.perf_counter() - t0
 
-    feed = feedparser.parse(resp.content)
+def interleave_by_host(feeds):
+    """feedek hostonként felváltva, hogy a hostonkénti limit ne kösse le a szálakat"""
+    groups = OrderedDict()
+    for f in feeds:
+        groups.setdefault(_host(f["feed_url"]), []).append(f)
+    out = []
+    while groups:
+        for host in list(groups):
+            out.append(groups[host].pop(0))
+            if not groups[host]:
+                del groups[host]
+    return out
+
+# ===== PARSE =====
+def parse_entries(feed_url, content: bytes):
+    """letöltött feed tartalom → cikk lista"""
+    feed = feedparser.parse(content)
     if getattr(feed, "bozo", 0):
         logger.warning(f"⚠ Feed parsing hiba: {feed_url} - {feed.bozo_exception}")
         return []
@@ -103,6 +159,7 @@ def save_articles(conn, articles, source_id: int):
     if not articles:
         return 0
     inserted = 0
+    new_ids = []
 
     sql = """
         INSERT INTO articles (source_id, title, link, link_hash, summary, published_at, created_at)
@@ -123,20 +180,27 @@ def save_articles(conn, articles, source_id: int):
                     a["published_at"],
                 ))
                 inserted += cur.rowcount
+                # rowcount == 1: új sor (2 = ON DUPLICATE KEY UPDATE)
+                if cur.rowcount == 1 and cur.lastrowid:
+                    new_ids.append(cur.lastrowid)
             except Exception as e:
                 logger.error(f"❌ DB hiba ({a['link']}): {e}")
                 conn.rollback()
+                new_ids = []
+        # outbox: ugyanabban a tranzakcióban, mint a cikkek
+        pipeline_events.emit(cur, pipeline_events.ARTICLE_INGESTED, new_ids)
         conn.commit()
 
     logger.info(f"💾 {inserted} cikk mentve az adatbázisba.")
     return inserted
 
-def main(limit: int):
+def main(limit: int, workers: int = FETCH_WORKERS):
     logger.info("=" * 90)
-    logger.info(f"📥 RSS Feedek feldolgozása (limit={limit})")
+    logger.info(f"📥 RSS Feedek feldolgozása (limit={limit}, {workers} szál, hostonként max {PER_HOST_LIMIT})")
     logger.info("=" * 90)
 
     conn = connect_db()
+    pipeline_events.ensure_pipeline_events_table(conn)
     cur = conn.cursor()
 
     # FONTOS: hozzuk a source_id-t is!
@@ -149,34 +213,55 @@ def main(limit: int):
 
     total_found = 0
     total_inserted = 0
+    slowest = (0.0, None)
+    t_start = time.perf_counter()
 
-    for i, feed in enumerate(feeds, 1):
-        # domain lehet NULL → logban kezeljük
-        logger.info(f"📊 [{i}/{len(feeds)}] - {feed.get('domain') or 'n/a'}")
+    # letöltés párhuzamosan; parse + mentés a főszálon, beérkezési sorrendben (egy DB kapcsolat)
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="rss-fetch") as pool:
         # UA választáshoz nyugodtan használjuk a feed saját id-ját
-        articles = parse_feed(feed["feed_url"], ua_index_seed=feed["id"])
-        total_found += len(articles)
+        futures = {
+            pool.submit(fetch_feed, feed["feed_url"], feed["id"]): feed
+            for feed in interleave_by_host(feeds)
+        }
+        for i, fut in enumerate(as_completed(futures), 1):
+            feed = futures[fut]
+            content, elapsed = fut.result()
+            if elapsed > slowest[0]:
+                slowest = (elapsed, feed["feed_url"])
+            # domain lehet NULL → logban kezeljük
+            logger.info(f"📊 [{i}/{len(feeds)}] - {feed.get('domain') or 'n/a'} ({elapsed:.1f}s): {feed['feed_url']}")
+            if content is None:
+                continue
+            articles = parse_entries(feed["feed_url"], content)
+            total_found += len(articles)
 
-        # 🔑 I T T  A  L É N Y E G: a cikkek source_id-ja a feeds.source_id!
-        total_inserted += save_articles(conn, articles, source_id=int(feed["source_id"]))
+            # 🔑 I T T  A  L É N Y E G: a cikkek source_id-ja a feeds.source_id!
+            total_inserted += save_articles(conn, articles, source_id=int(feed["source_id"]))
 
     logger.info("=" * 90)
     logger.info("📊 Scraping statisztika:")
     logger.info(f"  Feldolgozott feedek: {len(feeds)}")
+    logger.info(f"  Futási idő: {time.perf_counter() - t_start:.1f}s (leglassabb feed: {slowest[0]:.1f}s {slowest[1] or ''})")
     logger.info(f"  Talált cikkek: {total_found}")
     logger.info(f"  Mentett új cikkek: {total_inserted}")
     logger.info("=" * 90)
 
+    pruned = pipeline_events.prune(conn)
+    conn.commit()
+    if pruned:
+        logger.info(f"🧹 {pruned} régi pipeline esemény törölve")
+
     conn.close()
     logger.info("🔒 Adatbázis kapcsolat lezárva")
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="RSS cikkletöltő és adatbázisba író eszköz")
     parser.add_argument("--limit", type=int, default=5, help="hány feedet dolgozzon fel")
+    parser.add_argument("--workers", type=int, default=FETCH_WORKERS, help="párhuzamos letöltések száma")
     args = parser.parse_args()
 
     try:
-        main(args.limit)
+        main(args.limit, args.workers)
         logger.info("✅ Scraping sikeresen befejezve!")
     except KeyboardInterrupt:
         logger.warning("⛔ Megszakítva felhasználó által.")
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+segmenter.py
+Közös, rövidítés-tudatos mondatszegmentáló (translate chunker + extract NLI jelöltek)
+- határ: . ! ? … (záró idézőjel / zárójel után is) + whitespace, illetve sortörés
+- nem határ: ismert rövidítés (kb. stb. Nyrt. okt. / e.g. Inc. Dr.), kisbetűvel folytatódó szöveg,
+  sorszám / dátum ("2025. okt. 31-én", "2025. III. negyedév"), monogram ("J. Smith")
+- tizedes szám (318,4 / 2.1%) nem határ, mert nincs utána whitespace
+- spans(): (start, end) cikk-relatív karakter pozíciók, a whitespace levágva
+
+Futtatás (ellenőrzés a fixture korpuszon + az elvárt bontások, CASES; eltérésnél kilépési kód 1):
+  python3 segmenter.py [benchmarks/fixtures/articles.jsonl]
+"""
+
+import re
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+# rövidítések kisbetűvel, a záró pont nélkül
+ABBREVIATIONS: Dict[str, FrozenSet[str]] = {
+    "hu": frozenset({
+        "kb", "pl", "stb", "ill", "ld", "vö", "ún", "úm", "sz", "u", "tel", "db", "ft", "mrd", "md",
+        "ford", "szerk", "id", "ifj", "özv", "dr", "prof", "ny", "kft", "zrt", "nyrt", "bt", "rt", "kkt",
+        "évf", "hr", "kapcs", "tkp", "vezérig", "elnökvezérig", "max", "min", "átl", "ker",
+        "jan", "febr", "feb", "márc", "ápr", "máj", "jún", "júl", "aug", "szept", "okt", "nov", "dec",
+        "hétf", "csüt", "szo", "o", "old", "sk", "st", "bp",
+    }),
+    "en": frozenset({
+        "mr", "mrs", "ms", "dr", "prof", "sr", "jr", "st", "vs", "etc", "e.g", "i.e", "u.s", "u.k",
+        "no", "nos", "inc", "corp", "ltd", "co", "plc", "llc", "approx", "est", "fig", "dept", "gov",
+        "gen", "rep", "sen", "mt", "ave", "blvd",
+        "jan", "feb", "mar", "apr", "jun", "jul", "aug", "sep", "sept", "oct", "nov", "dec",
+    }),
+}
+# köznévként is előforduló rövidítések: csak számmal folytatva rövidítés ("No. 5", "min. 5 Ft" igen, "voted no. The" nem)
+BEFORE_NUMBER = frozenset({"no", "nos", "min", "max"})
+# rövidítések, amelyek mondatot is zárhatnak: nagybetűs folytatásnál mégis határ
+SENTENCE_FINAL = frozenset({
+    "stb", "etc", "kft", "zrt", "nyrt", "bt", "rt", "kkt", "inc", "corp", "ltd", "co", "plc", "llc", "ft",
+})
+_ALL = frozenset().union(*ABBREVIATIONS.values())
+
+_BOUNDARY = re.compile(r"[.!?…]+[\"'”’»)\]]*\s+|\s*\n+\s*")
+_TOKEN_BEFORE = re.compile(r"([\w.]+)\.$")
+_ROMAN = re.compile(r"^[IVXLC]+$")
+_NUMBER = re.compile(r"^\d+$")
+
+def _abbreviations(lang: Optional[str]) -> FrozenSet[str]:
+    return ABBREVIATIONS.get((lang or "").lower()[:2], _ALL)
+
+def _is_boundary(text: str, punct_end: int, next_start: int, abbrevs: FrozenSet[str]) -> bool:
+    """punct_end: a határjel utáni pozíció (whitespace előtt); next_start: a következő mondat eleje"""
+    nxt = text[next_start:next_start + 1]
+    if not nxt:
+        return True
+    head = text[max(0, punct_end - 40):punct_end].rstrip("\"'”’»)]")
+    if not head.endswith("."):
+        # ? ! …: csak kisbetűs folytatás tartja egyben
+        return not nxt.islower()
+    if nxt.islower():
+        return False
+    m = _TOKEN_BEFORE.search(head)
+    token = m.group(1) if m else ""
+    low = token.lower()
+    if low in abbrevs and (low not in BEFORE_NUMBER or nxt.isdigit()):
+        return low in SENTENCE_FINAL and nxt.isupper()
+    # sorszám / dátum: "2025. III. negyedév", "31. 2025"
+    if _NUMBER.match(token) and (nxt.isdigit() or _ROMAN.match(text[next_start:].split(" ", 1)[0].rstrip("."))):
+        return False
+    # monogram: "J. Smith"
+    if len(token) == 1 and token.isupper():
+        return False
+    return True
+
+def spans(text: str, lang: Optional[str] = None) -> List[Tuple[int, int]]:
+    """mondatok (start, end) pozíciója; a whitespace nem része a mondatnak"""
+    text = text or ""
+    abbrevs = _abbreviations(lang)
+    out, start = [], 0
+    for m in _BOUNDARY.finditer(text):
+        sep = m.group(0)
+        end = m.start() + len(sep.rstrip())
+        # sortörés mindig határ
+        if "\n" not in sep and not _is_boundary(text, end, m.end(), abbrevs):
+            continue
+        _append(text, start, end, out)
+        start = m.end()
+    _append(text, start, len(text), out)
+    return out
+
+def _append(text: str, start: int, end: int, out: List[Tuple[int, int]]):
+    seg = text[start:end]
+    lead = len(seg) - len(seg.lstrip())
+    trail = len(seg) - len(seg.rstrip())
+    if end - trail > start + lead:
+        out.append((start + lead, end - trail))
+
+def sentences(text: str, lang: Optional[str] = None) -> List[str]:
+    """mondatok szövege"""
+    return [text[s:e] for s, e in spans(text, lang)]
+
+# ===== CLI: ellenőrzés a fixture korpuszon =====
+# ===== ELLENŐRZÉS =====
+# (nyelv, szöveg, elvárt mondatok): a __main__ ezekre hibakóddal lép ki, ha a bontás eltér
+CASES: List[Tuple[str, str, List[str]]] = [
+    ("hu", "A forgalom kb. 12 százalékkal nőtt. Az elemzők elégedettek.",
+     ["A forgalom kb. 12 százalékkal nőtt.", "Az elemzők elégedettek."]),
+    ("hu", "Az OTP Bank Nyrt. és a Richter Gedeon Nyrt. is emelkedett. A MOL Nyrt. esett.",
+     ["Az OTP Bank Nyrt. és a Richter Gedeon Nyrt. is emelkedett.", "A MOL Nyrt. esett."]),
+    ("hu", "A 4iG Zrt. bejelentése szerint a tranzakció lezárult. A részvény 5%-ot emelkedett.",
+     ["A 4iG Zrt. bejelentése szerint a tranzakció lezárult.", "A részvény 5%-ot emelkedett."]),
+    ("hu", "A tranzakciót jóváhagyta az OTP Bank Nyrt. A részvény emelkedett.",
+     ["A tranzakciót jóváhagyta az OTP Bank Nyrt.", "A részvény emelkedett."]),
+    ("hu", "Kiadások: irodaszer, papír stb. Az összeg jelentős.",
+     ["Kiadások: irodaszer, papír stb.", "Az összeg jelentős."]),
+    ("hu", "A jelentést 2025. okt. 31-én teszik közzé. Addig nincs változás.",
+     ["A jelentést 2025. okt. 31-én teszik közzé.", "Addig nincs változás."]),
+    ("hu", "A 2025. III. negyedévben javult az eredmény. A részvény ára nőtt.",
+     ["A 2025. III. negyedévben javult az eredmény.", "A részvény ára nőtt."]),
+    ("hu", "A nettó árbevétel 318,4 milliárd forint volt. Ez 2.1%-os növekedés.",
+     ["A nettó árbevétel 318,4 milliárd forint volt.", "Ez 2.1%-os növekedés."]),
+    ("hu", "Az árfolyam min. 5 Ft-tal nőtt. A forgalom max. 10%-kal esett.",
+     ["Az árfolyam min. 5 Ft-tal nőtt.", "A forgalom max. 10%-kal esett."]),
+    ("hu", "A döntés a jövő hétre kerül. Ez nem rövidítés.",
+     ["A döntés a jövő hétre kerül.", "Ez nem rövidítés."]),
+    ("en", "Shares of Apple Inc. rose 3% on Monday. Analysts were surprised.",
+     ["Shares of Apple Inc. rose 3% on Monday.", "Analysts were surprised."]),
+    ("en", "The bill passed as No. 5 in the list. Voters said no. The count ended.",
+     ["The bill passed as No. 5 in the list.", "Voters said no.", "The count ended."]),
+    ("en", "J. Smith, CEO of Acme Corp., said revenue grew. Margins held at 2.1%.",
+     ["J. Smith, CEO of Acme Corp., said revenue grew.", "Margins held at 2.1%."]),
+    ("en", "Revenue was approx. 4 billion dollars, e.g. from cloud. Costs fell.",
+     ["Revenue was approx. 4 billion dollars, e.g. from cloud.", "Costs fell."]),
+]
+
+def check_cases() -> List[str]:
+    """eltérések az elvárt bontástól (üres lista: minden eset rendben)"""
+    errors = []
+    for lang, text, expected in CASES:
+        got = sentences(text, lang)
+        if got != expected:
+            errors.append(f"[{lang}] {text!r}\n    expected: {expected}\n    got:      {got}")
+    return errors
+
+if __name__ == "__main__":
+    import json
+    import os
+    import sys
+
+    path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "benchmarks", "fixtures", "articles.jsonl")
+    fragments = 0
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            a = json.loads(line)
+            print(f"#{a['id']} ({a.get('lang')}) {a['title']}")
+            for s, e in spans(a["text"], a.get("lang")):
+                sent = a["text"][s:e]
+                short = len(sent.split()) < 3
+                fragments += short
+                print(f"  {'!' if short else ' '} [{s}:{e}] {sent}")
+    print(f"{fragments} suspicious fragments (< 3 words)")
+
+    errors = check_cases()
+    for err in errors:
+        print(f"✗ {err}")
+    print(f"{len(CASES) - len(errors)}/{len(CASES)} expected splits OK")
+    sys.exit(1 if errors else 0)
@@ -15,26 +15,23 @@ import pandas as pd
 from bs4 import BeautifulSoup
 import mysql.connector
 from mysql.connector import Error as MySQLError
-import logging
 import json
 from datetime import datetime
 from typing import Dict, List, Tuple, Optional
 import argparse
 import sys
 
+import log_setup
+
 # ============================================================================
 # LOGGING SETUP
 # ============================================================================
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('sp500_etl.log'),
-        logging.StreamHandler()
-    ]
+logger = log_setup.setup_logging(
+    'sp500_etl.log',
+    stage='sp500_etl',
+    fmt='%(asctime)s - %(levelname)s - %(message)s',
 )
-logger = logging.getLogger(__name__)
 
 # ============================================================================
 # KONFIGURÁCIÓS KONSTANSOK
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+token_batching.py
+Hossz-bucketelt, token-keretes dinamikus batchelés CPU inferenciához (NLI, NER, sentiment)
+- a bemenetek becsült tokenhossz szerint rendezve kerülnek batchekbe
+- egy batch költsége a paddinggel együtt: elemszám × leghosszabb elem; ez nem lépheti túl a max_tokens keretet
+- a kimenet sorrendje megegyezik a bemenetével
+- padding hatékonyság (valódi / paddelt token) taskonként gyűjtve: STATS
+"""
+
+import threading
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+DEFAULT_MAX_TOKENS = 4096
+DEFAULT_MAX_ITEMS = 64
+CHARS_PER_TOKEN = 4
+SPECIAL_TOKENS = 2
+
+def estimate_tokens(text: str) -> int:
+    """tokenszám becslés tokenizer nélkül (karakter / 4 + speciális tokenek)"""
+    return len(text or "") // CHARS_PER_TOKEN + SPECIAL_TOKENS
+
+def token_batches(lengths: Sequence[int], max_tokens: int = DEFAULT_MAX_TOKENS,
+                  max_items: Optional[int] = DEFAULT_MAX_ITEMS) -> List[List[int]]:
+    """
+    Indexek batchekre bontva: hossz szerint növekvő sorrend, batchenként
+    len(batch) × max(hossz) <= max_tokens (egy túl hosszú elem egyedül kerül batchbe).
+    """
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+    batches, cur = [], []
+    for i in order:
+        longest = max(lengths[i], 1)
+        if cur and ((len(cur) + 1) * longest > max_tokens or (max_items and len(cur) >= max_items)):
+            batches.append(cur)
+            cur = []
+        cur.append(i)
+    if cur:
+        batches.append(cur)
+    return batches
+
+def padding_cost(lengths: Sequence[int], batches: Sequence[Sequence[int]]) -> Tuple[int, int]:
+    """(valódi, paddelt) tokenszám"""
+    real = sum(lengths[i] for b in batches for i in b)
+    padded = sum(len(b) * max(lengths[i] for i in b) for b in batches if b)
+    return real, padded
+
+class PaddingStats:
+    """taskonkénti összesítés: batchek, valódi és paddelt tokenek"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data: Dict[str, List[int]] = {}
+
+    def record(self, task: str, batches: int, real: int, padded: int):
+        with self._lock:
+            d = self._data.setdefault(task, [0, 0, 0])
+            d[0] += batches
+            d[1] += real
+            d[2] += padded
+
+    def snapshot(self) -> Dict[str, Dict]:
+        with self._lock:
+            items = list(self._data.items())
+        return {
+            task: {
+                "batches": b,
+                "real_tokens": real,
+                "padded_tokens": padded,
+                "efficiency": round(real / padded, 4) if padded else 1.0,
+            }
+            for task, (b, real, padded) in items
+        }
+
+STATS = PaddingStats()
+
+def run(fn: Callable[[List], List], items: Sequence, task: str,
+        max_tokens: int = DEFAULT_MAX_TOKENS, max_items: Optional[int] = DEFAULT_MAX_ITEMS,
+        length: Callable[[object], int] = estimate_tokens,
+        on_error: Optional[Callable[[Exception], None]] = None) -> List:
+    """
+    fn(batch) → batchenkénti eredmény lista; visszatérés az eredeti sorrendben.
+    Hibás batch elemei None-t kapnak (a többi batch fut tovább).
+    """
+    lengths = [length(x) for x in items]
+    batches = token_batches(lengths, max_tokens, max_items)
+    real, padded = padding_cost(lengths, batches)
+    STATS.record(task, len(batches), real, padded)
+
+    out: List = [None] * len(items)
+    for b in batches:
+        try:
+            results = fn([items[i] for i in b])
+        except Exception as e:
+            if on_error:
+                on_error(e)
+            continue
+        for i, res in zip(b, results):
+            out[i] = res
+    return out
@@ -8,14 +8,25 @@ Háttérben folyamatos fordítás, 100-as batchek, 40% CPU limit
 import os
 import json
 import time
+import hashlib
 import re
 import requests
 import pymysql
-import psutil
 import signal
+import logging
 import sys
-from datetime import datetime
-from typing import List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import chunker
+import lang_detect
+import log_setup
+import near_dup
+import cpu_governor
+import pipeline_events
+import priority
+import prom_metrics
+import work_queue
 
 # ===== CONFIG =====
 CONFIG_FILE = "/opt/newscred/translate_config.json"
@@ -29,15 +40,50 @@ PROVIDER = CONFIG["huggingface"]["provider"]
 TIMEOUT = CONFIG["huggingface"]["timeout"]
 MAX_RETRIES = CONFIG["huggingface"]["max_retries"]
 MAX_CHARS = CONFIG["translation"]["max_chars_per_chunk"]
+MAX_TOKENS = CONFIG["translation"].get("max_tokens_per_chunk", 400)
+TOKENIZER_MODEL = CONFIG["huggingface"].get("tokenizer", HF_MODEL)
 SLEEP = CONFIG["translation"]["sleep_between_requests"]
 BATCH_SLEEP = CONFIG["translation"]["sleep_between_batches"]
 CPU_LIMIT = CONFIG["performance"]["cpu_limit_percent"]
 BATCH_SIZE = CONFIG["performance"]["batch_size_prod"]
+MIN_BATCH_SIZE = CONFIG["performance"].get("min_batch_size", 1)
+MAX_CONCURRENCY = CONFIG["performance"].get("max_concurrency", 1)
+CPU_SOURCE = CONFIG["performance"].get("cpu_source", "process")
+QUEUE_CFG = CONFIG.get("queue", {})
+LEASE_SECONDS = QUEUE_CFG.get("lease_seconds", work_queue.DEFAULT_LEASE_SECONDS)
+ENQUEUE_WINDOW = QUEUE_CFG.get("enqueue_window", 1000)
+MAX_ATTEMPTS = QUEUE_CFG.get("max_attempts", work_queue.DEFAULT_MAX_ATTEMPTS)
+RETRY_BACKOFF = QUEUE_CFG.get("retry_backoff_seconds", work_queue.DEFAULT_BACKOFF_SECONDS)
+RETRY_BACKOFF_MAX = QUEUE_CFG.get("retry_backoff_max_seconds", work_queue.DEFAULT_BACKOFF_MAX_SECONDS)
+MAX_CHUNK_ATTEMPTS = CONFIG["translation"].get("max_chunk_attempts", 5)
+SOURCE_LANG = CONFIG["translation"].get("source_lang", "hu")
+LANGID_WINDOW = CONFIG["translation"].get("langid_batch", 500)
+# 'und' (rövid / bizonytalan szöveg): alapból forrásnyelvűként fordítjuk, hogy ne ragadjon be
+TRANSLATE_UND = CONFIG["translation"].get("translate_undetermined", True)
+DEDUP_CFG = CONFIG.get("dedup", {})
+DEDUP_ENABLED = DEDUP_CFG.get("enabled", True)
+DEDUP_THRESHOLD = DEDUP_CFG.get("threshold", near_dup.DEFAULT_THRESHOLD)
+DEDUP_WINDOW = DEDUP_CFG.get("index_batch", 500)
+DEDUP_GRACE = DEDUP_CFG.get("canonical_grace_minutes", near_dup.DEFAULT_CANONICAL_GRACE_MINUTES)
+EVENTS_CFG = CONFIG.get("events", {})
+IDLE_WAIT = EVENTS_CFG.get("idle_wait_seconds", 60)
+POLL_INTERVAL = EVENTS_CFG.get("poll_interval_seconds", pipeline_events.DEFAULT_POLL_INTERVAL)
+PRIORITY_CFG = CONFIG.get("priority", {})
+AGING_PER_HOUR = PRIORITY_CFG.get("aging_per_hour", work_queue.DEFAULT_AGING_PER_HOUR)
+METRICS_CFG = CONFIG.get("metrics", {})
+METRICS_PORT = METRICS_CFG.get("port", 9101)
+METRICS_HOST = METRICS_CFG.get("host", "127.0.0.1")
 LOG_DIR = CONFIG["logging"]["log_dir"]
 LOG_FILE = os.path.join(LOG_DIR, CONFIG["logging"]["log_file_worker"])
 
 # ===== GLOBAL =====
 RUNNING = True
+TOKENIZER = None
+STAGE = "translate"
+OWNER = work_queue.make_owner(STAGE)
+GOVERNOR = None
+SCORER = priority.PriorityScorer(PRIORITY_CFG)
+WAKE_EVENTS = [pipeline_events.ARTICLE_INGESTED]
 
 def signal_handler(sig, frame):
     global RUNNING
@@ -48,68 +94,40 @@ signal.signal(signal.SIGTERM, signal_handler)
 signal.signal(signal.SIGINT, signal_handler)
 
 # ===== LOGGING =====
-def log(msg: str):
-    ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    line = f"[{ts}] {msg}"
-    print(line, flush=True)
-    try:
-        with open(LOG_FILE, "a", encoding="utf-8") as f:
-            f.write(line + "\n")
-    except Exception as e:
-        print(f"Log write error: {e}", flush=True)
+LOGGER = logging.getLogger(STAGE)
+
+def log(msg: str, level: int = logging.INFO, **fields):
+    """nem blokkoló log (log_setup háttérszál); fields: pl. article_id a JSON sorokhoz"""
+    LOGGER.log(level, msg, extra=fields or None)
 
 # ===== UTIL =====
 def _clean_for_json(s: str) -> str:
     """eltávolítja a vezérlőkaraktereket"""
     return ''.join(ch for ch in (s or "") if ch in '\t\n\r' or ord(ch) >= 32)
 
-_SENT_SEP = re.compile(r'(?<=[\.\?\!…])\s+|\n+')
 def split_text(s: str) -> List[str]:
-    """szöveg darabolása mondatok szerint"""
-    s = (s or "").strip()
-    if not s:
-        return []
-    s = re.sub(r'[ \t]{2,}', ' ', s)
-    parts, buf = [], ""
-    for sent in _SENT_SEP.split(s):
-        if not sent:
-            continue
-        while len(sent) > MAX_CHARS:
-            parts.append(sent[:MAX_CHARS])
-            sent = sent[MAX_CHARS:]
-        if len(buf) + len(sent) + 1 <= MAX_CHARS:
-            buf = (buf + " " + sent).strip()
-        else:
-            if buf:
-                parts.append(buf)
-            buf = sent
-    if buf:
-        parts.append(buf)
-    return parts
-
-def get_cpu_percent() -> float:
-    """aktuális CPU% (www-data processz)"""
-    try:
-        for proc in psutil.process_iter(['pid', 'name', 'username']):
-            try:
-                if proc.info.get('username') == 'www-data':
-                    return proc.cpu_percent(interval=0.1)
-            except (psutil.NoSuchProcess, psutil.AccessDenied):
-                continue
-    except Exception as e:
-        log(f"⚠️ CPU check error: {e}")
-    return 0
+    """szöveg darabolása mondatok szerint (token limitig, ha van tokenizer)"""
+    if TOKENIZER is not None:
+        chunks = chunker.pack_chunks(s, MAX_TOKENS, chunker.make_counter(TOKENIZER), lang=SOURCE_LANG)
+    else:
+        chunks = chunker.pack_chunks(s, MAX_CHARS, lang=SOURCE_LANG)
+    return [c["text"] for c in chunks]
 
-def can_continue() -> bool:
-    """40% alatt van-e?"""
-    cpu = get_cpu_percent()
-    return cpu < CPU_LIMIT
+def _split_at_space(text: str) -> int:
+    """felezési pont a középhez legközelebbi szóközön"""
+    mid = len(text) // 2
+    left = text.rfind(" ", 0, mid)
+    right = text.find(" ", mid)
+    candidates = [i for i in (left, right) if i > 0]
+    if not candidates:
+        return mid
+    return min(candidates, key=lambda i: abs(i - mid))
 
 # ===== TRANSLATE =====
 def hf_infer(text: str, attempt: int = 0) -> Optional[str]:
     """Hugging Face fordítás (retry logikával)"""
     if attempt > MAX_RETRIES:
-        log(f"❌ Max retries exceeded for text ({len(text)} chars)")
+        log(f"❌ Max retries exceeded for text ({len(text)} chars)", logging.ERROR)
         return None
     
     headers = {
@@ -124,12 +142,14 @@ def hf_infer(text: str, attempt: int = 0) -> Optional[str]:
     payload = {"inputs": _clean_for_json(text)}
     
     try:
-        r = requests.post(url, headers=headers, json=payload, timeout=TIMEOUT)
+        with prom_metrics.STAGE_SECONDS.time(stage=STAGE, step="hf_request"):
+            r = requests.post(url, headers=headers, json=payload, timeout=TIMEOUT)
         
         # 503, 529 - service unavailable, retry
         if r.status_code in (503, 529):
             wait = 1 + attempt
             log(f"⚠️ HTTP {r.status_code} - retry in {wait}s (attempt {attempt + 1}/{MAX_RETRIES})")
+            prom_metrics.RETRIES.inc(stage=STAGE, reason=f"http_{r.status_code}")
             time.sleep(wait)
             return hf_infer(text, attempt + 1)
         
@@ -147,29 +167,38 @@ def hf_infer(text: str, attempt: int = 0) -> Optional[str]:
         if r.status_code == 400:
             if len(text) > MAX_CHARS:
                 log(f"ℹ️ 400 - splitting text ({len(text)} chars)")
-                mid = len(text) // 2
+                prom_metrics.RETRIES.inc(stage=STAGE, reason="split_400")
+                mid = _split_at_space(text)
                 left = hf_infer(text[:mid], attempt)
                 right = hf_infer(text[mid:], attempt)
                 if left and right:
                     return (left + "\n" + right).strip()
                 return None
             else:
-                log(f"❌ 400 Bad Request (text too short to split)")
+                log(f"❌ 400 Bad Request (text too short to split)", logging.ERROR)
                 return None
         
         # Egyéb hiba
-        log(f"❌ HTTP {r.status_code}: {r.text[:150]}")
+        log(f"❌ HTTP {r.status_code}: {r.text[:150]}", logging.ERROR)
         return None
         
     except requests.Timeout:
         log(f"⚠️ Timeout ({TIMEOUT}s) - retry (attempt {attempt + 1}/{MAX_RETRIES})")
+        prom_metrics.RETRIES.inc(stage=STAGE, reason="timeout")
         time.sleep(0.5 + attempt * 0.5)
         return hf_infer(text, attempt + 1)
     except Exception as e:
         log(f"⚠️ Request error: {type(e).__name__} - retry (attempt {attempt + 1}/{MAX_RETRIES})")
+        prom_metrics.RETRIES.inc(stage=STAGE, reason="error")
         time.sleep(0.5)
         return hf_infer(text, attempt + 1)
 
+def translate_chunk(part: str) -> Optional[str]:
+    """egy chunk fordítása + kérések közti szünet"""
+    tr = hf_infer(part)
+    time.sleep(SLEEP)
+    return tr
+
 # ===== DATABASE =====
 def db_connect():
     """adatbázis kapcsolat"""
@@ -184,24 +213,172 @@ def db_connect():
         autocommit=True,
     )
 
-def get_pending_articles(conn, limit: int = 100):
-    """fordítandó cikkek lekérése (latest DESC)"""
+def fill_languages(conn, limit: int) -> Dict[str, int]:
+    """article_texts.lang kitöltése n-gram nyelvfelismeréssel (csak ahol NULL); nyelvenkénti darabszám"""
     q = """
-        SELECT t.article_id, t.text
+        SELECT article_id, text
+        FROM article_texts
+        WHERE lang IS NULL AND text IS NOT NULL
+        ORDER BY article_id DESC
+        LIMIT %s
+    """
+    with conn.cursor(pymysql.cursors.DictCursor) as cur:
+        cur.execute(q, (limit,))
+        rows = cur.fetchall()
+    if not rows:
+        return {}
+    params = [(lang_detect.detect(r["text"]), r["article_id"]) for r in rows]
+    with conn.cursor() as cur:
+        cur.executemany("UPDATE article_texts SET lang = %s WHERE article_id = %s AND lang IS NULL", params)
+    counts: Dict[str, int] = {}
+    for lang, _ in params:
+        counts[lang] = counts.get(lang, 0) + 1
+    return counts
+
+def copy_english(conn, limit: int) -> int:
+    """angol forrásszöveg másolása text_en-be fordítás nélkül"""
+    q = """
+        SELECT t.article_id
         FROM article_texts t
         JOIN articles a ON a.id = t.article_id
         WHERE a.status = 0
+          AND t.lang = 'en'
           AND t.text IS NOT NULL
           AND (t.text_en IS NULL OR t.text_en = '')
-        ORDER BY t.article_id DESC
-        LIMIT %s;
+        LIMIT %s
     """
-    with conn.cursor(pymysql.cursors.DictCursor) as cur:
+    with conn.cursor() as cur:
         cur.execute(q, (limit,))
-        return cur.fetchall()
+        ids = [r[0] for r in cur.fetchall()]
+    if not ids:
+        return 0
+    marks = ",".join(["%s"] * len(ids))
+    conn.begin()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(f"""
+                UPDATE article_texts
+                SET text_en = text,
+                    en_provider = 'source',
+                    en_updated_at = NOW()
+                WHERE article_id IN ({marks})
+            """, ids)
+            pipeline_events.emit(cur, pipeline_events.TRANSLATED, ids)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return len(ids)
 
-def save_translation(conn, article_id: int, text_en: str):
-    """fordítás mentése"""
+def copy_duplicate_translations(conn, limit: int) -> int:
+    """
+    Közel-duplikátum cikkek a kanonikus cikk fordítását kapják (nincs újrafordítás; a lefoglaltak nem);
+    a saját work_items soruk ugyanabban a tranzakcióban lezárul, így nem fordítódnak újra.
+    """
+    q = """
+        SELECT t.article_id, c.text_en
+        FROM article_minhash m
+        JOIN article_texts t ON t.article_id = m.article_id
+        JOIN article_texts c ON c.article_id = m.canonical_id
+        WHERE m.canonical_id IS NOT NULL
+          AND (t.text_en IS NULL OR t.text_en = '')
+          AND c.text_en IS NOT NULL AND c.text_en <> ''
+          AND NOT EXISTS (SELECT 1 FROM work_items w
+                          WHERE w.stage = %s AND w.article_id = m.article_id AND w.status = 'leased')
+        LIMIT %s
+    """
+    with conn.cursor() as cur:
+        cur.execute(q, (STAGE, limit))
+        rows = cur.fetchall()
+    if not rows:
+        return 0
+    conn.begin()
+    try:
+        with conn.cursor() as cur:
+            cur.executemany("""
+                UPDATE article_texts
+                SET text_en = %s,
+                    en_provider = 'duplicate',
+                    en_updated_at = NOW()
+                WHERE article_id = %s
+            """, [(text_en, aid) for aid, text_en in rows])
+            pipeline_events.emit(cur, pipeline_events.TRANSLATED, [aid for aid, _ in rows])
+            work_queue.complete_unleased(cur, STAGE, [aid for aid, _ in rows], "duplicate")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return len(rows)
+
+PENDING_SQL = """
+    SELECT t.article_id
+    FROM article_texts t
+    JOIN articles a ON a.id = t.article_id
+    WHERE a.status = 0
+      AND t.text IS NOT NULL
+      AND (t.lang = %s OR (%s AND t.lang = '{und}'))
+      AND NOT {awaits_canonical}
+      AND (t.text_en IS NULL OR t.text_en = ''
+           OR EXISTS (SELECT 1 FROM translation_chunks c
+                      WHERE c.article_id = t.article_id
+                        AND c.text_en IS NULL
+                        AND c.attempts < %s))
+      AND {not_queued}
+    ORDER BY t.article_id DESC
+    LIMIT %s
+""".format(und=lang_detect.UNKNOWN, awaits_canonical=near_dup.awaits_canonical("t.article_id"),
+           not_queued=work_queue.not_queued("t.article_id"))
+
+def get_pending_articles(conn, limit: int = 100):
+    """fordítandó cikkek lefoglalása a work_items sorból (latest DESC)"""
+    if DEDUP_ENABLED:
+        indexed, dups = near_dup.index_pending(conn, DEDUP_WINDOW, DEDUP_THRESHOLD)
+        if dups:
+            log(f"🧬 MinHash: {indexed} indexed, {dups} near-duplicates")
+        reused = copy_duplicate_translations(conn, DEDUP_WINDOW)
+        if reused:
+            log(f"♻️ {reused} near-duplicates reuse their canonical translation")
+            prom_metrics.ARTICLES.inc(reused, stage=STAGE, result="duplicate")
+    langs = fill_languages(conn, LANGID_WINDOW)
+    und = langs.get(lang_detect.UNKNOWN, 0)
+    if und:
+        log(f"🌐 {und} articles with undetermined language → "
+            f"{'translated as ' + SOURCE_LANG if TRANSLATE_UND else 'skipped'}")
+        prom_metrics.ARTICLES.inc(und, stage=STAGE, result="lang_und" if TRANSLATE_UND else "lang_und_skipped")
+    other = sum(n for lang, n in langs.items() if lang not in (SOURCE_LANG, "en", lang_detect.UNKNOWN))
+    if other:
+        log(f"🌐 {other} articles in other languages skipped: {langs}")
+        prom_metrics.ARTICLES.inc(other, stage=STAGE, result="lang_other_skipped")
+    copied = copy_english(conn, LANGID_WINDOW)
+    if copied:
+        log(f"🇬🇧 {copied} English articles copied to text_en (no translation needed)")
+        prom_metrics.ARTICLES.inc(copied, stage=STAGE, result="source_en")
+    work_queue.enqueue(conn, STAGE, PENDING_SQL,
+                       (SOURCE_LANG, TRANSLATE_UND, DEDUP_GRACE if DEDUP_ENABLED else 0, STAGE, MAX_CHUNK_ATTEMPTS, STAGE, ENQUEUE_WINDOW))
+    priority.score_pending(conn, STAGE, SCORER)
+    leases = work_queue.claim(conn, STAGE, OWNER, limit, LEASE_SECONDS, AGING_PER_HOUR, MAX_ATTEMPTS)
+    if not leases:
+        return []
+    by_id = {l.article_id: l for l in leases}
+    marks = ",".join(["%s"] * len(by_id))
+    q = f"""
+        SELECT t.article_id, t.text
+        FROM article_texts t
+        WHERE t.article_id IN ({marks})
+        ORDER BY t.article_id DESC;
+    """
+    with conn.cursor(pymysql.cursors.DictCursor) as cur:
+        cur.execute(q, tuple(by_id))
+        rows = cur.fetchall()
+    for r in rows:
+        r["lease"] = by_id.pop(r["article_id"])
+    # a szöveg közben eltűnt: lezárjuk (visszaadva rögtön újra kiosztódna)
+    for l in by_id.values():
+        work_queue.complete_empty(conn, l, "no text")
+    return rows
+
+def save_translation(conn, article_id: int, text_en: str, complete: bool = True):
+    """fordítás mentése (teljes fordításnál a chunk checkpointok törlése)"""
     q = """
         UPDATE article_texts
         SET text_en = %s,
@@ -209,11 +386,75 @@ def save_translation(conn, article_id: int, text_en: str):
             en_updated_at = NOW()
         WHERE article_id = %s;
     """
+    conn.begin()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(q, (text_en, PROVIDER, article_id))
+            if complete:
+                cur.execute("DELETE FROM translation_chunks WHERE article_id = %s", (article_id,))
+            pipeline_events.emit(cur, pipeline_events.TRANSLATED, [article_id])
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+def retry_later(conn, lease, reason: str, idx: int):
+    """sikertelen kísérlet: backoff, max_attempts után dead-letter"""
+    status = work_queue.fail(conn, lease, reason, MAX_ATTEMPTS, RETRY_BACKOFF, RETRY_BACKOFF_MAX)
+    if status == "dead":
+        log(f"  [{idx}] Article #{lease.article_id}: dead-lettered after {lease.attempts} attempts ({reason})",
+            logging.WARNING, article_id=lease.article_id)
+        prom_metrics.ARTICLES.inc(stage=STAGE, result="dead")
+
+# ===== CHUNK CHECKPOINT =====
+def ensure_translation_chunks_table(conn):
+    """translation_chunks tábla létrehozása, ha még nincs"""
+    with conn.cursor() as cur:
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS translation_chunks (
+          article_id BIGINT NOT NULL,
+          position INT NOT NULL,
+          chunk_hash BINARY(32) NOT NULL,
+          text_en MEDIUMTEXT NULL,
+          attempts INT NOT NULL DEFAULT 0,
+          updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+          PRIMARY KEY (article_id, position)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+        """)
+
+def make_chunk_hash(chunk: str) -> bytes:
+    """SHA-256 hash 32 byte"""
+    return hashlib.sha256(chunk.encode("utf-8")).digest()
+
+def load_chunk_progress(conn, article_id: int, n_chunks: int) -> Dict[int, Dict]:
+    """mentett chunkok betöltése (position → {hash, text_en}); a fölösleges pozíciók törlése"""
+    with conn.cursor(pymysql.cursors.DictCursor) as cur:
+        cur.execute("DELETE FROM translation_chunks WHERE article_id = %s AND position >= %s",
+                    (article_id, n_chunks))
+        cur.execute("""
+            SELECT position, chunk_hash, text_en
+            FROM translation_chunks
+            WHERE article_id = %s
+        """, (article_id,))
+        return {r["position"]: r for r in cur.fetchall()}
+
+def save_chunk(conn, article_id: int, position: int, chunk_hash: bytes, text_en: Optional[str]):
+    """egy chunk eredményének mentése (None = sikertelen, később újrapróbálható)"""
+    q = """
+        INSERT INTO translation_chunks (article_id, position, chunk_hash, text_en, attempts)
+        VALUES (%s, %s, %s, %s, 1)
+        ON DUPLICATE KEY UPDATE
+          attempts = IF(chunk_hash = VALUES(chunk_hash), attempts + 1, 1),
+          chunk_hash = VALUES(chunk_hash),
+          text_en = VALUES(text_en)
+    """
     with conn.cursor() as cur:
-        cur.execute(q, (text_en, PROVIDER, article_id))
+        cur.execute(q, (article_id, position, chunk_hash, text_en))
 
 # ===== MAIN LOOP =====
 def main():
+    global TOKENIZER, GOVERNOR
+    log_setup.setup_from_config(CONFIG["logging"], LOG_FILE, STAGE)
     log("=" * 80)
     log(f"🚀 TRANSLATE WORKER START")
     log(f"   Model: {HF_MODEL}")
@@ -222,11 +463,37 @@ def main():
     log(f"   Sleep between requests: {SLEEP}s")
     log("=" * 80)
     
+    GOVERNOR = cpu_governor.CpuGovernor(
+        CPU_LIMIT, BATCH_SIZE, min_batch=MIN_BATCH_SIZE,
+        max_concurrency=MAX_CONCURRENCY, source=CPU_SOURCE,
+    )
+    log(f"✅ CPU governor: source={GOVERNOR.sampler.source}, max concurrency={MAX_CONCURRENCY}")
+    
+    if METRICS_PORT:
+        try:
+            prom_metrics.start_http_server(METRICS_PORT, METRICS_HOST)
+            log(f"✅ Metrics: http://{METRICS_HOST}:{METRICS_PORT}/metrics")
+        except OSError as e:
+            log(f"⚠️ Metrics server error: {e}")
+    
+    t0 = time.perf_counter()
+    TOKENIZER = chunker.load_tokenizer(TOKENIZER_MODEL)
+    prom_metrics.MODEL_LOAD_SECONDS.set(time.perf_counter() - t0, stage=STAGE, model=TOKENIZER_MODEL)
+    if TOKENIZER is not None:
+        log(f"✅ Tokenizer loaded ({TOKENIZER_MODEL}), chunk limit: {MAX_TOKENS} tokens")
+    else:
+        log(f"⚠️ Tokenizer not available, chunk limit: {MAX_CHARS} chars")
+    
     try:
         conn = db_connect()
-        log("✅ DB connection OK\n")
+        work_queue.ensure_work_items_table(conn)
+        pipeline_events.ensure_pipeline_events_table(conn)
+        ensure_translation_chunks_table(conn)
+        near_dup.ensure_minhash_tables(conn)
+        event_cursor = pipeline_events.latest_id(conn)
+        log(f"✅ DB connection OK (lease owner: {OWNER})\n")
     except Exception as e:
-        log(f"❌ DB connection failed: {e}")
+        log(f"❌ DB connection failed: {e}", logging.ERROR)
         return 1
     
     iteration = 0
@@ -238,68 +505,126 @@ def main():
             iteration += 1
             log(f"\n--- Iteration #{iteration} ---")
             
-            # CPU check
-            cpu = get_cpu_percent()
-            log(f"CPU: {cpu:.1f}% (limit: {CPU_LIMIT}%)")
-            
-            if not can_continue():
-                log(f"⏸️ CPU too high, waiting 30s...")
-                time.sleep(30)
-                continue
+            # CPU budget (AIMD)
+            GOVERNOR.update()
+            gov = GOVERNOR.snapshot()
+            prom_metrics.export_governor(STAGE, gov)
+            log(f"CPU: {gov['cpu_percent']:.1f}% (limit: {CPU_LIMIT}%) → batch {gov['batch_size']}, concurrency {gov['concurrency']}")
+            paused = GOVERNOR.throttle()
+            if paused:
+                log(f"⏸️ CPU too high, paused {paused:.1f}s")
+                prom_metrics.CPU_PAUSES.inc(stage=STAGE)
+                prom_metrics.CPU_PAUSE_SECONDS.inc(paused, stage=STAGE)
             
             # Cikkek lekérése
-            rows = get_pending_articles(conn, BATCH_SIZE)
+            rows = get_pending_articles(conn, GOVERNOR.batch_size)
+            prom_metrics.export_backlog(STAGE, work_queue.backlog_size(conn, STAGE))
             if not rows:
-                log("💤 No pending articles, waiting 60s...")
-                time.sleep(60)
+                log(f"💤 No pending articles, waiting for events (max {IDLE_WAIT}s)...")
+                new_cursor = pipeline_events.wait_for_events(
+                    conn, WAKE_EVENTS, event_cursor, IDLE_WAIT,
+                    poll_interval=POLL_INTERVAL, keep_running=lambda: RUNNING,
+                )
+                if new_cursor > event_cursor:
+                    log(f"🔔 New events (cursor {event_cursor} → {new_cursor})")
+                    event_cursor = new_cursor
                 continue
             
             log(f"📥 {len(rows)} articles to translate")
             
             batch_processed = 0
             for idx, row in enumerate(rows, 1):
-                # CPU check minden cikk előtt
-                if not can_continue():
-                    log(f"⏸️ CPU limit reached, stopping batch")
+                # CPU budget minden cikk előtt: túllépésnél rövid szünet, nem áll le a batch
+                if not RUNNING:
+                    for rest in rows[idx - 1:]:
+                        work_queue.release(conn, rest["lease"])
                     break
+                paused = GOVERNOR.throttle()
+                if paused:
+                    log(f"⏸️ CPU limit reached, paused {paused:.1f}s")
+                    prom_metrics.CPU_PAUSES.inc(stage=STAGE)
+                    prom_metrics.CPU_PAUSE_SECONDS.inc(paused, stage=STAGE)
                 
                 art_id = row["article_id"]
                 text = row["text"]
+                lease = row["lease"]
                 
                 if not text:
-                    log(f"  [{idx}] Article #{art_id}: empty text, SKIP")
+                    log(f"  [{idx}] Article #{art_id}: empty text, SKIP", article_id=art_id)
+                    prom_metrics.ARTICLES.inc(stage=STAGE, result="skipped")
+                    work_queue.complete_empty(conn, lease, "empty text")
                     total_skipped += 1
                     continue
                 
                 # Darabolás
+                art_t0 = time.perf_counter()
                 parts = split_text(text)
                 if not parts:
-                    log(f"  [{idx}] Article #{art_id}: no chunks, SKIP")
+                    log(f"  [{idx}] Article #{art_id}: no chunks, SKIP", article_id=art_id)
+                    prom_metrics.ARTICLES.inc(stage=STAGE, result="skipped")
+                    work_queue.complete_empty(conn, lease, "no chunks")
                     total_skipped += 1
                     continue
                 
+                # Checkpoint: a már lefordított (azonos hash-ű) chunkokat nem küldjük újra
+                hashes = [make_chunk_hash(p) for p in parts]
+                progress = load_chunk_progress(conn, art_id, len(parts))
+                results: Dict[int, str] = {}
+                for pos, saved in progress.items():
+                    if saved["text_en"] and bytes(saved["chunk_hash"]) == hashes[pos]:
+                        results[pos] = saved["text_en"]
+                todo = [i for i in range(len(parts)) if i not in results]
+                if results:
+                    log(f"  [{idx}] Article #{art_id}: resuming ({len(results)}/{len(parts)} chunks checkpointed)", article_id=art_id)
+                    prom_metrics.CHUNKS.inc(len(results), stage=STAGE, result="checkpoint")
+                
                 # Fordítás
-                translated_parts = []
-                chunk_ok = 0
-                for part in parts:
-                    tr = hf_infer(part)
-                    if tr:
-                        translated_parts.append(tr)
-                        chunk_ok += 1
-                    time.sleep(SLEEP)
+                lease_lost = False
+                # párhuzamos chunk kérések a governor szerint (sorrend megmarad)
+                pool = ThreadPoolExecutor(max_workers=GOVERNOR.concurrency)
+                try:
+                    for pos, tr in zip(todo, pool.map(translate_chunk, [parts[i] for i in todo])):
+                        save_chunk(conn, art_id, pos, hashes[pos], tr or None)
+                        prom_metrics.CHUNKS.inc(stage=STAGE, result="ok" if tr else "failed")
+                        if tr:
+                            results[pos] = tr
+                        if not lease.renew_if_due(conn):
+                            lease_lost = True
+                            break
+                finally:
+                    pool.shutdown(wait=True, cancel_futures=True)
                 
-                # Mentés
-                final_text = "\n".join(translated_parts).strip()
+                if lease_lost:
+                    log(f"  [{idx}] Article #{art_id}: lease lost, SKIP", article_id=art_id)
+                    prom_metrics.ARTICLES.inc(stage=STAGE, result="skipped")
+                    total_skipped += 1
+                    continue
+                
+                # Mentés (hiányos fordítás is mentődik; a hiányzó chunkokat a checkpoint jelzi)
+                chunk_ok = len(results)
+                final_text = "\n".join(results[i] for i in sorted(results)).strip()
                 if final_text:
-                    save_translation(conn, art_id, final_text)
-                    log(f"  [{idx}] Article #{art_id}: OK ({chunk_ok}/{len(parts)} chunks, {len(final_text)} chars)")
+                    save_translation(conn, art_id, final_text, complete=chunk_ok == len(parts))
+                    if chunk_ok == len(parts):
+                        work_queue.complete(conn, lease)
+                    else:
+                        # hiányzó chunkok: újrapróbálás backoff után (a checkpointtól folytatva)
+                        retry_later(conn, lease, f"partial: {chunk_ok}/{len(parts)} chunks", idx)
+                    log(f"  [{idx}] Article #{art_id}: OK ({chunk_ok}/{len(parts)} chunks, {len(final_text)} chars)", article_id=art_id)
+                    prom_metrics.ARTICLES.inc(stage=STAGE, result="ok" if chunk_ok == len(parts) else "partial")
+                    prom_metrics.STAGE_SECONDS.observe(time.perf_counter() - art_t0, stage=STAGE, step="article")
                     batch_processed += 1
                     total_processed += 1
                 else:
-                    log(f"  [{idx}] Article #{art_id}: FAIL (no translation)")
+                    log(f"  [{idx}] Article #{art_id}: FAIL (no translation)", article_id=art_id)
+                    prom_metrics.ARTICLES.inc(stage=STAGE, result="failed")
+                    retry_later(conn, lease, "no translation", idx)
                     total_skipped += 1
             
             log(f"✅ Batch: {batch_processed}/{len(rows)} processed")
+            log(f"📈 governor: {json.dumps(GOVERNOR.snapshot())}")
+            if DEDUP_ENABLED:
+                log(f"♻️ dedup savings: {json.dumps(near_dup.savings(conn))}")
             log(f"📊 Total: {total_processed} processed, {total_skipped} skipped")
             
             # Batch delay
@@ -309,11 +634,17 @@ def main():
     except KeyboardInterrupt:
         log("⏹️ Interrupted by user")
     except Exception as e:
-        log(f"❌ FATAL ERROR: {type(e).__name__}: {e}")
+        log(f"❌ FATAL ERROR: {type(e).__name__}: {e}", logging.ERROR)
         import traceback
-        log(traceback.format_exc())
+        log(traceback.format_exc(), logging.ERROR)
         return 1
     finally:
+        try:
+            released = work_queue.release_all(conn, STAGE, OWNER)
+            if released:
+                log(f"↩️ {released} leases released")
+        except Exception:
+            pass
         try:
             conn.close()
             log("🔒 DB connection closed")
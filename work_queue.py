@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+work_queue.py
+Lease-alapú munkasor (work_items) a translate/extract workerekhez
+- stage-enként egy sor cikkenként (UNIQUE stage + article_id)
+- claim: SELECT ... FOR UPDATE SKIP LOCKED + lease owner / lejárat
+- lejárt lease (összeomlott worker) automatikusan újra kiosztható
+- prioritás: legmagasabb (priority + öregedés) először, hogy semmi ne éhezzen ki
+- hiba: exponenciális backoff (status = 'retry', next_attempt_at), max_attempts után 'dead'
+- feldolgozva, de nincs eredmény (pl. nincs claim): 'empty' - a sor nem nyílik újra
+- a jelölt lekérdezések not_queued() szűrővel kihagyják a már sorban lévő / lezárt cikkeket
+"""
+
+import os
+import time
+import socket
+from typing import Dict, List
+
+import pymysql
+
+DEFAULT_LEASE_SECONDS = 300
+DEFAULT_AGING_PER_HOUR = 1.0
+DEFAULT_MAX_ATTEMPTS = 5
+DEFAULT_BACKOFF_SECONDS = 60
+DEFAULT_BACKOFF_MAX_SECONDS = 6 * 3600
+
+def make_owner(stage: str) -> str:
+    """lease tulajdonos azonosító: stage@host:pid"""
+    return f"{stage}@{socket.gethostname()}:{os.getpid()}"[:128]
+
+# ===== SCHEMA =====
+def ensure_work_items_table(conn):
+    """work_items tábla létrehozása, ha még nincs"""
+    with conn.cursor() as cur:
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS work_items (
+          id BIGINT PRIMARY KEY AUTO_INCREMENT,
+          stage VARCHAR(32) NOT NULL,
+          article_id BIGINT NOT NULL,
+          status VARCHAR(16) NOT NULL DEFAULT 'pending',
+          lease_owner VARCHAR(128) NULL,
+          lease_expires_at DATETIME NULL,
+          priority FLOAT NULL,
+          manual TINYINT NOT NULL DEFAULT 0,
+          enqueued_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+          attempts INT NOT NULL DEFAULT 0,
+          next_attempt_at DATETIME NULL,
+          reason VARCHAR(255) NULL,
+          created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+          updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+          UNIQUE KEY uniq_stage_article (stage, article_id),
+          KEY idx_stage_status_lease (stage, status, lease_expires_at),
+          KEY idx_stage_status_next (stage, status, next_attempt_at)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+        """)
+        # korábbi séma bővítése
+        _ensure_column(cur, "work_items", "priority", "FLOAT NULL")
+        _ensure_column(cur, "work_items", "manual", "TINYINT NOT NULL DEFAULT 0")
+        _ensure_column(cur, "work_items", "enqueued_at", "DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP")
+        _ensure_column(cur, "work_items", "attempts", "INT NOT NULL DEFAULT 0")
+        _ensure_column(cur, "work_items", "next_attempt_at", "DATETIME NULL")
+        _ensure_column(cur, "work_items", "reason", "VARCHAR(255) NULL")
+        _ensure_index(cur, "work_items", "idx_stage_status_next", "(stage, status, next_attempt_at)")
+
+def _ensure_column(cur, table: str, column: str, ddl: str):
+    """oszlop hozzáadása, ha hiányzik"""
+    cur.execute("""
+        SELECT COUNT(*) FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s
+    """, (table, column))
+    row = cur.fetchone()
+    count = list(row.values())[0] if isinstance(row, dict) else row[0]
+    if not count:
+        cur.execute(f"ALTER TABLE `{table}` ADD COLUMN `{column}` {ddl}")
+
+def _ensure_index(cur, table: str, index: str, columns: str):
+    """index hozzáadása, ha hiányzik"""
+    cur.execute("""
+        SELECT COUNT(*) FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s
+    """, (table, index))
+    row = cur.fetchone()
+    count = list(row.values())[0] if isinstance(row, dict) else row[0]
+    if not count:
+        cur.execute(f"ALTER TABLE `{table}` ADD INDEX `{index}` {columns}")
+
+# ===== ENQUEUE =====
+def not_queued(column: str) -> str:
+    """
+    Jelölt lekérdezésbe illeszthető feltétel (egy %s paraméter: stage): kihagyja a cikket, ha már
+    van nem 'done' sora (pending, leased, retry, empty, dead). A uniq_stage_article indexen fut,
+    így a LIMIT ablakot nem foglalják a backoffban várakozó vagy lezárt cikkek.
+    """
+    return f"""NOT EXISTS (SELECT 1 FROM work_items w
+                      WHERE w.stage = %s AND w.article_id = {column} AND w.status <> 'done')"""
+
+
+def enqueue(conn, stage: str, candidates_sql: str, params: tuple = ()) -> int:
+    """
+    Függő cikkek felvétele a sorba. `candidates_sql` egyetlen article_id oszlopot ad vissza.
+    A már kész (done) sor újra pending lesz, ha a cikk ismét feldolgozandó; az 'empty' és 'dead'
+    sorokat csak kézi újrasorolás nyitja újra.
+    """
+    q = f"""
+        INSERT INTO work_items (stage, article_id)
+        SELECT %s, cand.article_id FROM ({candidates_sql}) AS cand
+        ON DUPLICATE KEY UPDATE
+          enqueued_at = IF(status = 'done', NOW(), enqueued_at),
+          priority = IF(status = 'done', NULL, priority),
+          attempts = IF(status = 'done', 0, attempts),
+          reason = IF(status = 'done', NULL, reason),
+          status = IF(status = 'done', 'pending', status)
+    """
+    with conn.cursor() as cur:
+        cur.execute(q, (stage,) + tuple(params))
+        return cur.rowcount
+
+# ===== LEASE =====
+class Lease:
+    """egy kiosztott munkaelem; renew_if_due() hosszú cikkek közben hívható"""
+
+    def __init__(self, item_id: int, article_id: int, stage: str, owner: str, lease_seconds: int,
+                 attempts: int = 1):
+        self.item_id = item_id
+        self.article_id = article_id
+        self.stage = stage
+        self.owner = owner
+        self.lease_seconds = lease_seconds
+        self.attempts = attempts
+        self.renewed_at = time.monotonic()
+
+    def renew_if_due(self, conn) -> bool:
+        """lease megújítása, ha az idő harmada eltelt; False, ha közben elvesztettük"""
+        if time.monotonic() - self.renewed_at < self.lease_seconds / 3:
+            return True
+        ok = renew(conn, [self.item_id], self.owner, self.lease_seconds) > 0
+        self.renewed_at = time.monotonic()
+        return ok
+
+def claim(conn, stage: str, owner: str, limit: int,
+          lease_seconds: int = DEFAULT_LEASE_SECONDS,
+          aging_per_hour: float = DEFAULT_AGING_PER_HOUR,
+          max_attempts: int = DEFAULT_MAX_ATTEMPTS) -> List[Lease]:
+    """
+    Legfeljebb `limit` elem lefoglalása (pending, esedékes retry vagy lejárt lease), SKIP LOCKED.
+    Sorrend: priority + várakozási idő * aging_per_hour, azonos értéknél a legújabb cikk.
+    Minden lefoglalás egy kísérlet; a max_attempts kísérlet után is lejárt lease (a workert
+    rendre leállító cikk) 'dead' lesz.
+    """
+    q_dead = """
+        UPDATE work_items
+        SET status = 'dead', lease_owner = NULL, lease_expires_at = NULL,
+            reason = 'lease expired'
+        WHERE stage = %s AND status = 'leased' AND lease_expires_at < NOW() AND attempts >= %s
+    """
+    q_sel = """
+        SELECT id, article_id, attempts
+        FROM work_items
+        WHERE stage = %s
+          AND (status = 'pending'
+               OR (status = 'retry' AND next_attempt_at <= NOW())
+               OR (status = 'leased' AND lease_expires_at < NOW()))
+        ORDER BY COALESCE(priority, 0)
+                 + TIMESTAMPDIFF(SECOND, enqueued_at, NOW()) / 3600 * %s DESC,
+                 article_id DESC
+        LIMIT %s
+        FOR UPDATE SKIP LOCKED
+    """
+    conn.begin()
+    try:
+        with conn.cursor(pymysql.cursors.DictCursor) as cur:
+            cur.execute(q_dead, (stage, max_attempts))
+            cur.execute(q_sel, (stage, aging_per_hour, limit))
+            rows = cur.fetchall()
+            if rows:
+                ids = [r["id"] for r in rows]
+                marks = ",".join(["%s"] * len(ids))
+                cur.execute(f"""
+                    UPDATE work_items
+                    SET status = 'leased',
+                        lease_owner = %s,
+                        lease_expires_at = NOW() + INTERVAL %s SECOND,
+                        next_attempt_at = NULL,
+                        attempts = attempts + 1
+                    WHERE id IN ({marks})
+                """, (owner, lease_seconds, *ids))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return [Lease(r["id"], r["article_id"], stage, owner, lease_seconds, r["attempts"] + 1)
+            for r in rows]
+
+def renew(conn, item_ids: List[int], owner: str, lease_seconds: int = DEFAULT_LEASE_SECONDS) -> int:
+    """saját lease-ek meghosszabbítása"""
+    if not item_ids:
+        return 0
+    marks = ",".join(["%s"] * len(item_ids))
+    with conn.cursor() as cur:
+        cur.execute(f"""
+            UPDATE work_items
+            SET lease_expires_at = NOW() + INTERVAL %s SECOND
+            WHERE id IN ({marks}) AND lease_owner = %s AND status = 'leased'
+        """, (lease_seconds, *item_ids, owner))
+        return cur.rowcount
+
+def complete(conn, lease: Lease):
+    """elem kész"""
+    with conn.cursor() as cur:
+        cur.execute("""
+            UPDATE work_items
+            SET status = 'done', lease_owner = NULL, lease_expires_at = NULL, manual = 0,
+                attempts = 0, reason = NULL
+            WHERE id = %s AND lease_owner = %s
+        """, (lease.item_id, lease.owner))
+
+def complete_empty(conn, lease: Lease, reason: str):
+    """feldolgozva, de nincs eredmény (pl. nincs claim, üres szöveg): a sor lezárva, nem nyílik újra"""
+    with conn.cursor() as cur:
+        cur.execute("""
+            UPDATE work_items
+            SET status = 'empty', lease_owner = NULL, lease_expires_at = NULL, manual = 0,
+                reason = %s
+            WHERE id = %s AND lease_owner = %s
+        """, (reason[:255], lease.item_id, lease.owner))
+
+def complete_unleased(cur, stage: str, article_ids: List[int], reason: str) -> int:
+    """
+    Lease nélkül elkészült cikkek (pl. duplikátum másolás) sorainak lezárása a hívó tranzakciójában;
+    a lefoglalt sorokhoz nem nyúl, azokat a tulajdonosuk zárja le.
+    """
+    if not article_ids:
+        return 0
+    marks = ",".join(["%s"] * len(article_ids))
+    cur.execute(f"""
+        UPDATE work_items
+        SET status = 'done', lease_owner = NULL, lease_expires_at = NULL, manual = 0,
+            attempts = 0, reason = %s
+        WHERE stage = %s AND article_id IN ({marks}) AND status <> 'leased'
+    """, (reason[:255], stage, *article_ids))
+    return cur.rowcount
+
+def backoff_seconds(attempts: int, base: float = DEFAULT_BACKOFF_SECONDS,
+                    cap: float = DEFAULT_BACKOFF_MAX_SECONDS) -> int:
+    """exponenciális várakozás: base * 2^(attempts-1), legfeljebb cap"""
+    return int(min(cap, base * 2 ** max(0, attempts - 1)))
+
+def fail(conn, lease: Lease, reason: str, max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+         backoff: float = DEFAULT_BACKOFF_SECONDS,
+         backoff_max: float = DEFAULT_BACKOFF_MAX_SECONDS) -> str:
+    """
+    Sikertelen kísérlet: 'retry' backoff-fal, vagy max_attempts után 'dead'.
+    Visszatérés: az új státusz.
+    """
+    status = "dead" if lease.attempts >= max_attempts else "retry"
+    # dead: NOW() + INTERVAL NULL → NULL
+    delay = backoff_seconds(lease.attempts, backoff, backoff_max) if status == "retry" else None
+    with conn.cursor() as cur:
+        cur.execute("""
+            UPDATE work_items
+            SET status = %s, lease_owner = NULL, lease_expires_at = NULL,
+                next_attempt_at = NOW() + INTERVAL %s SECOND,
+                reason = %s
+            WHERE id = %s AND lease_owner = %s
+        """, (status, delay, reason[:255], lease.item_id, lease.owner))
+    return status
+
+def release(conn, lease: Lease):
+    """elem visszaadása a sorba (nem jutottunk el hozzá); a kísérlet nem számít"""
+    with conn.cursor() as cur:
+        cur.execute("""
+            UPDATE work_items
+            SET status = 'pending', lease_owner = NULL, lease_expires_at = NULL,
+                attempts = GREATEST(attempts - 1, 0)
+            WHERE id = %s AND lease_owner = %s AND status = 'leased'
+        """, (lease.item_id, lease.owner))
+
+def release_all(conn, stage: str, owner: str) -> int:
+    """összes saját lease visszaadása (leálláskor)"""
+    with conn.cursor() as cur:
+        cur.execute("""
+            UPDATE work_items
+            SET status = 'pending', lease_owner = NULL, lease_expires_at = NULL,
+                attempts = GREATEST(attempts - 1, 0)
+            WHERE stage = %s AND lease_owner = %s AND status = 'leased'
+        """, (stage, owner))
+        return cur.rowcount
+
+# ===== PRIORITY =====
+def unscored(conn, stage: str, limit: int = 1000) -> List[Dict]:
+    """még pontozatlan pending elemek a pontozáshoz szükséges cikkadatokkal"""
+    with conn.cursor(pymysql.cursors.DictCursor) as cur:
+        cur.execute("""
+            SELECT w.id, w.article_id, w.manual,
+                   a.title, a.source_id, COALESCE(a.published_at, a.created_at) AS published_at
+            FROM work_items w
+            JOIN articles a ON a.id = w.article_id
+            WHERE w.stage = %s AND w.status = 'pending' AND w.priority IS NULL
+            LIMIT %s
+        """, (stage, limit))
+        return cur.fetchall()
+
+def set_priorities(conn, scores: List[tuple]):
+    """(priority, item_id) párok mentése"""
+    if not scores:
+        return
+    with conn.cursor() as cur:
+        cur.executemany("UPDATE work_items SET priority = %s WHERE id = %s", scores)
+
+def backlog_size(conn, stage: str) -> Dict[str, int]:
+    """sor mérete státuszonként"""
+    with conn.cursor(pymysql.cursors.DictCursor) as cur:
+        cur.execute("""
+            SELECT status, COUNT(*) AS cnt FROM work_items
+            WHERE stage = %s GROUP BY status
+        """, (stage,))
+        return {r["status"]: r["cnt"] for r in cur.fetchall()}